@@ -0,0 +1,26 @@
+"""
+Benchmarks are not part of the test suite, run each of them as module:
+
+    $ python -m benchmarks.bench_state_engine
+"""
+import os
+import time
+
+
+def setup_django():
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "tests.test_settings")
+    import django  # pylint: disable=import-outside-toplevel
+
+    django.setup()
+
+
+def measure(label, func, repeat=5):
+    """Print and return best wall time of func in seconds"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    best = min(timings)
+    print(f"{label:<45} best of {repeat}: {best * 1000:10.1f} ms")
+    return best
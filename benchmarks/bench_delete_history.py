@@ -0,0 +1,82 @@
+"""
+Compare deletion of snapshot history through ORM collector and
+through single statements per table (delete_snapshot_history)
+for 1000 snapshots with 1M migration state rows.
+"""
+import time
+import uuid
+
+from benchmarks import setup_django
+
+setup_django()
+
+# pylint: disable=wrong-import-position
+from django.core.management import call_command  # NOQA
+from django.db import transaction  # NOQA
+
+from liquidb.db_tools import delete_all_migrations, delete_snapshot_rows  # NOQA
+from liquidb.models import MigrationSet, MigrationState, Snapshot  # NOQA
+
+SNAPSHOTS = 1000
+STATES_PER_SNAPSHOT = 1000
+
+
+def populate():
+    set_states = MigrationSet.states.through
+    for index in range(SNAPSHOTS):
+        states = MigrationState.objects.bulk_create(
+            [
+                MigrationState(
+                    uuid=uuid.uuid4(),
+                    migration_id=app,
+                    app=f"app_{app:04}",
+                    name=f"{index:04}_auto",
+                )
+                for app in range(STATES_PER_SNAPSHOT)
+            ]
+        )
+        migration_set = MigrationSet.objects.create(migration_hash=str(index))
+        set_states.objects.bulk_create(
+            [
+                set_states(migrationset=migration_set, migrationstate=state)
+                for state in states
+            ]
+        )
+        Snapshot.objects.create(
+            name=f"snapshot_{index}",
+            migration_hash=str(index),
+            migration_set=migration_set,
+        )
+
+
+def orm_delete():
+    Snapshot.objects.all().delete()
+    MigrationSet.objects.all().delete()
+    MigrationState.objects.all().delete()
+
+
+def bulk_delete():
+    delete_snapshot_rows(Snapshot.objects.filter(database="default"))
+    delete_all_migrations()
+
+
+def measure_once(label, func):
+    populate()
+    start = time.perf_counter()
+    with transaction.atomic():
+        func()
+    print(f"{label:<45} {(time.perf_counter() - start) * 1000:10.1f} ms")
+    assert not MigrationState.objects.exists()
+
+
+def main():
+    call_command("migrate", "liquidb", verbosity=0)
+    print(
+        f"Snapshots: {SNAPSHOTS}, migration states: {SNAPSHOTS * STATES_PER_SNAPSHOT}"
+    )
+    measure_once("QuerySet.delete (collector)", orm_delete)
+    measure_once("raw delete per table", bulk_delete)
+
+
+if __name__ == "__main__":
+    main()
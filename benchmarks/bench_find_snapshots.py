@@ -0,0 +1,92 @@
+"""
+Compare reverse lookup of snapshots containing migration (find_snapshots)
+with and without index of migration column in migration set table
+for 2M rows (2000 snapshots x 1000 apps).
+"""
+from benchmarks import measure, setup_django
+
+setup_django()
+
+# pylint: disable=wrong-import-position
+from django.core.management import call_command  # NOQA
+from django.db import connection  # NOQA
+
+from liquidb.db_tools import find_snapshots  # NOQA
+from liquidb.models import (  # NOQA
+    MigrationSet,
+    MigrationState,
+    Snapshot,
+    _migration_state_uuid,
+)
+
+SNAPSHOTS = 2000
+APPS = 1000
+VERSIONS = 20
+
+
+def _name(version):
+    return f"{version:04}_auto"
+
+
+def _version(snapshot, app):
+    # every app is changed once in 100 snapshots
+    return (snapshot // 100 + app) % VERSIONS
+
+
+def populate():
+    MigrationState.objects.bulk_create(
+        [
+            MigrationState(
+                uuid=_migration_state_uuid(f"app_{app:04}", _name(version)),
+                migration_id=app * VERSIONS + version,
+                app=f"app_{app:04}",
+                name=_name(version),
+            )
+            for app in range(APPS)
+            for version in range(VERSIONS)
+        ],
+        batch_size=5000,
+    )
+    set_states = MigrationSet.states.through
+    for index in range(SNAPSHOTS):
+        migration_set = MigrationSet.objects.create(migration_hash=str(index))
+        set_states.objects.bulk_create(
+            [
+                set_states(
+                    migrationset_id=migration_set.id,
+                    migrationstate_id=_migration_state_uuid(
+                        f"app_{app:04}", _name(_version(index, app))
+                    ),
+                )
+                for app in range(APPS)
+            ]
+        )
+        Snapshot.objects.create(
+            name=f"snapshot_{index}",
+            migration_hash=str(index),
+            migration_set=migration_set,
+        )
+
+
+def lookup():
+    return list(
+        find_snapshots("app_0500", _name(_version(0, 500))).values_list("id", flat=True)
+    )
+
+
+def main():
+    call_command("migrate", "liquidb", verbosity=0)
+    populate()
+    print(f"Migration set rows: {SNAPSHOTS * APPS}, found: {len(lookup())}")
+    measure("find_snapshots, migration index", lookup)
+    table = MigrationSet.states.through._meta.db_table
+    with connection.cursor() as cursor:
+        constraints = connection.introspection.get_constraints(cursor, table)
+        for index, constraint in constraints.items():
+            if constraint["index"] and constraint["columns"][0] == "migrationstate_id":
+                cursor.execute(f'DROP INDEX "{index}"')  # nosec
+    measure("find_snapshots, full scan", lookup, repeat=3)
+
+
+if __name__ == "__main__":
+    main()
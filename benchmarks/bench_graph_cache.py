@@ -0,0 +1,120 @@
+"""
+Compare migration executor startup with and without serialized graph
+on app with 3000 migration files.
+"""
+import os
+import shutil
+import sys
+import tempfile
+from unittest.mock import patch
+
+from benchmarks import measure, setup_django
+
+setup_django()
+
+# pylint: disable=wrong-import-position
+from django.db import connection  # NOQA
+from django.db.migrations.executor import MigrationExecutor  # NOQA
+from django.test import override_settings  # NOQA
+
+from liquidb.graph_cache import CachedMigrationExecutor  # NOQA
+
+MIGRATIONS = 3000
+PACKAGE = "bench_graph_migrations"
+
+_MIGRATION_TEMPLATE = """from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = {dependencies}
+
+    operations = [
+        migrations.AddField(
+            model_name="book",
+            name="field_{index}",
+            field=models.IntegerField(default=0),
+        ),
+    ]
+"""
+
+_INITIAL_MIGRATION = """from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    initial = True
+
+    operations = [
+        migrations.CreateModel(
+            name="Book",
+            fields=[("id", models.AutoField(primary_key=True))],
+        ),
+    ]
+"""
+
+
+def _migration_name(index):
+    return f"{index:04}_auto"
+
+
+def generate_migrations(directory):
+    package = os.path.join(directory, PACKAGE)
+    os.makedirs(package)
+    with open(os.path.join(package, "__init__.py"), "w", encoding="utf-8"):
+        pass
+    with open(
+        os.path.join(package, f"{_migration_name(0)}.py"), "w", encoding="utf-8"
+    ) as migration_file:
+        migration_file.write(_INITIAL_MIGRATION)
+    for index in range(1, MIGRATIONS):
+        dependencies = [("tests", _migration_name(index - 1))]
+        with open(
+            os.path.join(package, f"{_migration_name(index)}.py"),
+            "w",
+            encoding="utf-8",
+        ) as migration_file:
+            migration_file.write(
+                _MIGRATION_TEMPLATE.format(dependencies=dependencies, index=index)
+            )
+
+
+def _purge_modules():
+    """Simulate new process, migration modules should be imported again"""
+    for module_name in list(sys.modules):
+        if module_name.startswith(f"{PACKAGE}."):
+            del sys.modules[module_name]
+
+
+def main():
+    directory = tempfile.mkdtemp()
+    cache_dir = os.path.join(directory, "cache")
+    try:
+        generate_migrations(directory)
+        sys.path.insert(0, directory)
+        with override_settings(MIGRATION_MODULES={"tests": PACKAGE}), patch(
+            "liquidb.graph_cache.MIGRATION_GRAPH_CACHE_DIR", new=cache_dir
+        ):
+            print(f"Migration files: {MIGRATIONS}")
+
+            def django_executor():
+                _purge_modules()
+                MigrationExecutor(connection)
+
+            def cold_executor():
+                _purge_modules()
+                shutil.rmtree(cache_dir, ignore_errors=True)
+                CachedMigrationExecutor(connection)
+
+            def warm_executor():
+                _purge_modules()
+                CachedMigrationExecutor(connection)
+
+            measure("MigrationExecutor", django_executor)
+            measure("CachedMigrationExecutor, cold cache", cold_executor)
+            measure("CachedMigrationExecutor, warm cache", warm_executor)
+    finally:
+        sys.path.remove(directory)
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Compare plans that checkout builds before migrating (plan of snapshot
+targets and full plan from every leaf used by executor.migrate)
+for project with 300 apps where 2 apps are changed.
+"""
+from types import SimpleNamespace
+
+from benchmarks import measure, setup_django
+
+setup_django()
+
+# pylint: disable=wrong-import-position
+from django.db.migrations import Migration  # NOQA
+from django.db.migrations.executor import MigrationExecutor  # NOQA
+from django.db.migrations.graph import MigrationGraph  # NOQA
+
+from liquidb.graph_cache import CachedMigrationExecutor  # NOQA
+from liquidb.plan import minimal_plan  # NOQA
+
+APPS = 300
+MIGRATIONS = 20
+CHANGED_APPS = 2
+
+
+def _name(index):
+    return f"{index:04}_auto"
+
+
+def build_executor(executor_class=MigrationExecutor) -> MigrationExecutor:
+    """Executor of project where every migration is applied"""
+    graph = MigrationGraph()
+    for app_index in range(APPS):
+        app = f"app_{app_index}"
+        for index in range(1, MIGRATIONS + 1):
+            graph.add_node((app, _name(index)), Migration(_name(index), app))
+            if index > 1:
+                graph.add_dependency(None, (app, _name(index)), (app, _name(index - 1)))
+        if app_index:
+            # every app depends on previous one
+            graph.add_dependency(
+                None, (app, _name(1)), (f"app_{app_index - 1}", _name(MIGRATIONS))
+            )
+    executor = executor_class.__new__(executor_class)
+    executor.loader = SimpleNamespace(
+        graph=graph,
+        applied_migrations=dict(graph.nodes),
+        replace_migrations=True,
+    )
+    return executor
+
+
+def django_plans(executor, targets):
+    executor.migration_plan(targets)
+    executor.migration_plan(executor.loader.graph.leaf_nodes(), clean_start=True)
+
+
+def liquidb_plans(executor, targets):
+    minimal_plan(executor, targets)
+    executor.migration_plan(executor.loader.graph.leaf_nodes(), clean_start=True)
+
+
+def main():
+    executor = build_executor()
+    cached_executor = build_executor(CachedMigrationExecutor)
+    targets = [(f"app_{app_index}", _name(MIGRATIONS)) for app_index in range(APPS)]
+    # last apps are reverted, nothing depends on them
+    for app_index in range(APPS - CHANGED_APPS, APPS):
+        targets[app_index] = (f"app_{app_index}", _name(MIGRATIONS - 2))
+    assert minimal_plan(executor, targets) == executor.migration_plan(targets)
+    leaves = executor.loader.graph.leaf_nodes()
+    assert cached_executor.migration_plan(
+        leaves, clean_start=True
+    ) == executor.migration_plan(leaves, clean_start=True)
+    print(f"Apps: {APPS}, migrations: {APPS * MIGRATIONS}, changed: {CHANGED_APPS}")
+    measure(
+        "MigrationExecutor.migration_plan", lambda: executor.migration_plan(targets)
+    )
+    measure("minimal_plan", lambda: minimal_plan(executor, targets))
+    measure(
+        "MigrationExecutor, plan + full plan",
+        lambda: django_plans(executor, targets),
+        repeat=3,
+    )
+    measure(
+        "CachedMigrationExecutor, minimal + full plan",
+        lambda: liquidb_plans(cached_executor, targets),
+        repeat=3,
+    )
+
+
+if __name__ == "__main__":
+    main()
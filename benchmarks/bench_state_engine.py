@@ -0,0 +1,75 @@
+"""
+Compare ways to find latest applied migrations
+on migration table with 100k rows (500 apps x 200 migrations).
+"""
+from benchmarks import measure, setup_django
+
+setup_django()
+
+# pylint: disable=wrong-import-position
+from django.db import connection  # NOQA
+from django.db.migrations.graph import MigrationGraph  # NOQA
+from django.db.migrations.recorder import MigrationRecorder  # NOQA
+
+from liquidb.state import (  # NOQA
+    MigrationStateEngine,
+    get_latest_applied_migrations_qs,
+)
+
+APPS = 500
+MIGRATIONS_PER_APP = 200
+
+
+def _migration_name(index):
+    return f"{index:04}_auto"
+
+
+def populate_recorder():
+    recorder = MigrationRecorder(connection)
+    recorder.ensure_schema()
+    Migration = recorder.Migration
+    Migration.objects.bulk_create(
+        [
+            Migration(app=f"app_{app:03}", name=_migration_name(index))
+            for index in range(MIGRATIONS_PER_APP)
+            for app in range(APPS)
+        ],
+        batch_size=5000,
+    )
+
+
+def build_graph():
+    graph = MigrationGraph()
+    for app in range(APPS):
+        app_label = f"app_{app:03}"
+        for index in range(MIGRATIONS_PER_APP):
+            graph.add_node((app_label, _migration_name(index)), None)
+            if index:
+                graph.add_dependency(
+                    None,
+                    (app_label, _migration_name(index)),
+                    (app_label, _migration_name(index - 1)),
+                    skip_validation=True,
+                )
+    graph.validate_consistency()
+    return graph
+
+
+def main():
+    populate_recorder()
+    graph = build_graph()
+    engine = MigrationStateEngine()
+    graph_engine = MigrationStateEngine(graph=graph)
+    print(f"Migration table rows: {APPS * MIGRATIONS_PER_APP}")
+    measure(
+        "group by app + id__in subquery",
+        lambda: list(
+            get_latest_applied_migrations_qs().values_list("id", "app", "name")
+        ),
+    )
+    measure("window function (row_number per app)", engine.latest_by_id)
+    measure("streamed read + graph leaves", graph_engine.graph_leaves)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,24 +1,37 @@
+from unittest.mock import patch
+
 import pytest
 from django.contrib.auth.models import User
-from django.db import connection
+from django.db import DEFAULT_DB_ALIAS, connections
 from django.db.migrations.recorder import MigrationRecorder
 from django.test import Client
 
 from liquidb.db_tools import SnapshotCreationHandler, SnapshotHandlerException
 
 
+@pytest.fixture(scope="function", autouse=True)
+def _graph_cache_dir(tmp_path):
+    # migration graph of every test is cached in its own directory
+    with patch(
+        "liquidb.graph_cache.MIGRATION_GRAPH_CACHE_DIR", new=str(tmp_path / "graph")
+    ):
+        yield
+
+
 @pytest.fixture(scope="session")
 def django_db_setup(django_db_setup, django_db_blocker):
     with django_db_blocker.unblock():
         # Disable constraints for SQLLite
-        connection.disable_constraint_checking()
+        for connection in connections.all():
+            connection.disable_constraint_checking()
 
 
 @pytest.fixture(scope="function")
 def create_migration_state_fixture(django_db_blocker):
     # from django.db.backends.sqlite3 import schema
     # from django.db.backends.sqlite3 import base
-    def wrapper_fixture(test_migrations):
+    def wrapper_fixture(test_migrations, database=DEFAULT_DB_ALIAS):
+        connection = connections[database]
         recorder = MigrationRecorder(connection)
         Migration = recorder.Migration
         with django_db_blocker.unblock():
@@ -32,7 +45,7 @@ def create_migration_state_fixture(django_db_blocker):
                     app=app,
                     name=name,
                 )
-                m.save()
+                m.save(using=database)
 
     return wrapper_fixture
 
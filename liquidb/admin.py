@@ -1,20 +1,102 @@
+import re
+
 from django.urls import re_path
 from django.contrib import admin
 from django.contrib.admin import ModelAdmin
 from django.core.checks import messages
-from django.core.exceptions import ValidationError
+from django.core.exceptions import PermissionDenied, ValidationError
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import (
+    BooleanField,
+    Case,
+    Count,
+    IntegerField,
+    Max,
+    OuterRef,
+    Q,
+    Subquery,
+    Value,
+    When,
+)
+from django.db.models.functions import Coalesce
 from django.forms import ModelForm
-from django.http import HttpResponseRedirect
+from django.http import Http404, HttpResponseRedirect, JsonResponse
+from django.template.response import TemplateResponse
 from django.urls import reverse
-from django.utils.html import format_html
+from django.utils.html import format_html, format_html_join
+from django.utils.safestring import mark_safe
 
 from .db_tools import (
     SnapshotCheckoutHandler,
     SnapshotHandlerException,
     SnapshotCreationHandler,
+    delete_unreferenced_migrations,
+    find_snapshots,
 )
-from .models import Snapshot, MigrationState
+from .diff import diff_snapshot
+from .jobs import job_status, start_checkout_job
+from .models import CheckoutJob, MigrationSet, MigrationState, Snapshot
 from .settings import ADMIN_SNAPSHOT_ACTIONS
+from .state import cached_migration_state, get_current_migration_state
+
+# migrations rendered in change view, others are loaded by page
+MIGRATIONS_PER_PAGE = 100
+# search term that finds snapshots containing migration, "app.name" or "app: name"
+MIGRATION_SEARCH = re.compile(r"^(\w+)\s*[.:]\s*(\w+)$")
+
+
+def _count(states, field: str) -> Coalesce:
+    counted = (
+        states.order_by()
+        .annotate(group=Value(1))
+        .values("group")
+        .annotate(count=Count(field, distinct=True))
+        .values("count")
+    )
+    return Coalesce(Subquery(counted, output_field=IntegerField()), 0)
+
+
+def _migrations_count() -> Case:
+    """
+    Number of migrations in migration set of snapshot.
+    Keyframe stores all of them, app with unmerged branches has several.
+    Delta has all apps of its parent and one migration per app
+    (see liquidb.db_tools._split_delta), so it is number of apps in whole chain.
+    """
+    max_depth = MigrationSet.objects.aggregate(depth=Max("depth"))["depth"] or 0
+    chain = Q()
+    for depth in range(max_depth + 1):
+        chain |= Q(migration_sets=OuterRef("migration_set" + "__parent" * depth))
+    return Case(
+        When(
+            migration_set__parent__isnull=True,
+            then=_count(
+                MigrationState.objects.filter(migration_sets=OuterRef("migration_set")),
+                "uuid",
+            ),
+        ),
+        default=_count(MigrationState.objects.filter(chain), "app"),
+        output_field=IntegerField(),
+    )
+
+
+def _consistent(databases) -> Case:
+    """Snapshot is consistent if its hash is hash of current state of database"""
+    return Case(
+        *(
+            When(
+                database=database,
+                migration_hash=get_current_migration_state(
+                    connections[database]
+                ).migration_hash,
+                then=Value(True),
+            )
+            for database in databases
+        ),
+        default=Value(False),
+        output_field=BooleanField(),
+    )
 
 
 class SnapshotAdminModelForm(ModelForm):
@@ -63,40 +145,28 @@ class SnapshotAdminModelForm(ModelForm):
         pass
 
 
-class StateInline(admin.StackedInline):
-    model = MigrationState
-    can_delete = False
-    fk_name = "snapshot"
-
-    # <editor-fold desc="Should be always readonly">
-    def has_add_permission(self, request, obj=None):
-        return False
-
-    def has_change_permission(self, request, obj=None):
-        return False
-
-    def has_delete_permission(self, request, obj=None):
-        return False
-
-    # </editor-fold>
-
-
 @admin.register(Snapshot)
 class SnapshotAdminView(ModelAdmin):
     form = SnapshotAdminModelForm
     readonly_fields = (
+        "database",
         "created",
         "applied",
+        "migrations_count",
+        "consistent",
         "snapshot_actions",
+        "snapshot_migrations",
     )
     list_display = (
         "name",
+        "database",
         "applied",
+        "migrations_count",
+        "consistent",
         "snapshot_actions",
     )
-    inlines = [
-        StateInline,
-    ]
+    search_fields = ("name",)
+    search_help_text = "Snapshot name or migration as app.migration_name"
 
     # <editor-fold desc="Only View Permissions">
     # User should create and delete snapshots through cli
@@ -118,30 +188,190 @@ class SnapshotAdminView(ModelAdmin):
 
     # </editor-fold>
 
+    def changeform_view(self, request, object_id=None, form_url="", extra_context=None):
+        # form clean() and save() share one read of migration table
+        with cached_migration_state():
+            return super().changeform_view(request, object_id, form_url, extra_context)
+
+    def changelist_view(self, request, extra_context=None):
+        # state of every database is read once for all rows
+        with cached_migration_state():
+            return super().changelist_view(request, extra_context)
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        match = request.resolver_match
+        changelist = f"{self.opts.app_label}_{self.opts.model_name}_changelist"
+        if match is None or match.url_name != changelist:
+            # other views use one snapshot, see migrations_count and consistent
+            return queryset
+        databases = (
+            Snapshot.objects.order_by().values_list("database", flat=True).distinct()
+        )
+        return queryset.annotate(
+            migrations_count=_migrations_count(),
+            consistent=_consistent(databases),
+        )
+
+    def get_search_results(self, request, queryset, search_term):
+        results, may_have_duplicates = super().get_search_results(
+            request, queryset, search_term
+        )
+        match = MIGRATION_SEARCH.match(search_term.strip())
+        if match is None:
+            return results, may_have_duplicates
+        # names like "v1.2" look like migration, so name search is kept too,
+        # reverse lookup by migration, see liquidb.db_tools.find_snapshots
+        snapshots = find_snapshots(*match.groups()).values("id")
+        return results | queryset.filter(id__in=snapshots), may_have_duplicates
+
     def get_urls(self):
         urls = super().get_urls()
-        custom_urls = []
+        custom_urls = [
+            re_path(
+                r"^(?P<snapshot_id>.+)/migrations/$",
+                self.admin_site.admin_view(self.snapshot_migrations_page),
+                name="snapshot_migrations",
+            ),
+            re_path(
+                r"^(?P<snapshot_id>.+)/diff/$",
+                self.admin_site.admin_view(self.snapshot_diff),
+                name="snapshot_diff",
+            ),
+        ]
         if ADMIN_SNAPSHOT_ACTIONS:
-            custom_urls.append(
-                re_path(
-                    r"^(?P<snapshot_id>.+)/apply/$",
-                    self.admin_site.admin_view(self.apply_snapshot),
-                    name="apply_snapshot",
-                )
+            custom_urls.extend(
+                [
+                    re_path(
+                        r"^jobs/(?P<job_id>\d+)/$",
+                        self.admin_site.admin_view(self.checkout_job),
+                        name="checkout_job",
+                    ),
+                    re_path(
+                        r"^jobs/(?P<job_id>\d+)/status/$",
+                        self.admin_site.admin_view(self.checkout_job_status),
+                        name="checkout_job_status",
+                    ),
+                    re_path(
+                        r"^(?P<snapshot_id>.+)/apply/$",
+                        self.admin_site.admin_view(self.apply_snapshot),
+                        name="apply_snapshot",
+                    ),
+                ]
             )
         return custom_urls + urls
 
     def snapshot_actions(self, obj):
-        if ADMIN_SNAPSHOT_ACTIONS and obj.pk is not None and not obj.applied:
+        if obj.pk is None or obj.applied:
+            return ""
+        diff = format_html(
+            '<a class="button" href="{}">Diff</a>&nbsp;',
+            reverse("admin:snapshot_diff", args=[obj.pk]),
+        )
+        if ADMIN_SNAPSHOT_ACTIONS:
             return format_html(
-                '<a class="button" href="{}">Apply Snapshot</a>&nbsp;',
+                '<a class="button" href="{}">Apply Snapshot</a>&nbsp;{}',
                 reverse("admin:apply_snapshot", args=[obj.pk]),
+                diff,
             )
-        return ""
+        return diff
 
     snapshot_actions.short_description = "Snapshot Actions"
     snapshot_actions.allow_tags = True
 
+    def migrations_count(self, obj):
+        if obj.pk is None:
+            return None
+        if not hasattr(obj, "migrations_count"):
+            # annotated only in changelist
+            obj.migrations_count = obj.migrations.count()
+        return obj.migrations_count
+
+    migrations_count.short_description = "Migrations"
+    migrations_count.admin_order_field = "migrations_count"
+
+    def consistent(self, obj):
+        if obj.pk is None:
+            return None
+        if not hasattr(obj, "consistent"):
+            obj.consistent = obj.consistent_state
+        return obj.consistent
+
+    consistent.short_description = "Consistent"
+    consistent.boolean = True
+    consistent.admin_order_field = "consistent"
+
+    def snapshot_migrations(self, obj):
+        if obj.pk is None:
+            return ""
+        migrations = obj.migrations.order_by("app", "name").values_list("app", "name")
+        rendered = format_html_join(
+            mark_safe("<br>"), "{}: {}", migrations[:MIGRATIONS_PER_PAGE]
+        )
+        count = self.migrations_count(obj)
+        if count <= MIGRATIONS_PER_PAGE:
+            return rendered
+        # rest is loaded only on demand
+        return format_html(
+            '{}<br><a href="{}?page=2">Next migrations of {}</a>',
+            rendered,
+            reverse("admin:snapshot_migrations", args=[obj.pk]),
+            count,
+        )
+
+    snapshot_migrations.short_description = "Migrations"
+
+    def snapshot_migrations_page(
+        self, request, snapshot_id, *args, **kwargs
+    ):  # pylint: disable=unused-argument
+        snapshot = self.get_object(request, snapshot_id)
+        if snapshot is None:
+            raise Http404(f"Snapshot {snapshot_id} doesn't exist")
+        if not self.has_view_or_change_permission(request, snapshot):
+            raise PermissionDenied
+        migrations = snapshot.migrations.order_by("app", "name").values_list(
+            "app", "name"
+        )
+        paginator = Paginator(migrations, MIGRATIONS_PER_PAGE)
+        page = paginator.get_page(request.GET.get("page"))
+        return JsonResponse(
+            {
+                "count": paginator.count,
+                "page": page.number,
+                "num_pages": paginator.num_pages,
+                "migrations": [list(migration) for migration in page],
+            }
+        )
+
+    def snapshot_diff(
+        self, request, snapshot_id, *args, **kwargs
+    ):  # pylint: disable=unused-argument
+        snapshot = self.get_object(request, snapshot_id)
+        if snapshot is None:
+            raise Http404(f"Snapshot {snapshot_id} doesn't exist")
+        if not self.has_view_or_change_permission(request, snapshot):
+            raise PermissionDenied
+        applied = Snapshot.objects.filter(
+            database=snapshot.database, applied=True
+        ).first()
+        against = request.GET.get("against", "applied")
+        compared = applied if against == "applied" else None
+        if compared is None:
+            compared_to = f"migration table of {snapshot.database} database"
+        else:
+            compared_to = f"applied snapshot {compared.name}"
+        context = {
+            **self.admin_site.each_context(request),
+            "title": f"Diff of {snapshot.name}",
+            "opts": self.model._meta,
+            "object": snapshot,
+            "applied": applied,
+            "compared_to": compared_to,
+            "changes": list(diff_snapshot(snapshot, compared)),
+        }
+        return TemplateResponse(request, "admin/liquidb/snapshot/diff.html", context)
+
+    @cached_migration_state()
     def apply_snapshot(
         self, request, snapshot_id, *args, **kwargs
     ):  # pylint: disable=unused-argument
@@ -161,8 +391,8 @@ class SnapshotAdminView(ModelAdmin):
             return HttpResponseRedirect(reversed_url)
 
         try:
-            # TODO change to apply without force True
-            handler.checkout(force=True)
+            # checkout could take longer than request, see liquidb.jobs
+            job = start_checkout_job(snapshot)
         except SnapshotHandlerException as e:
             self.message_user(
                 request,
@@ -171,9 +401,49 @@ class SnapshotAdminView(ModelAdmin):
             )
             return HttpResponseRedirect(reversed_url)
 
-        self.message_user(request, f"Successfully applied {snapshot.name}")
-        return HttpResponseRedirect(reversed_url)
+        self.message_user(request, f"Checkout to {snapshot.name} is started")
+        return HttpResponseRedirect(
+            reverse(
+                "admin:checkout_job", args=[job.pk], current_app=self.admin_site.name
+            )
+        )
+
+    def _get_job(self, request, job_id) -> CheckoutJob:
+        job = (
+            CheckoutJob.objects.select_related("snapshot", "journal")
+            .filter(pk=job_id)
+            .first()
+        )
+        if job is None:
+            raise Http404(f"Checkout job {job_id} doesn't exist")
+        if not self.has_view_or_change_permission(request, job.snapshot):
+            raise PermissionDenied
+        return job
+
+    def checkout_job(
+        self, request, job_id, *args, **kwargs
+    ):  # pylint: disable=unused-argument
+        job = self._get_job(request, job_id)
+        context = {
+            **self.admin_site.each_context(request),
+            "title": f"Checkout to {job.snapshot.name}",
+            "opts": self.model._meta,
+            "object": job.snapshot,
+            "job": job_status(job),
+            "status_url": reverse(
+                "admin:checkout_job_status",
+                args=[job.pk],
+                current_app=self.admin_site.name,
+            ),
+        }
+        return TemplateResponse(request, "admin/liquidb/snapshot/job.html", context)
+
+    def checkout_job_status(
+        self, request, job_id, *args, **kwargs
+    ):  # pylint: disable=unused-argument
+        return JsonResponse(job_status(self._get_job(request, job_id)))
 
     def delete_model(self, request, obj=None):
-        # delete snapshot and all related MigrationState
+        # delete snapshot and MigrationState not used by other snapshots
         super().delete_model(request, obj)
+        delete_unreferenced_migrations()
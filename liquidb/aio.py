@@ -0,0 +1,125 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, NamedTuple, Optional
+
+import django
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import DEFAULT_DB_ALIAS, connections, router
+
+from liquidb.db_tools import (
+    SnapshotCheckoutHandler,
+    SnapshotCreationHandler,
+    SnapshotHandlerException,
+    _runs_in_thread,
+)
+from liquidb.diff import AppDiff, diff_snapshot
+from liquidb.models import CheckoutJournal, Snapshot
+from liquidb.state import cached_migration_state, get_current_migration_state
+
+if django.VERSION < (4, 1):
+    # aget, afirst and aexists of querysets
+    raise ImportError("liquidb.aio requires Django 4.1 or later")
+
+# migrations of several databases are run at the same time
+# without blocking event loop and threads of django async ORM
+_executor = ThreadPoolExecutor(thread_name_prefix="liquidb")
+
+
+class DatabaseStatus(NamedTuple):
+    database: str
+    applied: Optional[Snapshot]
+    # applied snapshot has all migrations of migration table
+    consistent: bool
+    # unfinished checkout, see liquidb.journal
+    journal: Optional[CheckoutJournal]
+
+
+def _blocking(database: str, func, *args, **kwargs):
+    """Run sync func in thread of executor, connections are opened per thread"""
+    # in memory sqlite is visible only to connection of calling thread
+    thread_sensitive = not _runs_in_thread(database, router.db_for_write(Snapshot))
+
+    def run():
+        try:
+            with cached_migration_state():
+                return func(*args, **kwargs)
+        finally:
+            if not thread_sensitive:
+                connections.close_all()
+
+    if thread_sensitive:
+        return sync_to_async(run, thread_sensitive=True)()
+    return sync_to_async(run, thread_sensitive=False, executor=_executor)()
+
+
+async def _aget_snapshot(name: str, database: str) -> Snapshot:
+    try:
+        return await Snapshot.objects.aget(name=name, database=database)
+    except ObjectDoesNotExist as error:
+        raise SnapshotHandlerException(
+            f'Snapshot with name: "{name}" doesn\'t exists in database "{database}"'
+        ) from error
+
+
+async def acreate(
+    name: str, database: str = DEFAULT_DB_ALIAS, overwrite: bool = False
+) -> Optional[Snapshot]:
+    """Create snapshot of database, None if applied snapshot has the same state"""
+    handler = SnapshotCreationHandler(name, overwrite, database)
+    created = await _blocking(database, handler.create)
+    return handler.snapshot if created else None
+
+
+async def acheckout(
+    name: str,
+    database: str = DEFAULT_DB_ALIAS,
+    force: bool = False,
+    physical: bool = False,
+    atomic: bool = False,
+) -> Snapshot:  # pylint: disable=too-many-arguments
+    """Checkout database to snapshot with given name, return the snapshot"""
+    snapshot = await _aget_snapshot(name, database)
+    if not await Snapshot.objects.filter(database=database, applied=True).aexists():
+        raise SnapshotHandlerException("No applied snapshot present")
+    handler = SnapshotCheckoutHandler(snapshot, physical=physical, atomic=atomic)
+    await _blocking(database, handler.checkout, force=force)
+    return snapshot
+
+
+def _current_hash(database: str) -> str:
+    return get_current_migration_state(connections[database]).migration_hash
+
+
+async def astatus(database: str = DEFAULT_DB_ALIAS) -> DatabaseStatus:
+    """Applied snapshot of database and its consistency with migration table"""
+    applied = await (
+        Snapshot.objects.filter(database=database, applied=True)
+        .order_by("-id")
+        .afirst()
+    )
+    journal = await (
+        CheckoutJournal.objects.filter(
+            database=database, status=CheckoutJournal.RUNNING
+        )
+        .select_related("snapshot")
+        .order_by("-id")
+        .afirst()
+    )
+    consistent = False
+    if applied is not None:
+        current_hash = await _blocking(database, _current_hash, database)
+        consistent = applied.migration_hash == current_hash
+    return DatabaseStatus(database, applied, consistent, journal)
+
+
+async def adiff(
+    name: str, database: str = DEFAULT_DB_ALIAS, against: Optional[str] = None
+) -> List[AppDiff]:
+    """
+    Apps changed by applying snapshot, compared to snapshot
+    with name against or to migration table if it is None.
+    """
+    snapshot = await _aget_snapshot(name, database)
+    other = None if against is None else await _aget_snapshot(against, database)
+    # deltas are resolved by several queries of one walk
+    return await _blocking(database, lambda: list(diff_snapshot(snapshot, other)))
@@ -1,7 +1,28 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_delete, post_migrate, pre_migrate
 
 from liquidb.consts import SELF_NAME
+from liquidb.settings import AUTO_SNAPSHOT
+from liquidb.state import invalidate_on_migrate
 
 
 class LiquidbDjangoConfig(AppConfig):
     name = SELF_NAME
+
+    def ready(self):
+        pre_migrate.connect(invalidate_on_migrate, dispatch_uid="liquidb_pre_migrate")
+        post_migrate.connect(invalidate_on_migrate, dispatch_uid="liquidb_post_migrate")
+        # pylint: disable=import-outside-toplevel
+        from liquidb.physical import drop_physical_copy
+
+        post_delete.connect(
+            drop_physical_copy,
+            sender=self.get_model("PhysicalCopy"),
+            dispatch_uid="liquidb_drop_physical_copy",
+        )
+        if AUTO_SNAPSHOT:
+            from liquidb.auto_snapshot import create_snapshot_after_migrate
+
+            post_migrate.connect(
+                create_snapshot_after_migrate, dispatch_uid="liquidb_auto_snapshot"
+            )
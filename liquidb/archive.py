@@ -0,0 +1,369 @@
+import json
+from collections import Counter, defaultdict
+from functools import partial
+from itertools import groupby, islice
+from operator import itemgetter
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+from django.db import router, transaction
+from django.utils.dateparse import parse_datetime
+
+from liquidb.db_tools import delete_unreferenced_migrations
+from liquidb.models import MigrationSet, MigrationState, Snapshot
+from liquidb.settings import SNAPSHOT_KEYFRAME_INTERVAL
+
+# version of archive format, increased on incompatible change
+FORMAT_VERSION = 1
+
+MIGRATION_STATE = "migration_state"
+MIGRATION_SET = "migration_set"
+SNAPSHOT = "snapshot"
+
+
+class ArchiveException(Exception):
+    def __init__(self, error):
+        self.error = error
+        super().__init__()
+
+
+def _chunks(iterable: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _exported_set_ids(snapshots: "QuerySet[Snapshot]", chunk_size: int) -> List[int]:
+    """Sets of snapshots with parents of deltas, parents go first"""
+    found = set()
+    frontier = set(snapshots.values_list("migration_set_id", flat=True)) - {None}
+    while frontier:
+        found |= frontier
+        parents = set()
+        for chunk in _chunks(frontier, chunk_size):
+            parents.update(
+                MigrationSet.objects.using(snapshots.db)
+                .filter(id__in=chunk, parent__isnull=False)
+                .values_list("parent_id", flat=True)
+            )
+        frontier = parents - found
+    # parent set (delta) is always less deep than its children
+    ordered = []
+    for chunk in _chunks(found, chunk_size):
+        ordered.extend(
+            MigrationSet.objects.using(snapshots.db)
+            .filter(id__in=chunk)
+            .values_list("depth", "id")
+        )
+    return [set_id for _, set_id in sorted(ordered)]
+
+
+def _export_states(set_ids: List[int], using: str, chunk_size: int) -> Iterator[dict]:
+    set_states = MigrationSet.states.through.objects.using(using)
+    state_ids = set()
+    for chunk in _chunks(set_ids, chunk_size):
+        state_ids.update(
+            set_states.filter(migrationset_id__in=chunk).values_list(
+                "migrationstate_id", flat=True
+            )
+        )
+    for chunk in _chunks(sorted(state_ids), chunk_size):
+        states = (
+            MigrationState.objects.using(using)
+            .filter(uuid__in=chunk)
+            .order_by("uuid")
+            .values_list("uuid", "migration_id", "app", "name")
+        )
+        for uuid, migration_id, app, name in states:
+            yield {
+                "type": MIGRATION_STATE,
+                "uuid": str(uuid),
+                "migration_id": migration_id,
+                "app": app,
+                "name": name,
+            }
+
+
+def _export_sets(set_ids: List[int], using: str, chunk_size: int) -> Iterator[dict]:
+    for chunk in _chunks(set_ids, chunk_size):
+        set_states = defaultdict(list)
+        rows = (
+            MigrationSet.states.through.objects.using(using)
+            .filter(migrationset_id__in=chunk)
+            .values_list("migrationset_id", "migrationstate_id")
+        )
+        for set_id, state_id in rows:
+            set_states[set_id].append(str(state_id))
+        migration_sets = (
+            MigrationSet.objects.using(using)
+            .filter(id__in=chunk)
+            .values_list("id", "migration_hash", "parent__migration_hash", "depth")
+        )
+        # keep order of chunk, parents first
+        by_id = {set_id: rest for set_id, *rest in migration_sets}
+        for set_id in chunk:
+            migration_hash, parent_hash, depth = by_id[set_id]
+            yield {
+                "type": MIGRATION_SET,
+                "migration_hash": migration_hash,
+                "parent": parent_hash,
+                "depth": depth,
+                "states": sorted(set_states[set_id]),
+            }
+
+
+def _export_snapshots(
+    snapshots: "QuerySet[Snapshot]", chunk_size: int
+) -> Iterator[dict]:
+    snapshots = (
+        snapshots.order_by("id")
+        .values_list(
+            "name",
+            "database",
+            "created",
+            "applied",
+            "migration_hash",
+            "migration_set__migration_hash",
+            "parent__name",
+        )
+        .iterator(chunk_size=chunk_size)
+    )
+    for name, database, created, applied, migration_hash, set_hash, parent in snapshots:
+        yield {
+            "type": SNAPSHOT,
+            "name": name,
+            "database": database,
+            "created": created.isoformat(),
+            "applied": applied,
+            "migration_hash": migration_hash,
+            "migration_set": set_hash,
+            "parent": parent,
+        }
+
+
+def export_history(databases: List[str], chunk_size: int = 1000) -> Iterator[dict]:
+    """
+    Records of snapshot history of databases, rows are read by chunks.
+    Migrations are written before sets and sets before snapshots that use them,
+    only sets and migrations used by exported snapshots are written.
+    """
+    # history of every database is stored where Snapshot is routed
+    using = router.db_for_read(Snapshot)
+    snapshots = Snapshot.objects.using(using).filter(database__in=databases)
+    set_ids = _exported_set_ids(snapshots, chunk_size)
+    yield {"type": "header", "version": FORMAT_VERSION}
+    yield from _export_states(set_ids, using, chunk_size)
+    yield from _export_sets(set_ids, using, chunk_size)
+    yield from _export_snapshots(snapshots, chunk_size)
+
+
+def write_history(output, records: Iterable[dict]) -> int:
+    """Write records as json lines, return number of written records"""
+    written = 0
+    for record in records:
+        output.write(json.dumps(record))
+        output.write("\n")
+        written += 1
+    return written
+
+
+def read_history(lines: Iterable[str]) -> Iterator[dict]:
+    for line in lines:
+        if line.strip():
+            yield json.loads(line)
+
+
+def _import_states(chunk: List[dict]) -> int:
+    existing = {
+        str(uuid)
+        for uuid in MigrationState.objects.filter(
+            uuid__in=[record["uuid"] for record in chunk]
+        ).values_list("uuid", flat=True)
+    }
+    new = [
+        MigrationState(
+            uuid=record["uuid"],
+            migration_id=record["migration_id"],
+            app=record["app"],
+            name=record["name"],
+        )
+        for record in chunk
+        if record["uuid"] not in existing
+    ]
+    MigrationState.objects.bulk_create(new, ignore_conflicts=True)
+    return len(new)
+
+
+def _set_ids(hashes) -> Dict[str, int]:
+    return dict(
+        MigrationSet.objects.filter(migration_hash__in=hashes).values_list(
+            "migration_hash", "id"
+        )
+    )
+
+
+def _local_sets(hashes) -> Dict[str, Tuple[int, int]]:
+    """migration_hash -> (id, depth) of sets already saved"""
+    return {
+        migration_hash: (set_id, depth)
+        for migration_hash, set_id, depth in MigrationSet.objects.filter(
+            migration_hash__in=hashes
+        ).values_list("migration_hash", "id", "depth")
+    }
+
+
+def _keyframe_states(parent_id: int, state_ids: List[str]) -> List[str]:
+    """All migrations of delta with given parent and changed migrations"""
+    apps = set(
+        MigrationState.objects.filter(uuid__in=state_ids).values_list("app", flat=True)
+    )
+    parent = MigrationSet.objects.get(pk=parent_id)
+    inherited = parent.migrations.exclude(app__in=apps).values_list("uuid", flat=True)
+    return [str(uuid) for uuid in inherited] + state_ids
+
+
+def _import_sets(chunk: List[dict]) -> int:
+    local = _local_sets(
+        {record["migration_hash"] for record in chunk}
+        | {record["parent"] for record in chunk if record["parent"]}
+    )
+    new = [record for record in chunk if record["migration_hash"] not in local]
+    set_states = MigrationSet.states.through
+    # parent of set could be in the same chunk with smaller depth
+    for _depth, group in groupby(new, key=itemgetter("depth")):
+        group = list(group)
+        migration_sets = []
+        states = {}
+        for record in group:
+            migration_hash, parent = record["migration_hash"], record["parent"]
+            if parent and parent not in local:
+                raise ArchiveException(
+                    f"Parent of migration set {migration_hash} is missing"
+                )
+            parent_id, parent_depth = local[parent] if parent else (None, -1)
+            # exported depth is wrong if parent matched set of other depth
+            depth = parent_depth + 1
+            states[migration_hash] = record["states"]
+            if depth >= SNAPSHOT_KEYFRAME_INTERVAL:
+                states[migration_hash] = _keyframe_states(parent_id, record["states"])
+                parent_id, depth = None, 0
+            migration_sets.append(
+                MigrationSet(
+                    migration_hash=migration_hash, parent_id=parent_id, depth=depth
+                )
+            )
+        MigrationSet.objects.bulk_create(migration_sets)
+        local.update(_local_sets(list(states)))
+        set_states.objects.bulk_create(
+            [
+                set_states(
+                    migrationset_id=local[migration_hash][0],
+                    migrationstate_id=state_id,
+                )
+                for migration_hash, state_ids in states.items()
+                for state_id in state_ids
+            ],
+            batch_size=1000,
+        )
+    return len(new)
+
+
+def _import_snapshots(chunk: List[dict], databases: List[str]) -> int:
+    chunk = [record for record in chunk if record["database"] in databases]
+    snapshots = Snapshot.objects.filter(database__in=databases)
+    existing_hashes = set(
+        snapshots.filter(
+            migration_hash__in=[record["migration_hash"] for record in chunk]
+        ).values_list("database", "migration_hash")
+    )
+    existing_names = set(
+        snapshots.filter(name__in=[record["name"] for record in chunk]).values_list(
+            "database", "name"
+        )
+    )
+    set_ids = _set_ids({record["migration_set"] for record in chunk})
+    new = []
+    for record in chunk:
+        by_hash = (record["database"], record["migration_hash"])
+        by_name = (record["database"], record["name"])
+        if by_hash in existing_hashes or by_name in existing_names:
+            continue
+        if record["migration_set"] not in set_ids:
+            raise ArchiveException(
+                f"Migration set of snapshot {record['name']} is missing"
+            )
+        existing_hashes.add(by_hash)
+        existing_names.add(by_name)
+        new.append(record)
+    Snapshot.objects.bulk_create(
+        [
+            Snapshot(
+                name=record["name"],
+                database=record["database"],
+                created=parse_datetime(record["created"]),
+                # applied snapshot belongs to environment of export
+                applied=False,
+                migration_hash=record["migration_hash"],
+                migration_set_id=set_ids[record["migration_set"]],
+            )
+            for record in new
+        ]
+    )
+    # parent is linked if it is imported before or exists already
+    with_parent = [record for record in new if record["parent"]]
+    ids = {
+        (database, name): snapshot_id
+        for database, name, snapshot_id in snapshots.filter(
+            name__in={record["name"] for record in with_parent}
+            | {record["parent"] for record in with_parent}
+        ).values_list("database", "name", "id")
+    }
+    Snapshot.objects.bulk_update(
+        [
+            Snapshot(
+                id=ids[(record["database"], record["name"])],
+                parent_id=ids[(record["database"], record["parent"])],
+            )
+            for record in with_parent
+            if (record["database"], record["parent"]) in ids
+        ],
+        ["parent"],
+        batch_size=1000,
+    )
+    return len(new)
+
+
+def import_history(
+    records: Iterable[dict], databases: List[str], chunk_size: int = 1000
+) -> Counter:
+    """
+    Insert records of export_history by chunks, every chunk in own transaction.
+    Existing rows and snapshots with already saved migration hash are skipped,
+    so interrupted import could be started again.
+    """
+    records = iter(records)
+    header = next(records, None)
+    if header is None or header.get("type") != "header":
+        raise ArchiveException("File is not an export of liquidb snapshots")
+    if header.get("version") != FORMAT_VERSION:
+        raise ArchiveException(
+            f"Unsupported version {header.get('version')} of snapshots export"
+        )
+    importers = {
+        MIGRATION_STATE: _import_states,
+        MIGRATION_SET: _import_sets,
+        SNAPSHOT: partial(_import_snapshots, databases=databases),
+    }
+    imported = Counter()
+    for record_type, group in groupby(records, key=itemgetter("type")):
+        importer = importers.get(record_type)
+        if importer is None:
+            raise ArchiveException(f"Unknown record type {record_type}")
+        for chunk in _chunks(group, chunk_size):
+            with transaction.atomic():
+                imported[record_type] += importer(chunk)
+    # sets of skipped snapshots are not used by anything
+    delete_unreferenced_migrations()
+    return imported
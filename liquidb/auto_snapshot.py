@@ -0,0 +1,61 @@
+import sys
+
+from django.apps import apps
+from django.db import connections, router
+from django.utils.crypto import get_random_string
+from django.utils.timezone import now
+
+from liquidb.db_tools import SnapshotCreationHandler, SnapshotHandlerException
+from liquidb.models import Snapshot, _generate_commit_name
+from liquidb.settings import AUTO_SNAPSHOT_NAME
+
+
+def _is_last_signal(app_config) -> bool:
+    """post_migrate is sent for every app with models, see emit_post_migrate_signal"""
+    with_models = [
+        config for config in apps.get_app_configs() if config.models_module is not None
+    ]
+    return bool(with_models) and with_models[-1] is app_config
+
+
+def snapshot_name(database: str) -> str:
+    """Name of automatic snapshot, see AUTO_SNAPSHOT_NAME setting"""
+    if AUTO_SNAPSHOT_NAME is None:
+        return _generate_commit_name()
+    return AUTO_SNAPSHOT_NAME.format(
+        date=now().strftime("%d-%m-%YT%H:%M:%S"),
+        database=database,
+        salt=get_random_string(6),
+    )
+
+
+def create_snapshot_after_migrate(
+    sender, app_config=None, verbosity=1, using=None, plan=None, **kwargs
+):  # pylint: disable=unused-argument
+    """
+    Receiver of post_migrate, snapshot is created once per migrate command
+    after signal of last app and only if migrate applied something.
+    """
+    if not plan or not _is_last_signal(app_config):
+        # flush sends post_migrate without plan
+        return
+    connection_obj = connections[using]
+    if not router.allow_migrate_model(using, Snapshot):
+        return
+    with connection_obj.cursor() as cursor:
+        tables = connection_obj.introspection.table_names(cursor)
+    if Snapshot._meta.db_table not in tables:
+        # liquidb is not migrated yet
+        return
+    # plan has only migrations of this run and apps is model state, state is
+    # read from migration table once (graph comes from CachedMigrationLoader)
+    name = snapshot_name(using)
+    handler = SnapshotCreationHandler(name, False, database=using)
+    try:
+        created = handler.create()
+    except SnapshotHandlerException as error:
+        # migrations are applied already, only snapshot is missing
+        sys.stderr.write(f"Snapshot is not created: {error.error}\n")
+        return
+    if created and verbosity >= 1:
+        sys.stdout.write(f'Snapshot "{name}" successfully save\n')
@@ -1,10 +1,47 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
+from contextvars import copy_context
+from typing import List, Optional, Tuple
+
 from django.core.exceptions import ObjectDoesNotExist
-from django.db import transaction, connection
+from django.db import DEFAULT_DB_ALIAS, connections, router, transaction
 from django.db.migrations.exceptions import NodeNotFoundError
-from django.db.migrations.executor import MigrationExecutor
-from django.db.migrations.state import ProjectState
+from django.db.models import Q
 
-from liquidb.models import Snapshot, MigrationState, get_latest_applied_migrations_qs
+from liquidb.journal import (
+    JournalRecorder,
+    complete_journal,
+    remaining_plan,
+    running_journal,
+    start_journal,
+)
+from liquidb.models import (
+    CheckoutJob,
+    CheckoutJournal,
+    MigrationTiming,
+    PhysicalCopy,
+    Snapshot,
+    MigrationSet,
+    MigrationState,
+    _migration_state_uuid,
+)
+from liquidb.graph_cache import CachedMigrationExecutor
+from liquidb.parallel import migrate_plan
+from liquidb.physical import (
+    PhysicalCopyException,
+    create_physical_copy,
+    restore_physical_copy,
+)
+from liquidb.plan import CheckoutPlanner, PlanStep, minimal_plan
+from liquidb.progress import JSON, TEXT, CheckoutProgress, chain_callbacks
+from liquidb.settings import SNAPSHOT_KEYFRAME_INTERVAL
+from liquidb.state import (
+    AppliedMigrations,
+    get_current_migration_state,
+    invalidate_migration_state,
+)
+from liquidb.timings import MigrationTimer, estimate_durations
 
 
 class SnapshotHandlerException(Exception):
@@ -13,18 +50,219 @@ class SnapshotHandlerException(Exception):
         super().__init__()
 
 
-class SnapshotCheckoutHandler:
-    def __init__(self, snapshot: Snapshot, output=None):
+def _split_delta(
+    current_state: AppliedMigrations, parent: Optional[MigrationSet]
+) -> Tuple[Optional[MigrationSet], list]:
+    """
+    Return parent and migrations that should be stored in new set.
+    Without parent all migrations are stored (keyframe).
+    """
+    migrations = list(current_state.migrations)
+    if parent is None or parent.depth + 1 >= SNAPSHOT_KEYFRAME_INTERVAL:
+        return None, migrations
+    parent_rows = list(parent.migrations.values_list("app", "uuid"))
+    parent_states = dict(parent_rows)
+    current_apps = {app for _, app, _ in migrations}
+    if len(parent_states) < len(parent_rows) or len(current_apps) < len(migrations):
+        # app with unmerged branches has several leaves, delta expresses
+        # changes of one migration per app, so all migrations are stored
+        return None, migrations
+    if not current_apps.issuperset(parent_states):
+        # some app is unapplied completely, delta can't express it
+        return None, migrations
+    changed = [
+        (migration_id, app, name)
+        for migration_id, app, name in migrations
+        if parent_states.get(app) != _migration_state_uuid(app, name)
+    ]
+    return parent, changed
+
+
+def _get_or_create_migration_set(
+    current_state: AppliedMigrations, parent: Optional[MigrationSet] = None
+) -> MigrationSet:
+    """Return stored set of given migrations, insert it only if it is new"""
+    migration_set = MigrationSet.objects.filter(
+        migration_hash=current_state.migration_hash
+    ).first()
+    if migration_set is not None:
+        # content addressed, nothing to insert
+        return migration_set
+
+    parent, to_store = _split_delta(current_state, parent)
+    migration_set = MigrationSet.objects.create(
+        migration_hash=current_state.migration_hash,
+        parent=parent,
+        depth=0 if parent is None else parent.depth + 1,
+    )
+    MigrationState.objects.bulk_create(
+        [
+            MigrationState(
+                uuid=_migration_state_uuid(app, name),
+                migration_id=migration_id,
+                app=app,
+                name=name,
+            )
+            for migration_id, app, name in to_store
+        ],
+        batch_size=1000,
+        # same migration could be already saved by other set
+        ignore_conflicts=True,
+    )
+    set_states = MigrationSet.states.through
+    set_states.objects.bulk_create(
+        [
+            set_states(
+                migrationset_id=migration_set.id,
+                migrationstate_id=_migration_state_uuid(app, name),
+            )
+            for _, app, name in to_store
+        ],
+        batch_size=1000,
+    )
+    return migration_set
+
+
+def _raw_delete(queryset) -> int:
+    """Delete rows with single statement, related rows are not collected"""
+    return queryset._raw_delete(queryset.db)  # pylint: disable=protected-access
+
+
+def delete_unreferenced_migrations() -> int:
+    """Delete migration sets and migrations not used by any snapshot"""
+    set_states = MigrationSet.states.through
+    while True:
+        # sets used as parent of delta are kept
+        # they are deleted after all their children
+        unreferenced = MigrationSet.objects.filter(
+            snapshots__isnull=True, children__isnull=True
+        )
+        _raw_delete(set_states.objects.filter(migrationset__in=unreferenced))
+        if not _raw_delete(unreferenced):
+            break
+    return _raw_delete(MigrationState.objects.filter(migration_sets__isnull=True))
+
+
+def delete_all_migrations() -> int:
+    """Delete all migration sets and migrations, no snapshot should be left"""
+    _raw_delete(MigrationSet.states.through.objects.all())
+    # children of delta first
+    _raw_delete(MigrationSet.objects.all())
+    return _raw_delete(MigrationState.objects.all())
+
+
+def delete_snapshot_rows(snapshots: "QuerySet[Snapshot]") -> int:
+    """
+    Delete snapshots of queryset and rows referencing them with one statement
+    per table, only ids of snapshots are loaded. Should run inside transaction.
+    """
+    related = {"snapshot__in": snapshots}
+    # MySQL can't update table selected in subquery, ids are evaluated first
+    ids = list(snapshots.values_list("pk", flat=True))
+    Snapshot.objects.filter(parent__in=ids).update(parent=None)
+    MigrationTiming.objects.filter(**related).update(snapshot=None)
+    # journal of job always belongs to snapshot of job
+    _raw_delete(CheckoutJob.objects.filter(**related))
+    _raw_delete(CheckoutJournal.objects.filter(**related))
+    # few rows, post_delete of every copy drops copied database
+    PhysicalCopy.objects.filter(**related).delete()
+    return _raw_delete(snapshots)
+
+
+def delete_unreferenced_set(set_id: int) -> int:
+    """
+    Delete set if no snapshot or delta uses it, then its parents the same way.
+    Return number of deleted migrations, only migrations of deleted sets are checked.
+    """
+    deleted = 0
+    while set_id is not None:
+        # one row per migration of set
+        rows = list(
+            MigrationSet.objects.filter(
+                pk=set_id, snapshots__isnull=True, children__isnull=True
+            ).values_list("parent_id", "states")
+        )
+        if not rows:
+            # set is still used
+            break
+        state_ids = [state_id for _, state_id in rows if state_id is not None]
+        MigrationSet.objects.filter(pk=set_id).delete()
+        _total, models = MigrationState.objects.filter(
+            uuid__in=state_ids, migration_sets__isnull=True
+        ).delete()
+        deleted += models.get("liquidb.MigrationState", 0)
+        set_id = rows[0][0]
+    return deleted
+
+
+def find_snapshots(app: str, name: str) -> "QuerySet[Snapshot]":
+    """
+    Snapshots that contain given migration. Set stores migration once,
+    its deltas inherit it until they store other migration of the same app.
+    """
+    set_states = MigrationSet.states.through
+    found = list(
+        set_states.objects.filter(
+            migrationstate_id=_migration_state_uuid(app, name)
+        ).values_list("migrationset_id", flat=True)
+    )
+    frontier = found
+    while frontier:
+        children = set(
+            MigrationSet.objects.filter(parent_id__in=frontier).values_list(
+                "id", flat=True
+            )
+        )
+        changed = set_states.objects.filter(
+            migrationset_id__in=children, migrationstate__app=app
+        ).values_list("migrationset_id", flat=True)
+        frontier = list(children.difference(changed))
+        found.extend(frontier)
+    return Snapshot.objects.filter(migration_set_id__in=found)
+
+
+class SnapshotCheckoutHandler:  # pylint: disable=too-many-instance-attributes
+    def __init__(
+        self,
+        snapshot: Snapshot,
+        output=None,
+        physical=False,
+        progress_format=TEXT,
+        atomic=False,
+    ):  # pylint: disable=too-many-arguments
         self.snapshot = snapshot
         self.output = output
+        # restore physical copy of snapshot if it has one
+        self.physical = physical
+        # migrate and change applied snapshot in one transaction
+        self.atomic = atomic
+        # text or json lines, see liquidb.progress.CheckoutProgress
+        self.progress_format = progress_format
+        # plan of running checkout, see liquidb.journal
+        self.journal: Optional[CheckoutJournal] = None
 
     def _write_to_output(self, message):
         """Helper function to wirte to output if specified"""
-        if self.output is not None:
-            self.output.write(message)
+        if self.output is None:
+            return
+        if self.progress_format == JSON:
+            # output stays parsable line by line
+            message = json.dumps(
+                {
+                    "event": "message",
+                    "database": self.snapshot.database,
+                    "message": message,
+                }
+            )
+        self.output.write(message)
+
+    @property
+    def connection(self):
+        # connections are thread local, checkout in thread uses its own
+        return connections[self.snapshot.database]
 
     def _applied_queryset(self):
-        return Snapshot.objects.filter(applied=True)
+        return Snapshot.objects.filter(applied=True, database=self.snapshot.database)
 
     def _get_lastest_applied_snapshot(self):
         """Return latest applied snapshot by id"""
@@ -34,18 +272,23 @@ class SnapshotCheckoutHandler:
             raise SnapshotHandlerException("No latest snapshot present") from error
         return latest
 
-    def _checkout_to_snapshot(self, snapshot: Snapshot):
-        """Revert db state to given snapshot"""
-        targets = snapshot.migrations.values_list("app", "name")
+    @staticmethod
+    def _migration_targets(snapshot: Snapshot) -> List[Tuple[str, str]]:
+        targets = list(snapshot.migrations.values_list("app", "name"))
         if not targets:
             # snapshot that do not have any migrations
             # TODO get all apps from django apps and migrate everything to zero ?
             raise SnapshotHandlerException(
                 f"No connected migrations found for snapshot {snapshot.name}"
             )
-        executor = MigrationExecutor(connection)
+        return targets
+
+    @staticmethod
+    @contextmanager
+    def _missing_migrations_handler(snapshot: Snapshot, targets: List[Tuple[str, str]]):
+        """Convert errors of missing migration files to SnapshotHandlerException"""
         try:
-            _: ProjectState = executor.migrate(targets)
+            yield
         except KeyError as error:
             # TODO check exact migration that missing
             message = "\n".join(
@@ -62,11 +305,98 @@ class SnapshotCheckoutHandler:
         except NodeNotFoundError as error:
             raise SnapshotHandlerException(error.message) from error
 
+    def _journal_plan(self, snapshot: Snapshot, executor, targets) -> list:
+        """Plan of checkout, rest of unfinished checkout if it is resumed"""
+        if self.journal is not None:
+            return remaining_plan(self.journal, executor)
+        migration_plan = minimal_plan(executor, targets)
+        self.journal = start_journal(snapshot, migration_plan)
+        return migration_plan
+
+    def _checkout_to_snapshot(self, snapshot: Snapshot):
+        """Revert db state to given snapshot"""
+        targets = self._migration_targets(snapshot)
+        connection_obj = connections[snapshot.database]
+        timer = MigrationTimer(snapshot, connection_obj)
+        executor = CachedMigrationExecutor(connection_obj)
+        try:
+            with self._missing_migrations_handler(snapshot, targets):
+                migration_plan = self._journal_plan(snapshot, executor, targets)
+                callbacks = [timer, JournalRecorder(self.journal)]
+                if self.output is not None:
+                    callbacks.append(
+                        CheckoutProgress(
+                            self.output,
+                            migration_plan,
+                            snapshot.database,
+                            self.progress_format,
+                        )
+                    )
+                executor.progress_callback = chain_callbacks(*callbacks)
+                migrate_plan(executor, targets, migration_plan)
+        finally:
+            # migration table is changed (at least partially)
+            invalidate_migration_state(snapshot.database)
+            timer.save()
+
+    def _restore_physical_copy(self, snapshot: Snapshot) -> bool:
+        """Return True if database is replaced by physical copy of snapshot"""
+        physical_copy = PhysicalCopy.objects.filter(snapshot=snapshot).first()
+        if physical_copy is None:
+            self._write_to_output(
+                f'Snapshot "{snapshot.name}" has no physical copy, '
+                "migrations will be applied"
+            )
+            return False
+        try:
+            restore_physical_copy(physical_copy)
+        except PhysicalCopyException as error:
+            raise SnapshotHandlerException(error.error) from error
+        return True
+
+    def _migrate_to_snapshot(self, snapshot: Snapshot):
+        if self.physical and self._restore_physical_copy(snapshot):
+            return
+        self._checkout_to_snapshot(snapshot)
+
+    @contextmanager
+    def checkout_transaction(self):
+        """Transaction of whole checkout if handler is atomic"""
+        if not self.atomic:
+            yield
+            return
+        connection_obj = self.connection
+        if not connection_obj.features.can_rollback_ddl:
+            raise SnapshotHandlerException(
+                f"Database {connection_obj.vendor} can't rollback schema changes. "
+                "Please checkout without --atomic flag."
+            )
+        if self.physical:
+            raise SnapshotHandlerException(
+                "Physical copy can't be restored inside transaction. "
+                "Please use either --atomic or --physical flag."
+            )
+        with ExitStack() as stack:
+            # foreign keys of sqlite can't be disabled inside transaction
+            stack.enter_context(connection_obj.constraint_checks_disabled())
+            aliases = [self.snapshot.database, router.db_for_write(Snapshot)]
+            for alias in dict.fromkeys(aliases):
+                stack.enter_context(transaction.atomic(using=alias))
+            yield
+
+    def plan(self) -> List[PlanStep]:
+        """Return steps that checkout to snapshot would run, nothing is applied"""
+        targets = self._migration_targets(self.snapshot)
+        executor = CachedMigrationExecutor(self.connection)
+        with self._missing_migrations_handler(self.snapshot, targets):
+            return CheckoutPlanner(executor, estimate_durations).plan(targets)
+
     @property
     def applied_snapshot_exists(self):
         return self._applied_queryset().exists()
 
-    def checkout(self, force=False):
+    def _prepare_checkout(self, force=False) -> Optional[Snapshot]:
+        """Run all checks, return applied snapshot or None if nothing to do"""
         latest = self._get_lastest_applied_snapshot()
         consistent_with_migration_table = latest.consistent_state
         if not consistent_with_migration_table and not force:
@@ -86,77 +416,227 @@ class SnapshotCheckoutHandler:
             # migration hashes are the same
             # nothing to do
             self._write_to_output(f'Snapshot "{latest.name}" already applied ')
-            return
+            return None
+        return latest
 
-        self._checkout_to_snapshot(self.snapshot)
-        with transaction.atomic():
-            latest.applied = False
-            latest.save(update_fields=["applied"])
+    def _prepare_resume(self) -> Snapshot:
+        """Continue unfinished checkout, return snapshot that is still applied"""
+        journal = running_journal(self.snapshot.database)
+        if journal is None:
+            raise SnapshotHandlerException("No unfinished checkout to resume")
+        if journal.snapshot_id != self.snapshot.id:
+            raise SnapshotHandlerException(
+                f'Unfinished checkout is to snapshot "{journal.snapshot.name}". '
+                "Please resume it with its name or use --force flag to drop it."
+            )
+        self.journal = journal
+        self._write_to_output(
+            f'Resume checkout to "{self.snapshot.name}" '
+            f"after {journal.completed} of {len(journal.plan)} steps"
+        )
+        # applied snapshot is changed only after journal is completed
+        return self._get_lastest_applied_snapshot()
+
+    def _mark_applied(self, latest: Snapshot):
+        latest.applied = False
+        latest.save(update_fields=["applied"])
 
-            self.snapshot.applied = True
-            self.snapshot.save(update_fields=["applied"])
+        self.snapshot.applied = True
+        self.snapshot.save(update_fields=["applied"])
+        if self.journal is not None:
+            complete_journal(self.journal)
+
+    def checkout(self, force=False, resume=False):
+        if resume:
+            latest = self._prepare_resume()
+        else:
+            latest = self._prepare_checkout(force)
+        if latest is None:
+            return
+
+        with self.checkout_transaction():
+            self._migrate_to_snapshot(self.snapshot)
+            with transaction.atomic():
+                self._mark_applied(latest)
         self._write_to_output(
             f'Checkout from snapshot "{latest.name}" to "{self.snapshot.name}"'
         )
 
 
+def _runs_in_thread(*databases: str) -> bool:
+    """In memory sqlite database is visible only to connection that created it"""
+    return not any(
+        connections[alias].vendor == "sqlite" and connections[alias].is_in_memory_db()
+        for alias in set(databases)
+    )
+
+
+def _checkout_in_thread(handler: SnapshotCheckoutHandler):
+    try:
+        handler._migrate_to_snapshot(  # pylint: disable=protected-access
+            handler.snapshot
+        )
+    finally:
+        # connection is opened only for this thread
+        handler.connection.close()
+
+
+class MultiDatabaseCheckoutHandler:  # pylint: disable=too-few-public-methods
+    """
+    Checkout snapshots of several databases at the same time.
+    Applied snapshots are changed only if every database is migrated.
+    """
+
+    def __init__(
+        self,
+        snapshots: List[Snapshot],
+        output=None,
+        physical=False,
+        progress_format=TEXT,
+        atomic=False,
+    ):  # pylint: disable=too-many-arguments
+        self.handlers = [
+            SnapshotCheckoutHandler(snapshot, output, physical, progress_format, atomic)
+            for snapshot in snapshots
+        ]
+
+    def _migrate(self, pending: List[SnapshotCheckoutHandler]):
+        """Migrate every database, raise after all of them are finished"""
+        in_thread = [
+            handler
+            for handler in pending
+            # transaction is opened by connection of calling thread
+            if not handler.atomic and _runs_in_thread(handler.snapshot.database)
+        ]
+        errors = {}
+        with ThreadPoolExecutor(max_workers=max(len(in_thread), 1)) as pool:
+            futures = {
+                # thread shares state cache of command, see liquidb.state
+                handler.snapshot.database: pool.submit(
+                    copy_context().run, _checkout_in_thread, handler
+                )
+                for handler in in_thread
+            }
+            for handler in pending:
+                if handler in in_thread:
+                    continue
+                try:
+                    handler._migrate_to_snapshot(  # pylint: disable=protected-access
+                        handler.snapshot
+                    )
+                except SnapshotHandlerException as error:
+                    errors[handler.snapshot.database] = error.error
+            for database, future in futures.items():
+                try:
+                    future.result()
+                except SnapshotHandlerException as error:
+                    errors[database] = error.error
+        if errors:
+            message = "\n".join(
+                f'Database "{database}": {error}' for database, error in errors.items()
+            )
+            raise SnapshotHandlerException(
+                f"Checkout failed, applied snapshots are not changed.\n{message}"
+            )
+
+    def checkout(self, force=False, resume=False):
+        pending = []
+        for handler in self.handlers:
+            # pylint: disable=protected-access
+            if resume:
+                latest = handler._prepare_resume()
+            else:
+                latest = handler._prepare_checkout(force)
+            if latest is not None:
+                pending.append((handler, latest))
+        if not pending:
+            return
+
+        with ExitStack() as stack:
+            for handler, _ in pending:
+                stack.enter_context(handler.checkout_transaction())
+            self._migrate([handler for handler, _ in pending])
+            with transaction.atomic():
+                for handler, latest in pending:
+                    handler._mark_applied(latest)  # pylint: disable=protected-access
+        for handler, latest in pending:
+            handler._write_to_output(  # pylint: disable=protected-access
+                f'Checkout from snapshot "{latest.name}" to "{handler.snapshot.name}" '
+                f'in database "{handler.snapshot.database}"'
+            )
+
+
 class SnapshotCreationHandler:  # pylint: disable=too-few-public-methods
-    def __init__(self, snapshot_name, overwrite):
+    def __init__(self, snapshot_name, overwrite, database=DEFAULT_DB_ALIAS):
         self.snapshot_name = snapshot_name
         self.overwrite = overwrite
+        self.database = database
         self.snapshot = None
 
+    def create_physical_copy(self):
+        """Copy database of created snapshot, should run outside of transaction"""
+        try:
+            return create_physical_copy(self.snapshot)
+        except PhysicalCopyException as error:
+            raise SnapshotHandlerException(error.error) from error
+
+    def _lookup(self) -> Tuple[Optional[Snapshot], Optional[Snapshot]]:
+        """Return snapshot with given name and applied snapshot in one query"""
+        existing = latest = None
+        rows = (
+            Snapshot.objects.filter(database=self.database)
+            .filter(Q(name=self.snapshot_name) | Q(applied=True))
+            .select_related("migration_set")
+            .order_by("id")
+        )
+        for snapshot in rows:
+            if snapshot.name == self.snapshot_name:
+                existing = snapshot
+            if snapshot.applied:
+                latest = snapshot
+        return existing, latest
+
+    @staticmethod
     def _create(
-        self,
-        snapshot,
-        latest,
+        snapshot: Snapshot, latest: Optional[Snapshot], current_state: AppliedMigrations
     ):
         with transaction.atomic():
+            parent_set = None
             if latest is not None:
-                latest.applied = False
-                latest.save(update_fields=["applied"])
-            migrations = get_latest_applied_migrations_qs(connection).only(
-                "id", "app", "name"
-            )
+                parent_set = latest.migration_set
+                if latest.pk != snapshot.pk:
+                    Snapshot.objects.filter(pk=latest.pk).update(applied=False)
+                    latest.applied = False
+                    snapshot.parent = latest
+            previous_set_id = snapshot.migration_set_id
             snapshot.applied = True
-
-            if snapshot.id is not None:
-                # in overwrite mode
-                # so we need to delete all previous migrations
-                # from this snapshot
-                snapshot.migrations.all().delete()
-            snapshot.save()
-            to_create = [
-                MigrationState(
-                    snapshot=snapshot,
-                    migration_id=migration.id,
-                    app=migration.app,
-                    name=migration.name,
-                )
-                for migration in migrations
-            ]
-            MigrationState.objects.bulk_create(
-                to_create, batch_size=1000, ignore_conflicts=True
+            snapshot.migration_hash = current_state.migration_hash
+            snapshot.migration_set = _get_or_create_migration_set(
+                current_state, parent_set
             )
+            snapshot.save()
+            if previous_set_id not in (None, snapshot.migration_set_id):
+                # overwritten snapshot could be the only user of its previous set
+                delete_unreferenced_set(previous_set_id)
 
     def create(self, dry_run=False) -> bool:
-        exists = Snapshot.objects.filter(name=self.snapshot_name).exists()
-        if exists and not self.overwrite:
+        existing, latest = self._lookup()
+        if existing is not None and not self.overwrite:
             raise SnapshotHandlerException(
                 f"Snapshot with given name {self.snapshot_name} already exists.\n",
             )
-
-        if exists:
-            snapshot = Snapshot.objects.get(name=self.snapshot_name)
+        if existing is None:
+            snapshot = Snapshot(name=self.snapshot_name, database=self.database)
         else:
-            snapshot = Snapshot(name=self.snapshot_name)
+            snapshot = existing
 
-        latest = Snapshot.objects.filter(applied=True).last()
-        if latest is not None and latest.consistent_state:
+        current_state = get_current_migration_state(connections[self.database])
+        # same as latest.consistent_state without reading migration table again
+        if latest is not None and latest.migration_hash == current_state.migration_hash:
             return False
         if dry_run:
             return True
 
-        self._create(snapshot, latest)
+        self._create(snapshot, latest, current_state)
         self.snapshot = snapshot
         return True
@@ -0,0 +1,79 @@
+from itertools import groupby
+from operator import itemgetter
+from typing import Iterable, Iterator, NamedTuple, Optional, Tuple
+
+from django.db import connections
+
+from liquidb.models import Snapshot
+from liquidb.state import get_current_migration_state
+
+ADDED = "added"
+REMOVED = "removed"
+CHANGED = "changed"
+
+
+class AppDiff(NamedTuple):
+    app: str
+    change: str
+    # latest migration of app in compared state and in snapshot,
+    # names are joined by comma for app with unmerged branches
+    current: Optional[str]
+    snapshot: Optional[str]
+
+
+def _by_app(rows: Iterable[Tuple[str, str]]) -> Iterator[Tuple[str, str]]:
+    """One row per app of rows sorted by app and name"""
+    for app, group in groupby(rows, key=itemgetter(0)):
+        yield app, ", ".join(name for _, name in group)
+
+
+def merge_diff(
+    current: Iterable[Tuple[str, str]], snapshot: Iterable[Tuple[str, str]]
+) -> Iterator[AppDiff]:
+    """
+    Compare two streams of (app, name) sorted by app and name in one pass,
+    yield only apps that applying snapshot would add, remove or change.
+    """
+    current, snapshot = _by_app(current), _by_app(snapshot)
+    left, right = next(current, None), next(snapshot, None)
+    while left is not None or right is not None:
+        if right is None or (left is not None and left[0] < right[0]):
+            yield AppDiff(left[0], REMOVED, left[1], None)
+            left = next(current, None)
+        elif left is None or right[0] < left[0]:
+            yield AppDiff(right[0], ADDED, None, right[1])
+            right = next(snapshot, None)
+        else:
+            if left[1] != right[1]:
+                yield AppDiff(left[0], CHANGED, left[1], right[1])
+            left, right = next(current, None), next(snapshot, None)
+
+
+def snapshot_migrations(snapshot: Snapshot) -> Iterator[Tuple[str, str]]:
+    """Migrations of snapshot sorted by app, read from database by chunks"""
+    return (
+        snapshot.migrations.order_by("app", "name")
+        .values_list("app", "name")
+        .iterator(chunk_size=1000)
+    )
+
+
+def live_migrations(database: str) -> Iterator[Tuple[str, str]]:
+    """Latest applied migrations of database sorted by app"""
+    # state is already in memory, see liquidb.state
+    state = get_current_migration_state(connections[database])
+    return iter(sorted((app, name) for _, app, name in state.migrations))
+
+
+def diff_snapshot(
+    snapshot: Snapshot, other: Optional[Snapshot] = None
+) -> Iterator[AppDiff]:
+    """
+    Apps changed by applying snapshot, compared to other snapshot
+    or to migration table of its database if other is None.
+    """
+    if other is None:
+        current = live_migrations(snapshot.database)
+    else:
+        current = snapshot_migrations(other)
+    return merge_diff(current, snapshot_migrations(snapshot))
@@ -0,0 +1,21 @@
+import os
+
+
+def is_private(path: str) -> bool:
+    """Path is owned by current user and other users have no access to it"""
+    if not hasattr(os, "getuid"):
+        # no POSIX owner and mode on Windows
+        return True
+    info = os.lstat(path)
+    return info.st_uid == os.getuid() and not info.st_mode & 0o077
+
+
+def make_private_dir(path: str) -> bool:
+    """Create directory of current user, False if existing one is not private"""
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    return is_private(path)
+
+
+def create_private_file(path: str):
+    """Create empty file readable only by current user, existing file is an error"""
+    os.close(os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600))
@@ -0,0 +1,257 @@
+import hashlib
+import json
+import os
+from importlib import import_module
+from typing import List, Optional, Tuple
+
+import django
+from django.apps import apps
+from django.db.migrations.executor import MigrationExecutor
+from django.db.migrations.graph import MigrationGraph
+from django.db.migrations.loader import MigrationLoader
+from django.db.migrations.recorder import MigrationRecorder
+
+from liquidb.files import is_private, make_private_dir
+from liquidb.plan import clean_start_plan
+from liquidb.settings import MIGRATION_GRAPH_CACHE_DIR
+
+_CACHE_VERSION = 1
+
+
+class LazyMigration:
+    """Import migration module only when migration is really used"""
+
+    def __init__(self, app_label: str, name: str, module: str, replaces: List):
+        self.app_label = app_label
+        self.name = name
+        self.module = module
+        self.replaces = [tuple(key) for key in replaces]
+        self._migration = None
+
+    def _load(self):
+        if self._migration is None:
+            migration_module = import_module(self.module)
+            self._migration = migration_module.Migration(self.name, self.app_label)
+        return self._migration
+
+    def __getattr__(self, item):
+        # called only for attributes that are not set in __init__
+        if item.startswith("__") or item == "_migration":
+            raise AttributeError(item)
+        return getattr(self._load(), item)
+
+    def __eq__(self, other):
+        return (
+            getattr(other, "app_label", None) == self.app_label
+            and getattr(other, "name", None) == self.name
+        )
+
+    def __hash__(self):
+        # same as django.db.migrations.Migration.__hash__
+        return hash(f"{self.app_label}.{self.name}")
+
+    def __repr__(self):
+        return f"<Migration {self.app_label}.{self.name}>"
+
+
+def _migration_files_keys() -> Tuple[str, str]:
+    """
+    Hash of migration directories of all apps (project)
+    and hash of paths, mtimes and sizes of migration modules in them.
+    """
+    project = [str(_CACHE_VERSION), django.get_version()]
+    files = []
+    for app_config in apps.get_app_configs():
+        module_name, _explicit = MigrationLoader.migrations_module(app_config.label)
+        project.append(f"{app_config.label}:{module_name}")
+        if module_name is None:
+            continue
+        try:
+            # only package itself, migration modules are not imported
+            module = import_module(module_name)
+        except ImportError:
+            continue
+        for path in getattr(module, "__path__", []):
+            project.append(path)
+            for entry in sorted(os.scandir(path), key=lambda entry: entry.name):
+                if not entry.name.endswith(".py"):
+                    continue
+                stat = entry.stat()
+                files.append(f"{entry.path}:{stat.st_mtime_ns}:{stat.st_size}")
+    project_key = hashlib.md5("\n".join(project).encode("utf-8")).hexdigest()  # nosec
+    files_key = hashlib.md5(  # nosec
+        "\n".join(project + files).encode("utf-8")
+    ).hexdigest()
+    return project_key, files_key
+
+
+def migration_files_key() -> str:
+    """Hash of paths, mtimes and sizes of migration modules of all apps"""
+    return _migration_files_keys()[1]
+
+
+def _cache_path() -> Optional[str]:
+    if not MIGRATION_GRAPH_CACHE_DIR:
+        return None
+    try:
+        # graph decides what checkout applies, nobody else should write it
+        if not make_private_dir(MIGRATION_GRAPH_CACHE_DIR):
+            return None
+    except OSError:
+        return None
+    project_key, files_key = _migration_files_keys()
+    return os.path.join(
+        MIGRATION_GRAPH_CACHE_DIR, f"graph_{project_key}_{files_key}.json"
+    )
+
+
+def _read_cache(path: str) -> Optional[dict]:
+    try:
+        if not is_private(path):
+            # written by other user
+            return None
+        with open(path, encoding="utf-8") as cache_file:
+            data = json.load(cache_file)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(data, dict) or data.get("version") != _CACHE_VERSION:
+        return None
+    return data
+
+
+def _remove_stale(path: str):
+    """Remove cache of previous migration files of the same project"""
+    directory, name = os.path.split(path)
+    project_prefix = name[: name.rindex("_") + 1]
+    for entry in os.scandir(directory):
+        if entry.name.startswith(project_prefix) and entry.path != path:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                # removed by other process
+                pass
+
+
+def _write_cache(path: str, data: dict):
+    try:
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        descriptor = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(descriptor, "w", encoding="utf-8") as cache_file:
+            json.dump(data, cache_file)
+        # other process should never read half written file
+        os.replace(tmp_path, path)
+        _remove_stale(path)
+    except OSError:
+        # cache is optimisation only
+        pass
+
+
+def _dump_graph(loader: MigrationLoader) -> dict:
+    """Serialize graph of loader built without replacements"""
+    nodes = [
+        [app_label, name, type(migration).__module__, migration.replaces]
+        for (app_label, name), migration in loader.graph.nodes.items()
+    ]
+    edges = [
+        [list(node.key), list(parent.key)]
+        for node in loader.graph.node_map.values()
+        for parent in node.parents
+    ]
+    return {
+        "version": _CACHE_VERSION,
+        "nodes": nodes,
+        "edges": edges,
+        "migrated_apps": sorted(loader.migrated_apps),
+        "unmigrated_apps": sorted(loader.unmigrated_apps),
+    }
+
+
+class CachedMigrationLoader(MigrationLoader):
+    """
+    MigrationLoader that keeps built graph in a file
+    keyed by state of migration files (see migration_files_key)
+    and imports migration modules lazily.
+    """
+
+    def _load_graph_data(self) -> Tuple[dict, bool]:
+        """Return serialized graph and True if it is read from cache"""
+        path = _cache_path()
+        data = _read_cache(path) if path else None
+        if data is not None:
+            return data, True
+        loader = MigrationLoader(
+            None,
+            ignore_no_migrations=self.ignore_no_migrations,
+            replace_migrations=False,
+        )
+        data = _dump_graph(loader)
+        if path:
+            _write_cache(path, data)
+        return data, False
+
+    def _apply_replacements(self):
+        # same as end of django.db.migrations.loader.MigrationLoader.build_graph
+        for key, migration in self.replacements.items():
+            applied_statuses = [
+                (target in self.applied_migrations) for target in migration.replaces
+            ]
+            if all(applied_statuses):
+                self.applied_migrations[key] = migration
+            else:
+                self.applied_migrations.pop(key, None)
+            if all(applied_statuses) or (not any(applied_statuses)):
+                self.graph.remove_replaced_nodes(key, migration.replaces)
+            else:
+                self.graph.remove_replacement_node(key, migration.replaces)
+
+    def build_graph(self):
+        if not MIGRATION_GRAPH_CACHE_DIR:
+            super().build_graph()
+            return
+        data, self.from_cache = self._load_graph_data()
+        self.migrated_apps = set(data["migrated_apps"])
+        self.unmigrated_apps = set(data["unmigrated_apps"])
+        self.disk_migrations = {
+            (app_label, name): LazyMigration(app_label, name, module, replaces)
+            for app_label, name, module, replaces in data["nodes"]
+        }
+        if self.connection is None:
+            self.applied_migrations = {}
+        else:
+            recorder = MigrationRecorder(self.connection)
+            self.applied_migrations = recorder.applied_migrations()
+
+        self.graph = MigrationGraph()
+        self.replacements = {}
+        for key, migration in self.disk_migrations.items():
+            self.graph.add_node(key, migration)
+            if migration.replaces:
+                self.replacements[key] = migration
+        for child, parent in data["edges"]:
+            self.graph.add_dependency(
+                None, tuple(child), tuple(parent), skip_validation=True
+            )
+        if self.replace_migrations:
+            self._apply_replacements()
+        self.graph.validate_consistency()
+        self.graph.ensure_not_cyclic()
+
+
+class CachedMigrationExecutor(MigrationExecutor):
+    """MigrationExecutor that loads migration graph through CachedMigrationLoader"""
+
+    def __init__(
+        self, connection, progress_callback=None
+    ):  # pylint: disable=super-init-not-called
+        # same as MigrationExecutor.__init__ except loader
+        self.connection = connection
+        self.loader = CachedMigrationLoader(self.connection)
+        self.recorder = MigrationRecorder(self.connection)
+        self.progress_callback = progress_callback
+
+    def migration_plan(self, targets, clean_start=False):
+        if clean_start:
+            # migrate builds plan from every leaf, MigrationExecutor walks
+            # ancestors of every leaf again
+            return clean_start_plan(self.loader.graph, targets)
+        return super().migration_plan(targets, clean_start=clean_start)
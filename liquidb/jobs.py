@@ -0,0 +1,153 @@
+import logging
+import threading
+from datetime import timedelta
+
+from django.db import connections, router, transaction
+from django.utils.timezone import now
+
+from liquidb.db_tools import (
+    SnapshotCheckoutHandler,
+    SnapshotHandlerException,
+    _runs_in_thread,
+)
+from liquidb.journal import running_journal
+from liquidb.models import CheckoutJob, Snapshot
+from liquidb.settings import CHECKOUT_JOB_TIMEOUT
+from liquidb.state import cached_migration_state
+
+logger = logging.getLogger(__name__)
+
+ACTIVE = (CheckoutJob.PENDING, CheckoutJob.RUNNING)
+
+
+class JobOutput:  # pylint: disable=too-few-public-methods
+    """Output of checkout handler that keeps latest message in job row"""
+
+    def __init__(self, job_id: int):
+        self.job_id = job_id
+
+    def write(self, message: str):
+        CheckoutJob.objects.filter(id=self.job_id).update(
+            message=message, updated=now()
+        )
+
+
+def _update(job: CheckoutJob, **fields):
+    for field, value in fields.items():
+        setattr(job, field, value)
+    job.updated = now()
+    job.save(update_fields=[*fields, "updated"])
+
+
+def run_checkout_job(job_id: int):
+    """Checkout to snapshot of job, result is saved in job row"""
+    job = CheckoutJob.objects.select_related("snapshot").get(id=job_id)
+    _update(job, status=CheckoutJob.RUNNING)
+    handler = SnapshotCheckoutHandler(job.snapshot, output=JobOutput(job.id))
+    try:
+        with cached_migration_state():
+            handler.checkout(force=True)
+    except SnapshotHandlerException as error:
+        _update(job, status=CheckoutJob.FAILED, message=error.error)
+    except Exception as error:  # pylint: disable=broad-exception-caught
+        # nobody waits for thread, error is only logged and shown in admin
+        logger.exception("Checkout job %s failed", job_id)
+        _update(job, status=CheckoutJob.FAILED, message=repr(error))
+    else:
+        _update(job, status=CheckoutJob.COMPLETED, journal=handler.journal)
+
+
+def _heartbeat(job_id: int, stop: threading.Event):
+    """Keep running job fresh while one migration takes long, see fail_stale_jobs"""
+    while not stop.wait(CHECKOUT_JOB_TIMEOUT / 5):
+        CheckoutJob.objects.filter(id=job_id, status__in=ACTIVE).update(updated=now())
+
+
+def _in_thread(func, *args):
+    try:
+        func(*args)
+    finally:
+        # connections are opened only for this thread
+        connections.close_all()
+
+
+def _run_in_thread(job_id: int):
+    stop = threading.Event()
+    heartbeat = threading.Thread(
+        target=_in_thread,
+        args=(_heartbeat, job_id, stop),
+        name=f"liquidb-heartbeat-{job_id}",
+        daemon=True,
+    )
+    heartbeat.start()
+    try:
+        _in_thread(run_checkout_job, job_id)
+    finally:
+        stop.set()
+        heartbeat.join()
+
+
+def _stale_before():
+    return now() - timedelta(seconds=CHECKOUT_JOB_TIMEOUT)
+
+
+def fail_stale_jobs(database: str) -> int:
+    """Fail active jobs without heartbeat, process that ran them is gone"""
+    return CheckoutJob.objects.filter(
+        database=database, status__in=ACTIVE, updated__lt=_stale_before()
+    ).update(
+        status=CheckoutJob.FAILED,
+        message="Checkout job stopped responding",
+        updated=now(),
+    )
+
+
+def start_checkout_job(snapshot: Snapshot) -> CheckoutJob:
+    """
+    Save job of checkout and run it in separate thread,
+    job is finished even if request that started it is gone.
+    """
+    with transaction.atomic(using=router.db_for_write(CheckoutJob)):
+        fail_stale_jobs(snapshot.database)
+        active = (
+            CheckoutJob.objects.select_for_update()
+            .filter(database=snapshot.database, status__in=ACTIVE)
+            .first()
+        )
+        if active is not None:
+            raise SnapshotHandlerException(
+                f"Checkout of {snapshot.database} database is already running"
+            )
+        job = CheckoutJob.objects.create(snapshot=snapshot, database=snapshot.database)
+    if not _runs_in_thread(snapshot.database, router.db_for_write(CheckoutJob)):
+        run_checkout_job(job.id)
+        return job
+    # not daemon, process waits for checkout before exit
+    thread = threading.Thread(
+        target=_run_in_thread, args=(job.id,), name=f"liquidb-checkout-{job.id}"
+    )
+    # job row has to be visible to connection of thread
+    transaction.on_commit(thread.start, using=router.db_for_write(CheckoutJob))
+    return job
+
+
+def job_status(job: CheckoutJob) -> dict:
+    """Status of job with progress of its checkout journal"""
+    if job.status in ACTIVE and job.updated < _stale_before():
+        fail_stale_jobs(job.database)
+        job.refresh_from_db()
+    journal = job.journal
+    if journal is None and job.status == CheckoutJob.RUNNING:
+        journal = running_journal(job.database)
+        if journal is not None and journal.snapshot_id != job.snapshot_id:
+            journal = None
+    return {
+        "id": job.id,
+        "snapshot": job.snapshot.name,
+        "database": job.database,
+        "status": job.status,
+        "completed": 0 if journal is None else journal.completed,
+        "total": None if journal is None else len(journal.plan),
+        "message": job.message,
+        "finished": job.status not in ACTIVE,
+    }
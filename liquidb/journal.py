@@ -0,0 +1,83 @@
+from typing import List, Optional, Tuple
+
+from django.db.migrations.executor import MigrationExecutor
+from django.db.models import F
+from django.utils.timezone import now
+
+from liquidb.models import CheckoutJournal, Snapshot
+from liquidb.plan import BACKWARD, FORWARD
+from liquidb.timings import ACTION_DIRECTIONS
+
+
+def running_journal(database: str) -> Optional[CheckoutJournal]:
+    """Return unfinished checkout of database if there is one"""
+    return (
+        CheckoutJournal.objects.filter(
+            database=database, status=CheckoutJournal.RUNNING
+        )
+        .select_related("snapshot")
+        .order_by("-id")
+        .first()
+    )
+
+
+def start_journal(snapshot: Snapshot, migration_plan: List[tuple]) -> CheckoutJournal:
+    """Write plan of checkout before anything is migrated"""
+    # unfinished checkout is replaced by new one
+    CheckoutJournal.objects.filter(
+        database=snapshot.database, status=CheckoutJournal.RUNNING
+    ).update(status=CheckoutJournal.ABANDONED, updated=now())
+    return CheckoutJournal.objects.create(
+        snapshot=snapshot,
+        database=snapshot.database,
+        plan=[
+            [migration.app_label, migration.name, BACKWARD if backwards else FORWARD]
+            for migration, backwards in migration_plan
+        ],
+    )
+
+
+def remaining_plan(
+    journal: CheckoutJournal, executor: MigrationExecutor
+) -> List[Tuple[object, bool]]:
+    """
+    Return not finished steps of journal as plan of MigrationExecutor.
+    Steps are checked against migration table, independent chains of plan
+    could be finished out of order (see liquidb.parallel) and step could be
+    finished without journal update if process is killed right after it.
+    """
+    applied = executor.loader.applied_migrations
+    plan = []
+    for app, name, direction in journal.plan:
+        backwards = direction == BACKWARD
+        if ((app, name) in applied) != backwards:
+            continue
+        plan.append((executor.loader.graph.nodes[(app, name)], backwards))
+    completed = len(journal.plan) - len(plan)
+    if completed != journal.completed:
+        journal.completed = completed
+        journal.updated = now()
+        journal.save(update_fields=["completed", "updated"])
+    return plan
+
+
+def complete_journal(journal: CheckoutJournal):
+    journal.status = CheckoutJournal.COMPLETED
+    journal.updated = now()
+    journal.save(update_fields=["status", "updated"])
+
+
+class JournalRecorder:  # pylint: disable=too-few-public-methods
+    """progress_callback of MigrationExecutor that counts finished steps"""
+
+    def __init__(self, journal: CheckoutJournal):
+        self.journal = journal
+
+    def __call__(self, action, migration=None, fake=False):
+        step, _, stage = action.partition("_")
+        if step not in ACTION_DIRECTIONS or stage != "success":
+            return
+        # committed right away, migration is committed already
+        CheckoutJournal.objects.filter(pk=self.journal.pk).update(
+            completed=F("completed") + 1, updated=now()
+        )
@@ -1,23 +1,53 @@
 from abc import ABCMeta, abstractmethod
+from typing import List
 
 from django.core.exceptions import ObjectDoesNotExist
 from django.core.management import BaseCommand, CommandError
-from django.db import connection
+from django.db import DEFAULT_DB_ALIAS, connection, connections
 from django.db.migrations.recorder import MigrationRecorder
 
-from liquidb.db_tools import SnapshotCheckoutHandler, SnapshotHandlerException
-from liquidb.models import Snapshot, MigrationState, get_latest_applied_migrations_qs
+from liquidb.db_tools import (
+    MultiDatabaseCheckoutHandler,
+    SnapshotCheckoutHandler,
+    SnapshotHandlerException,
+)
+from liquidb.models import Snapshot, MigrationState
+from liquidb.progress import JSON, TEXT
+from liquidb.state import cached_migration_state, get_latest_applied_migrations_qs
 
 
 class BaseLiquidbCommand(BaseCommand, metaclass=ABCMeta):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.connection = connection
+        self.databases = [DEFAULT_DB_ALIAS]
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--database",
+            type=str,
+            default=DEFAULT_DB_ALIAS,
+            choices=list(connections),
+            help="Database alias which migration state is used",
+        )
+        parser.add_argument(
+            "--all-databases",
+            action="store_true",
+            default=False,
+            help="Run command for every configured database",
+        )
+
+    @staticmethod
+    def _get_databases(options) -> List[str]:
+        if options.get("all_databases"):
+            return list(connections)
+        return [options.get("database") or DEFAULT_DB_ALIAS]
 
     def _check_migration_db_exists(self):
-        recorder = MigrationRecorder(self.connection)
-        if not recorder.has_table():
-            raise CommandError("No migration table present")
+        for database in self.databases:
+            recorder = MigrationRecorder(connections[database])
+            if not recorder.has_table():
+                raise CommandError(f'No migration table present in "{database}"')
 
     def _check_liquidb_tables_exists(self):
         with self.connection.cursor() as cursor:
@@ -35,38 +65,133 @@ class BaseLiquidbCommand(BaseCommand, metaclass=ABCMeta):
         self._check_liquidb_tables_exists()
 
     def handle(self, *args, **options):
+        self.databases = self._get_databases(options)
         self._init()
-        self._handle(*args, **options)
+        # all checks during command share one read of migration table
+        with cached_migration_state():
+            self._handle(*args, **options)
 
     def _latest_migrations(self):
         return get_latest_applied_migrations_qs(self.connection)
 
+    @property
+    def multiple_databases(self) -> bool:
+        return len(self.databases) > 1
+
+    def database_message(self, message: str, database: str) -> str:
+        """Add database alias to message if command runs for several databases"""
+        if self.multiple_databases:
+            return f'{message} in database "{database}"'
+        return message
+
     @staticmethod
-    def get_snapshot(name: str) -> Snapshot:
+    def get_snapshot(name: str, database: str = DEFAULT_DB_ALIAS) -> Snapshot:
         """Retrun snapshot by name"""
         try:
-            snapshot = Snapshot.objects.get(name=name)
+            snapshot = Snapshot.objects.get(name=name, database=database)
         except ObjectDoesNotExist as error:
-            raise CommandError(
-                f'Snapshot with name: "{name}" doesn\'t exists'
-            ) from error
+            message = f'Snapshot with name: "{name}" doesn\'t exists'
+            if database != DEFAULT_DB_ALIAS:
+                message = f'{message} in database "{database}"'
+            raise CommandError(message) from error
         return snapshot
 
+    def get_snapshots(self, name: str) -> List[Snapshot]:
+        """Retrun snapshot with given name of every database of command"""
+        return [self.get_snapshot(name, database) for database in self.databases]
+
     @abstractmethod
     def _handle(self, *args, **options):
         raise NotImplementedError
 
 
 class BaseLiquidbRevertCommand(BaseLiquidbCommand, metaclass=ABCMeta):
-    def _checkout_snapshot(self, snapshot: Snapshot, force=False):
+    @staticmethod
+    def add_checkout_arguments(parser):
+        """Options of commands that checkout snapshot"""
+        parser.add_argument(
+            "--physical",
+            type=int,
+            default=0,
+            choices=[0, 1],
+            help="Restore physical copy of snapshot instead of applying migrations",
+        )
+        parser.add_argument(
+            "--progress",
+            type=str,
+            default=TEXT,
+            choices=[TEXT, JSON],
+            help="Format of checkout progress, json writes one object per line",
+        )
+        parser.add_argument(
+            "--resume",
+            type=int,
+            default=0,
+            choices=[0, 1],
+            help="Continue unfinished checkout from its last finished migration",
+        )
+        parser.add_argument(
+            "--atomic",
+            type=int,
+            default=0,
+            choices=[0, 1],
+            help="Apply all migrations and change snapshot in one transaction",
+        )
+
+    def _checkout_snapshot(
+        self,
+        snapshot: Snapshot,
+        force=False,
+        physical=False,
+        progress_format=TEXT,
+        resume=False,
+        atomic=False,
+    ):  # pylint: disable=too-many-arguments
         """Run all checks before reverting to desired state"""
 
-        handler = SnapshotCheckoutHandler(snapshot, self.stdout)
+        handler = SnapshotCheckoutHandler(
+            snapshot, self.stdout, physical, progress_format, atomic
+        )
         if not handler.applied_snapshot_exists:
             raise CommandError("No latest snapshot present")
 
         try:
-            handler.checkout(force=force)
+            handler.checkout(force=force, resume=resume)
+        except SnapshotHandlerException as e:
+            raise CommandError(e.error) from e
+
+    def _checkout_snapshots(
+        self,
+        snapshots: List[Snapshot],
+        force=False,
+        physical=False,
+        progress_format=TEXT,
+        resume=False,
+        atomic=False,
+    ):  # pylint: disable=too-many-arguments
+        """Checkout all databases at the same time"""
+        if len(snapshots) == 1:
+            self._checkout_snapshot(
+                snapshots[0],
+                force=force,
+                physical=physical,
+                progress_format=progress_format,
+                resume=resume,
+                atomic=atomic,
+            )
+            return
+
+        handler = MultiDatabaseCheckoutHandler(
+            snapshots, self.stdout, physical, progress_format, atomic
+        )
+        for checkout_handler in handler.handlers:
+            if not checkout_handler.applied_snapshot_exists:
+                raise CommandError(
+                    "No latest snapshot present in database "
+                    f'"{checkout_handler.snapshot.database}"'
+                )
+        try:
+            handler.checkout(force=force, resume=resume)
         except SnapshotHandlerException as e:
             raise CommandError(e.error) from e
 
@@ -9,6 +9,8 @@ class Command(BaseLiquidbRevertCommand):
     help = "Revert migration to latest commit (snapshot)"
 
     def add_arguments(self, parser):
+        super().add_arguments(parser)
+        self.add_checkout_arguments(parser)
         parser.add_argument(
             "--force",
             type=int,
@@ -18,8 +20,20 @@ class Command(BaseLiquidbRevertCommand):
         )
 
     def _handle(self, *args, **options):
-        try:
-            snapshot = Snapshot.objects.latest("id")
-        except ObjectDoesNotExist as error:
-            raise CommandError("No latest snapshot present") from error
-        self._checkout_snapshot(snapshot, force=bool(options["force"]))
+        snapshots = []
+        for database in self.databases:
+            try:
+                snapshot = Snapshot.objects.filter(database=database).latest("id")
+            except ObjectDoesNotExist as error:
+                raise CommandError(
+                    self.database_message("No latest snapshot present", database)
+                ) from error
+            snapshots.append(snapshot)
+        self._checkout_snapshots(
+            snapshots,
+            force=bool(options["force"]),
+            physical=bool(options["physical"]),
+            progress_format=options["progress"],
+            resume=bool(options["resume"]),
+            atomic=bool(options["atomic"]),
+        )
@@ -5,6 +5,8 @@ class Command(BaseLiquidbRevertCommand):
     help = "Revert migration state to given commit (snapshot)"
 
     def add_arguments(self, parser):
+        super().add_arguments(parser)
+        self.add_checkout_arguments(parser)
         parser.add_argument(
             "--name",
             type=str,
@@ -19,5 +21,12 @@ class Command(BaseLiquidbRevertCommand):
         )
 
     def _handle(self, *args, **options):
-        snapshot = self.get_snapshot(options["name"])
-        self._checkout_snapshot(snapshot, force=bool(options["force"]))
+        snapshots = self.get_snapshots(options["name"])
+        self._checkout_snapshots(
+            snapshots,
+            force=bool(options["force"]),
+            physical=bool(options["physical"]),
+            progress_format=options["progress"],
+            resume=bool(options["resume"]),
+            atomic=bool(options["atomic"]),
+        )
@@ -1,6 +1,8 @@
 import sys
+from typing import Optional
 
 from django.core.management import CommandError
+from django.db import transaction
 
 from ._private import BaseLiquidbCommand
 from ...db_tools import SnapshotCreationHandler, SnapshotHandlerException
@@ -10,6 +12,7 @@ class Command(BaseLiquidbCommand):
     help = "Create snapshot of migration state."
 
     def add_arguments(self, parser):
+        super().add_arguments(parser)
         parser.add_argument(
             "--name",
             type=str,
@@ -22,17 +25,62 @@ class Command(BaseLiquidbCommand):
             choices=[0, 1],
             help="If snapshot with given name exist it will overwrite it",
         )
+        parser.add_argument(
+            "--physical",
+            type=int,
+            default=0,
+            choices=[0, 1],
+            help="Keep physical copy of database to restore it on checkout",
+        )
 
-    def _handle(self, *args, **options):
-        snapshot_name = options["name"]
-        handler = SnapshotCreationHandler(snapshot_name, bool(options["overwrite"]))
+    def _create(
+        self, snapshot_name: str, database: str, options
+    ) -> Optional[SnapshotCreationHandler]:
+        handler = SnapshotCreationHandler(
+            snapshot_name, bool(options["overwrite"]), database=database
+        )
         try:
             created = handler.create()
         except SnapshotHandlerException as e:
             raise CommandError(e.error) from e
         if not created:
             self.stdout.write(
-                "All migrations saved in currently applied snapshot. Nothing to create"
+                self.database_message(
+                    "All migrations saved in currently applied snapshot. "
+                    "Nothing to create",
+                    database,
+                )
             )
+            return None
+        self.stdout.write(
+            self.database_message(
+                f'Snapshot "{snapshot_name}" successfully save', database
+            )
+        )
+        return handler
+
+    def _handle(self, *args, **options):
+        snapshot_name = options["name"]
+        handlers = []
+        # snapshot is saved for all databases or for none of them
+        with transaction.atomic():
+            for database in self.databases:
+                handler = self._create(snapshot_name, database, options)
+                if handler is not None:
+                    handlers.append(handler)
+        if not handlers:
             sys.exit(0)
-        self.stdout.write(f'Snapshot "{snapshot_name}" successfully save')
+        if not options["physical"]:
+            return
+        # database could be copied only after snapshot is committed
+        for handler in handlers:
+            try:
+                handler.create_physical_copy()
+            except SnapshotHandlerException as e:
+                raise CommandError(e.error) from e
+            self.stdout.write(
+                self.database_message(
+                    f'Physical copy of "{snapshot_name}" successfully save',
+                    handler.database,
+                )
+            )
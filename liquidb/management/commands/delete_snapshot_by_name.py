@@ -4,12 +4,14 @@ from django.core.management import CommandError
 from django.db import transaction
 
 from ._private import BaseLiquidbRevertCommand
+from ...db_tools import delete_unreferenced_migrations
 
 
 class Command(BaseLiquidbRevertCommand):
     help = "Delete snapshot by name"
 
     def add_arguments(self, parser):
+        super().add_arguments(parser)
         parser.add_argument(
             "--name",
             type=str,
@@ -26,7 +28,7 @@ class Command(BaseLiquidbRevertCommand):
     def _handle(self, *args, **options):
         name = options["name"]
         interactive = options["interactive"]
-        snapshot = self.get_snapshot(name)
+        snapshots = self.get_snapshots(name)
         if interactive:
             confirm = input(
                 f"""
@@ -39,13 +41,20 @@ class Command(BaseLiquidbRevertCommand):
                 self.stdout.write("Snapshot deletion is canceled")
                 sys.exit(0)
 
-        if snapshot.applied:
-            raise CommandError(
-                f"Snapshot with name {name} is applied and couldn't be deleted"
-            )
+        for snapshot in snapshots:
+            if snapshot.applied:
+                raise CommandError(
+                    self.database_message(
+                        f"Snapshot with name {name} is applied and couldn't be deleted",
+                        snapshot.database,
+                    )
+                )
         with transaction.atomic():
-            _total, models = snapshot.delete()
-            migrations_states = models.get("liquidb.MigrationState", 0)
+            for snapshot in snapshots:
+                snapshot.delete()
+            # migrations are shared between snapshots
+            # so delete only those nobody references
+            migrations_states = delete_unreferenced_migrations()
 
         self.stdout.write(
             f'Successfully deleted snapshot "{name}" and {migrations_states} migrations'
@@ -3,6 +3,11 @@ import sys
 from django.db import transaction
 
 from ._private import BaseLiquidbRevertCommand
+from ...db_tools import (
+    delete_all_migrations,
+    delete_snapshot_rows,
+    delete_unreferenced_migrations,
+)
 from ...models import Snapshot
 
 
@@ -10,6 +15,7 @@ class Command(BaseLiquidbRevertCommand):
     help = "Delete all history of snapshots"
 
     def add_arguments(self, parser):
+        super().add_arguments(parser)
         parser.add_argument(
             "--noinput",
             action="store_false",
@@ -33,9 +39,14 @@ class Command(BaseLiquidbRevertCommand):
                 self.stdout.write("Snapshot history deletion is canceled")
                 sys.exit(0)
         with transaction.atomic():
-            _total, models = Snapshot.objects.all().delete()
-            snapshots = models.get("liquidb.Snapshot", 0)
-            migrations_states = models.get("liquidb.MigrationState", 0)
+            snapshots = delete_snapshot_rows(
+                Snapshot.objects.filter(database__in=self.databases)
+            )
+            if Snapshot.objects.exists():
+                # snapshots of other databases could share migrations
+                migrations_states = delete_unreferenced_migrations()
+            else:
+                migrations_states = delete_all_migrations()
         self.stdout.write(
             f"Successfully deleted history of {snapshots} "
             f"snapshots and {migrations_states} migrations"
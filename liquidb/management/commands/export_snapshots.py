@@ -0,0 +1,36 @@
+import gzip
+import time
+
+from ._private import BaseLiquidbCommand
+from ...archive import export_history, write_history
+
+
+class Command(BaseLiquidbCommand):
+    help = "Export history of snapshots to gzipped json lines file"
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument(
+            "--output",
+            type=str,
+            required=True,
+            help="Path of created file, for example snapshots.jsonl.gz",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=1000,
+            help="Number of rows read from database at once",
+        )
+
+    def _handle(self, *args, **options):
+        started = time.perf_counter()
+        with gzip.open(options["output"], "wt", encoding="utf-8") as output:
+            written = write_history(
+                output, export_history(self.databases, options["chunk_size"])
+            )
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f"Exported {written} records to {options['output']} "
+            f"in {elapsed:.1f}s ({written / max(elapsed, 1e-6):.0f} records/s)"
+        )
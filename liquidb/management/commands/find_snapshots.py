@@ -0,0 +1,58 @@
+import json
+
+from ._private import BaseLiquidbCommand
+from ...db_tools import find_snapshots
+
+
+class Command(BaseLiquidbCommand):
+    help = "Show snapshots that contain given migration"
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument(
+            "--app",
+            type=str,
+            required=True,
+            help="App label of migration",
+        )
+        parser.add_argument(
+            "--migration",
+            type=str,
+            required=True,
+            help="Name of migration",
+        )
+        parser.add_argument(
+            "--format",
+            type=str,
+            default="text",
+            choices=["text", "json"],
+            help="Output format",
+        )
+
+    def _handle(self, *args, **options):
+        app, migration = options["app"], options["migration"]
+        snapshots = list(
+            find_snapshots(app, migration)
+            .filter(database__in=self.databases)
+            .order_by("database", "-created", "-id")
+            .values("name", "database", "created", "applied")
+        )
+        if options["format"] == "json":
+            for snapshot in snapshots:
+                snapshot["created"] = snapshot["created"].isoformat()
+            self.stdout.write(json.dumps(snapshots))
+            return
+
+        if not snapshots:
+            self.stdout.write(f"No snapshot contains migration {app}.{migration}")
+            return
+        self.stdout.write(f"Snapshots with migration {app}.{migration}:")
+        for snapshot in snapshots:
+            applied = " (applied)" if snapshot["applied"] else ""
+            self.stdout.write(
+                self.database_message(
+                    f"  {snapshot['name']} {snapshot['created']:%Y-%m-%d %H:%M:%S}"
+                    f"{applied}",
+                    snapshot["database"],
+                )
+            )
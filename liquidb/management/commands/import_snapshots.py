@@ -0,0 +1,53 @@
+import gzip
+import time
+
+from django.core.management import CommandError
+
+from ._private import BaseLiquidbCommand
+from ...archive import (
+    MIGRATION_SET,
+    MIGRATION_STATE,
+    SNAPSHOT,
+    ArchiveException,
+    import_history,
+    read_history,
+)
+
+
+class Command(BaseLiquidbCommand):
+    help = "Import history of snapshots exported by export_snapshots"
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument(
+            "--input",
+            type=str,
+            required=True,
+            help="Path of file created by export_snapshots",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=1000,
+            help="Number of rows inserted in one transaction",
+        )
+
+    def _handle(self, *args, **options):
+        started = time.perf_counter()
+        try:
+            with gzip.open(options["input"], "rt", encoding="utf-8") as lines:
+                imported = import_history(
+                    read_history(lines), self.databases, options["chunk_size"]
+                )
+        except (OSError, ValueError) as error:
+            raise CommandError(f"Can't read {options['input']}: {error}") from error
+        except ArchiveException as error:
+            raise CommandError(error.error) from error
+        elapsed = time.perf_counter() - started
+        total = sum(imported.values())
+        self.stdout.write(
+            f"Imported {imported[SNAPSHOT]} snapshots, "
+            f"{imported[MIGRATION_SET]} migration sets and "
+            f"{imported[MIGRATION_STATE]} migrations "
+            f"in {elapsed:.1f}s ({total / max(elapsed, 1e-6):.0f} rows/s)"
+        )
@@ -0,0 +1,104 @@
+import json
+from itertools import groupby
+
+from django.db.models import Avg, Count, Max
+
+from ._private import BaseLiquidbCommand
+from ...models import MigrationTiming
+from ...timings import percentile
+
+_PERCENTILES = (50, 90, 99)
+
+
+class Command(BaseLiquidbCommand):
+    help = "Show slowest migrations and percentiles of migration time per app"
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=10,
+            help="Number of slowest migrations to show",
+        )
+        parser.add_argument(
+            "--app",
+            type=str,
+            help="Show timings only of given app",
+        )
+        parser.add_argument(
+            "--direction",
+            type=str,
+            choices=["forward", "backward"],
+            help="Show timings only of applied or unapplied migrations",
+        )
+        parser.add_argument(
+            "--format",
+            type=str,
+            default="text",
+            choices=["text", "json"],
+            help="Output format",
+        )
+
+    def _timings(self, options):
+        timings = MigrationTiming.objects.filter(database__in=self.databases)
+        if options["app"]:
+            timings = timings.filter(app=options["app"])
+        if options["direction"]:
+            timings = timings.filter(direction=options["direction"])
+        return timings
+
+    @staticmethod
+    def _slowest(timings, limit: int) -> list:
+        return list(
+            timings.values("app", "name", "direction")
+            .annotate(
+                runs=Count("id"), average=Avg("duration"), slowest=Max("duration")
+            )
+            .order_by("-slowest", "app", "name")[:limit]
+        )
+
+    @staticmethod
+    def _apps(timings) -> list:
+        rows = (
+            timings.order_by("app", "duration")
+            .values_list("app", "duration")
+            .iterator(chunk_size=2000)
+        )
+        apps = []
+        for app, group in groupby(rows, key=lambda row: row[0]):
+            durations = [duration for _, duration in group]
+            stats = {"app": app, "runs": len(durations), "total": sum(durations)}
+            for percent in _PERCENTILES:
+                stats[f"p{percent}"] = percentile(durations, percent)
+            stats["max"] = durations[-1]
+            apps.append(stats)
+        return apps
+
+    def _handle(self, *args, **options):
+        timings = self._timings(options)
+        slowest = self._slowest(timings, options["limit"])
+        apps = self._apps(timings)
+        if options["format"] == "json":
+            self.stdout.write(json.dumps({"slowest": slowest, "apps": apps}))
+            return
+
+        if not apps:
+            self.stdout.write("No migration timings recorded")
+            return
+        self.stdout.write("Slowest migrations:")
+        for index, row in enumerate(slowest, start=1):
+            self.stdout.write(
+                f"  {index}. {row['direction']} {row['app']}.{row['name']} "
+                f"max {row['slowest']:.3f}s avg {row['average']:.3f}s "
+                f"({row['runs']} runs)"
+            )
+        self.stdout.write("Per app:")
+        for stats in apps:
+            percentiles = " ".join(
+                f"p{percent} {stats[f'p{percent}']:.3f}s" for percent in _PERCENTILES
+            )
+            self.stdout.write(
+                f"  {stats['app']}: {percentiles} max {stats['max']:.3f}s "
+                f"total {stats['total']:.3f}s ({stats['runs']} runs)"
+            )
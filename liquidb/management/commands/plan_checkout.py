@@ -0,0 +1,78 @@
+import json
+
+from django.core.management import CommandError
+
+from ._private import BaseLiquidbCommand
+from ...db_tools import SnapshotCheckoutHandler, SnapshotHandlerException
+from ...models import Snapshot
+
+
+class Command(BaseLiquidbCommand):
+    help = "Show migrations that checkout to given snapshot would apply or unapply"
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument(
+            "--name",
+            type=str,
+            help="Name of snapshot to plan checkout to",
+        )
+        parser.add_argument(
+            "--format",
+            type=str,
+            default="text",
+            choices=["text", "json"],
+            help="Output format",
+        )
+
+    def _handle(self, *args, **options):
+        for snapshot in self.get_snapshots(options["name"]):
+            self._plan(snapshot, options["format"])
+
+    def _plan(self, snapshot: Snapshot, output_format: str):
+        handler = SnapshotCheckoutHandler(snapshot)
+        try:
+            steps = handler.plan()
+        except SnapshotHandlerException as e:
+            raise CommandError(e.error) from e
+
+        if output_format == "json":
+            # one line per database
+            self.stdout.write(
+                json.dumps(
+                    {
+                        "snapshot": snapshot.name,
+                        "database": snapshot.database,
+                        "steps": [step._asdict() for step in steps],
+                    }
+                )
+            )
+            return
+
+        if not steps:
+            self.stdout.write(
+                self.database_message(
+                    f'Nothing to do to checkout to "{snapshot.name}"',
+                    snapshot.database,
+                )
+            )
+            return
+        self.stdout.write(
+            self.database_message(
+                f'Plan to checkout to "{snapshot.name}"', snapshot.database
+            )
+            + ":"
+        )
+        for index, step in enumerate(steps, start=1):
+            operations = ", ".join(step.operations) or "no operations"
+            tables = ", ".join(step.tables) or "unknown"
+            rows = "?" if step.estimated_rows is None else step.estimated_rows
+            duration = (
+                "?"
+                if step.estimated_duration is None
+                else f"{step.estimated_duration:.1f}s"
+            )
+            self.stdout.write(
+                f"  {index}. {step.direction} {step.app}.{step.name} "
+                f"[{operations}] tables: {tables} (~{rows} rows, ~{duration})"
+            )
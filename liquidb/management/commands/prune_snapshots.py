@@ -0,0 +1,67 @@
+from django.core.management import CommandError
+
+from ._private import BaseLiquidbCommand
+from ...retention import (
+    RetentionPolicy,
+    delete_snapshots_in_chunks,
+    prunable_snapshots,
+)
+
+
+class Command(BaseLiquidbCommand):
+    help = "Delete old snapshots according to SNAPSHOT_RETENTION policy"
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument(
+            "--keep-last",
+            type=int,
+            help="Number of newest snapshots to keep in every database",
+        )
+        parser.add_argument(
+            "--keep-days",
+            type=int,
+            help="Keep snapshots created during given number of days",
+        )
+        parser.add_argument(
+            "--keep-name",
+            type=str,
+            action="append",
+            dest="keep_names",
+            help="Regular expression of snapshot names to keep, could be repeated",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=1000,
+            help="Number of snapshots deleted in one transaction",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            default=False,
+            help="Only show number of snapshots that would be deleted",
+        )
+
+    def _handle(self, *args, **options):
+        overrides = {
+            key: options[key]
+            for key in ("keep_last", "keep_days", "keep_names")
+            if options[key] is not None
+        }
+        policy = RetentionPolicy.from_settings(**overrides)
+        if policy.is_empty:
+            raise CommandError(
+                "No retention policy. Please set SNAPSHOT_RETENTION "
+                "or use --keep-last or --keep-days option."
+            )
+        snapshots = prunable_snapshots(policy, self.databases)
+        if options["dry_run"]:
+            self.stdout.write(f"{snapshots.count()} snapshots would be deleted")
+            return
+        deleted, migrations = delete_snapshots_in_chunks(
+            snapshots, options["chunk_size"]
+        )
+        self.stdout.write(
+            f"Successfully deleted {deleted} snapshots and {migrations} migrations"
+        )
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.6 on 2026-10-18 10:56
+
+from django.db import migrations, models
+
+from liquidb.state import _create_migration_hash
+
+
+def backfill_migration_hash(apps, schema_editor):
+    Snapshot = apps.get_model("liquidb", "Snapshot")
+    MigrationState = apps.get_model("liquidb", "MigrationState")
+    db_alias = schema_editor.connection.alias
+    for snapshot in Snapshot.objects.using(db_alias).only("id").iterator():
+        migrations_state = MigrationState.objects.using(db_alias).filter(
+            snapshot_id=snapshot.id
+        )
+        snapshot.migration_hash = _create_migration_hash(
+            migrations_state.values_list("app", "name")
+        )
+        snapshot.save(update_fields=["migration_hash"])
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("liquidb", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="snapshot",
+            name="migration_hash",
+            field=models.CharField(
+                db_index=True, default="", editable=False, max_length=32
+            ),
+        ),
+        migrations.RunPython(backfill_migration_hash, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 4.2.6 on 2026-10-18 11:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("liquidb", "0002_snapshot_migration_hash"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="MigrationSet",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("migration_hash", models.CharField(max_length=32, unique=True)),
+                (
+                    "states",
+                    models.ManyToManyField(
+                        related_name="migration_sets", to="liquidb.migrationstate"
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddField(
+            model_name="snapshot",
+            name="migration_set",
+            field=models.ForeignKey(
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="snapshots",
+                to="liquidb.migrationset",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="migrationstate",
+            name="snapshot",
+            field=models.ForeignKey(
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="migrations",
+                to="liquidb.snapshot",
+            ),
+        ),
+    ]
@@ -0,0 +1,89 @@
+# Generated by Django 4.2.6 on 2026-10-18 11:00
+
+from django.db import migrations
+
+from liquidb.models import _migration_state_uuid
+from liquidb.state import _create_migration_hash
+
+
+def move_states_to_migration_sets(apps, schema_editor):
+    Snapshot = apps.get_model("liquidb", "Snapshot")
+    MigrationState = apps.get_model("liquidb", "MigrationState")
+    MigrationSet = apps.get_model("liquidb", "MigrationSet")
+    Through = MigrationSet.states.through
+    db_alias = schema_editor.connection.alias
+    for snapshot in Snapshot.objects.using(db_alias).iterator():
+        migrations_state = list(
+            MigrationState.objects.using(db_alias)
+            .filter(snapshot_id=snapshot.id)
+            .values_list("migration_id", "app", "name")
+        )
+        migration_hash = _create_migration_hash(
+            [(app, name) for _, app, name in migrations_state]
+        )
+        migration_set, created = MigrationSet.objects.using(db_alias).get_or_create(
+            migration_hash=migration_hash
+        )
+        if created:
+            MigrationState.objects.using(db_alias).bulk_create(
+                [
+                    MigrationState(
+                        uuid=_migration_state_uuid(app, name),
+                        migration_id=migration_id,
+                        app=app,
+                        name=name,
+                    )
+                    for migration_id, app, name in migrations_state
+                ],
+                batch_size=1000,
+                ignore_conflicts=True,
+            )
+            Through.objects.using(db_alias).bulk_create(
+                [
+                    Through(
+                        migrationset_id=migration_set.id,
+                        migrationstate_id=_migration_state_uuid(app, name),
+                    )
+                    for _, app, name in migrations_state
+                ],
+                batch_size=1000,
+            )
+        snapshot.migration_hash = migration_hash
+        snapshot.migration_set = migration_set
+        snapshot.save(update_fields=["migration_hash", "migration_set"])
+    MigrationState.objects.using(db_alias).filter(snapshot__isnull=False).delete()
+
+
+def move_states_to_snapshots(apps, schema_editor):
+    Snapshot = apps.get_model("liquidb", "Snapshot")
+    MigrationState = apps.get_model("liquidb", "MigrationState")
+    db_alias = schema_editor.connection.alias
+    for snapshot in Snapshot.objects.using(db_alias).iterator():
+        migrations_state = MigrationState.objects.using(db_alias).filter(
+            migration_sets=snapshot.migration_set_id
+        )
+        MigrationState.objects.using(db_alias).bulk_create(
+            [
+                MigrationState(
+                    snapshot_id=snapshot.id,
+                    migration_id=migration_id,
+                    app=app,
+                    name=name,
+                )
+                for migration_id, app, name in migrations_state.values_list(
+                    "migration_id", "app", "name"
+                )
+            ],
+            batch_size=1000,
+        )
+    MigrationState.objects.using(db_alias).filter(snapshot__isnull=True).delete()
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("liquidb", "0003_migrationset"),
+    ]
+
+    operations = [
+        migrations.RunPython(move_states_to_migration_sets, move_states_to_snapshots),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.6 on 2026-10-18 11:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("liquidb", "0004_move_states_to_migration_sets"),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name="migrationstate",
+            name="snapshot",
+        ),
+        migrations.AddConstraint(
+            model_name="migrationstate",
+            constraint=models.UniqueConstraint(
+                fields=("app", "name"), name="unique_migration_state"
+            ),
+        ),
+        migrations.AlterField(
+            model_name="snapshot",
+            name="migration_set",
+            field=models.ForeignKey(
+                editable=False,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="snapshots",
+                to="liquidb.migrationset",
+            ),
+        ),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 4.2.6 on 2026-10-18 11:02
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def materialize_deltas(apps, schema_editor):
+    MigrationSet = apps.get_model("liquidb", "MigrationSet")
+    Through = MigrationSet.states.through
+    db_alias = schema_editor.connection.alias
+    # parent of every delta is already turned into keyframe
+    delta_sets = MigrationSet.objects.using(db_alias).filter(parent__isnull=False)
+    for migration_set in delta_sets.order_by("depth").iterator():
+        states = dict(
+            Through.objects.using(db_alias)
+            .filter(migrationset_id=migration_set.parent_id)
+            .values_list("migrationstate__app", "migrationstate_id")
+        )
+        own_apps = set(
+            Through.objects.using(db_alias)
+            .filter(migrationset_id=migration_set.id)
+            .values_list("migrationstate__app", flat=True)
+        )
+        Through.objects.using(db_alias).bulk_create(
+            [
+                Through(migrationset_id=migration_set.id, migrationstate_id=state_id)
+                for app, state_id in states.items()
+                if app not in own_apps
+            ],
+            batch_size=1000,
+        )
+        migration_set.parent_id = None
+        migration_set.depth = 0
+        migration_set.save(update_fields=["parent", "depth"])
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("liquidb", "0005_remove_migrationstate_snapshot"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="migrationset",
+            name="depth",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="migrationset",
+            name="parent",
+            field=models.ForeignKey(
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="children",
+                to="liquidb.migrationset",
+            ),
+        ),
+        migrations.AddField(
+            model_name="snapshot",
+            name="parent",
+            field=models.ForeignKey(
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="children",
+                to="liquidb.snapshot",
+            ),
+        ),
+        migrations.RunPython(migrations.RunPython.noop, materialize_deltas),
+    ]
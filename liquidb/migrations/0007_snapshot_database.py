@@ -0,0 +1,33 @@
+# Generated by Django 4.2.6 on 2026-10-18 12:10
+
+from django.db import migrations, models
+import liquidb.models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("liquidb", "0006_snapshot_parent_migrationset_delta"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="snapshot",
+            name="database",
+            field=models.CharField(
+                db_index=True, default="default", editable=False, max_length=255
+            ),
+        ),
+        migrations.AlterField(
+            model_name="snapshot",
+            name="name",
+            field=models.TextField(
+                db_index=True, default=liquidb.models._generate_commit_name
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="snapshot",
+            constraint=models.UniqueConstraint(
+                fields=("name", "database"), name="unique_snapshot_name"
+            ),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 4.2.6 on 2026-10-18 11:26
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("liquidb", "0007_snapshot_database"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PhysicalCopy",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("database", models.CharField(default="default", max_length=255)),
+                ("vendor", models.CharField(max_length=32)),
+                ("location", models.TextField()),
+                ("size", models.PositiveBigIntegerField(default=0)),
+                ("liquidb_migration", models.CharField(default="", max_length=255)),
+                ("created", models.DateTimeField(default=django.utils.timezone.now)),
+                (
+                    "last_used",
+                    models.DateTimeField(
+                        db_index=True, default=django.utils.timezone.now
+                    ),
+                ),
+                (
+                    "snapshot",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="physical_copy",
+                        to="liquidb.snapshot",
+                    ),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 4.2.6 on 2026-10-18 11:28
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("liquidb", "0008_physicalcopy"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="MigrationTiming",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("database", models.CharField(default="default", max_length=255)),
+                ("vendor", models.CharField(max_length=32)),
+                ("app", models.CharField(max_length=255)),
+                ("name", models.CharField(max_length=255)),
+                (
+                    "direction",
+                    models.CharField(
+                        choices=[("forward", "Forward"), ("backward", "Backward")],
+                        max_length=8,
+                    ),
+                ),
+                ("duration", models.FloatField()),
+                ("created", models.DateTimeField(default=django.utils.timezone.now)),
+                (
+                    "snapshot",
+                    models.ForeignKey(
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="timings",
+                        to="liquidb.snapshot",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(fields=["app", "duration"], name="timing_app_duration")
+                ],
+            },
+        ),
+    ]
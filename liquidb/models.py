@@ -1,15 +1,19 @@
-import hashlib
-from typing import Tuple, List
-from uuid import uuid4
+from typing import List
+from uuid import NAMESPACE_OID, UUID, uuid3, uuid4
 
-from django.db import models, connection
-from django.db.migrations.recorder import MigrationRecorder
-from django.db.models import Max, Index, Q
+from django.db import DEFAULT_DB_ALIAS, connections, models
+from django.db.models import Exists, Index, OuterRef, Q, UniqueConstraint
 from django.utils.crypto import get_random_string
-from django.utils.functional import cached_property
 from django.utils.timezone import now
 
-from liquidb.consts import SELF_NAME
+from liquidb.plan import BACKWARD, FORWARD
+from liquidb.state import get_current_migration_state
+
+# kept importable from models for backward compatibility
+from liquidb.state import (  # NOQA # pylint: disable=unused-import
+    _create_migration_hash,
+    get_latest_applied_migrations_qs,
+)
 
 
 def _generate_commit_name() -> str:
@@ -19,48 +23,49 @@ def _generate_commit_name() -> str:
     return f"{salt}_{date}"
 
 
-def _create_migration_hash(migration_identifiers: List[Tuple[str, str]]) -> str:
-    """create md5 out of tuples of [(app_name, migration_file), ...]"""
-    separator = ";"
-    inner_separator = "-"
-    # always sort alphabetically to ensure same result for unsorted app and sorted
-    joined_value = separator.join(
-        inner_separator.join([app, name]) for app, name in sorted(migration_identifiers)
-    )
-    # no reason to check it is only hash of commits
-    return hashlib.md5(joined_value.encode("utf-8")).hexdigest()  # nosec  # NOQA
-
-
-def get_latest_applied_migrations_qs(
-    connection_obj=None,
-) -> "QuerySet[MigrationRecorder.Migration]":
-    """Return latest applied migration in all django apps in project"""
-    if connection_obj is None:
-        connection_obj = connection
-    recorder = MigrationRecorder(connection_obj)
-    migration_qs = recorder.migration_qs.exclude(app=SELF_NAME)
-    lastest_ids = (
-        migration_qs.values("app")
-        .annotate(latest_id=Max("id"))
-        .values_list(
-            "latest_id",
-            flat=True,
-        )
-    )
-    return migration_qs.filter(id__in=lastest_ids)
+def _migration_state_uuid(app: str, name: str) -> UUID:
+    """Content address of migration, same (app, name) always has same uuid"""
+    return uuid3(NAMESPACE_OID, f"{app}-{name}")
 
 
 class Snapshot(models.Model):
-    name = models.TextField(default=_generate_commit_name, db_index=True, unique=True)
+    name = models.TextField(default=_generate_commit_name, db_index=True)
+    # alias of database which migration state is saved
+    database = models.CharField(
+        max_length=255, db_index=True, default=DEFAULT_DB_ALIAS, editable=False
+    )
     created = models.DateTimeField(default=now)
     applied = models.BooleanField(default=False)
+    # md5 of all connected migrations computed once on creation
+    # see liquidb.state._create_migration_hash
+    migration_hash = models.CharField(
+        max_length=32, db_index=True, default="", editable=False
+    )
+    # many snapshots can share the same set of migrations
+    migration_set = models.ForeignKey(
+        "MigrationSet",
+        on_delete=models.PROTECT,
+        related_name="snapshots",
+        editable=False,
+    )
+    # snapshot that was applied when this one was created
+    parent = models.ForeignKey(
+        "self",
+        null=True,
+        on_delete=models.SET_NULL,
+        related_name="children",
+        editable=False,
+    )
 
     class Meta:
         indexes = [
             # by default all applied is false
-            # only one row can be applied at the time
+            # only one row per database can be applied at the time
             Index(fields=["applied"], name="unique_applied", condition=Q(applied=True))
         ]
+        constraints = [
+            UniqueConstraint(fields=["name", "database"], name="unique_snapshot_name")
+        ]
 
     def __repr__(self):
         class_name = self.__class__.__name__
@@ -69,34 +74,212 @@ class Snapshot(models.Model):
     def __eq__(self, other):
         if not isinstance(other, Snapshot):
             return False
-        return self.migration_hash == other.migration_hash
+        return (
+            self.database == other.database
+            and self.migration_hash == other.migration_hash
+        )
 
     def __hash__(self):
-        return hash(self.migration_hash)
+        return hash((self.database, self.migration_hash))
 
     @property
     def consistent_state(self) -> bool:
         """Return True if all connected migrations to current snapshot is applied"""
-        current_state = get_latest_applied_migrations_qs().values_list("app", "name")
-        current_hash = _create_migration_hash(current_state)
-        return self.migration_hash == current_hash
+        current_state = get_current_migration_state(connections[self.database])
+        return self.migration_hash == current_state.migration_hash
 
-    @cached_property
-    def migration_hash(self) -> str:
-        """Generate migration hash"""
-        return _create_migration_hash(self.migrations.values_list("app", "name"))
+    @property
+    def migrations(self) -> "QuerySet[MigrationState]":
+        """All migrations saved in this snapshot"""
+        if self.migration_set_id is None:
+            return MigrationState.objects.none()
+        return self.migration_set.migrations
 
 
 class MigrationState(models.Model):
+    # stored once for every distinct (app, name)
+    # see liquidb.models._migration_state_uuid
     uuid = models.UUIDField(unique=True, primary_key=True, db_index=True, default=uuid4)
-    snapshot = models.ForeignKey(
-        Snapshot, on_delete=models.CASCADE, related_name="migrations"
-    )
     migration_id = models.IntegerField(db_index=True)
     # redundant info to restore migration
     # from django/db/migrations/recorder.py:30
     app = models.CharField(max_length=255)
     name = models.CharField(max_length=255)
 
+    class Meta:
+        constraints = [
+            UniqueConstraint(fields=["app", "name"], name="unique_migration_state")
+        ]
+
     def __repr__(self):
         return f"Migration {self.app} {self.name}"
+
+
+class MigrationSet(models.Model):
+    # md5 of all migrations in set
+    # see liquidb.state._create_migration_hash
+    migration_hash = models.CharField(max_length=32, unique=True)
+    # keyframe (without parent) stores all migrations
+    # delta stores only migrations changed since parent set
+    parent = models.ForeignKey(
+        "self", null=True, on_delete=models.CASCADE, related_name="children"
+    )
+    # number of deltas since keyframe
+    depth = models.PositiveIntegerField(default=0)
+    states = models.ManyToManyField(MigrationState, related_name="migration_sets")
+
+    def __repr__(self):
+        return f"MigrationSet {self.migration_hash}"
+
+    def _chain(self) -> List[int]:
+        """Return ids of this set and all its parents up to keyframe"""
+        chain = [self.id]
+        parent_id = self.parent_id
+        while parent_id is not None:
+            chain.append(parent_id)
+            parent_id = MigrationSet.objects.values_list("parent_id", flat=True).get(
+                pk=parent_id
+            )
+        return chain
+
+    def state_ids(self) -> List[UUID]:
+        """Return uuids of all migrations in set rebuilt from keyframe and deltas"""
+        return list(self.migrations.values_list("uuid", flat=True))
+
+    @property
+    def migrations(self) -> "QuerySet[MigrationState]":
+        """All migrations in this set, deltas are resolved by database"""
+        if self.parent_id is None:
+            return MigrationState.objects.filter(migration_sets=self.id)
+        chain = MigrationSet.states.through.objects.filter(
+            migrationset_id__in=self._chain()
+        )
+        # the closest set to this one has latest migrations of app,
+        # app with unmerged branches has several migrations in one set
+        overridden = chain.filter(
+            migrationstate__app=OuterRef("migrationstate__app"),
+            migrationset__depth__gt=OuterRef("migrationset__depth"),
+        )
+        return MigrationState.objects.filter(
+            uuid__in=chain.exclude(Exists(overridden)).values("migrationstate_id")
+        )
+
+
+class PhysicalCopy(models.Model):
+    # copy of whole database taken when snapshot was created
+    # see liquidb.physical
+    snapshot = models.OneToOneField(
+        Snapshot, on_delete=models.CASCADE, related_name="physical_copy"
+    )
+    # alias and vendor of copied database
+    database = models.CharField(max_length=255, default=DEFAULT_DB_ALIAS)
+    vendor = models.CharField(max_length=32)
+    # file path for sqlite, database name for postgresql
+    location = models.TextField()
+    size = models.PositiveBigIntegerField(default=0)
+    # latest applied migration of liquidb when copy was taken
+    # copy with other liquidb schema can't be restored
+    liquidb_migration = models.CharField(max_length=255, default="")
+    created = models.DateTimeField(default=now)
+    last_used = models.DateTimeField(default=now, db_index=True)
+
+    def __repr__(self):
+        return f"PhysicalCopy {self.vendor} {self.location}"
+
+
+class MigrationTiming(models.Model):
+    # wall time of one migration applied or unapplied during checkout
+    # see liquidb.timings.MigrationTimer
+    snapshot = models.ForeignKey(
+        Snapshot, null=True, on_delete=models.SET_NULL, related_name="timings"
+    )
+    database = models.CharField(max_length=255, default=DEFAULT_DB_ALIAS)
+    vendor = models.CharField(max_length=32)
+    app = models.CharField(max_length=255)
+    name = models.CharField(max_length=255)
+    direction = models.CharField(
+        max_length=8, choices=[(FORWARD, "Forward"), (BACKWARD, "Backward")]
+    )
+    # seconds
+    duration = models.FloatField()
+    created = models.DateTimeField(default=now)
+
+    class Meta:
+        indexes = [Index(fields=["app", "duration"], name="timing_app_duration")]
+
+    def __repr__(self):
+        return f"MigrationTiming {self.app} {self.name} {self.direction}"
+
+
+class CheckoutJournal(models.Model):
+    # plan of checkout and number of its finished steps
+    # see liquidb.journal
+    RUNNING = "running"
+    COMPLETED = "completed"
+    ABANDONED = "abandoned"
+
+    snapshot = models.ForeignKey(
+        Snapshot, on_delete=models.CASCADE, related_name="journals"
+    )
+    database = models.CharField(max_length=255, default=DEFAULT_DB_ALIAS)
+    # [[app, name, direction], ...]
+    plan = models.JSONField(default=list)
+    completed = models.PositiveIntegerField(default=0)
+    status = models.CharField(
+        max_length=16,
+        default=RUNNING,
+        choices=[
+            (RUNNING, "Running"),
+            (COMPLETED, "Completed"),
+            (ABANDONED, "Abandoned"),
+        ],
+    )
+    created = models.DateTimeField(default=now)
+    updated = models.DateTimeField(default=now)
+
+    class Meta:
+        indexes = [
+            Index(
+                fields=["database"],
+                name="running_journal",
+                condition=Q(status="running"),
+            )
+        ]
+
+    def __repr__(self):
+        return f"CheckoutJournal {self.snapshot_id} {self.completed}/{len(self.plan)}"
+
+
+class CheckoutJob(models.Model):
+    # checkout started from admin and run in background
+    # see liquidb.jobs
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+    snapshot = models.ForeignKey(
+        Snapshot, on_delete=models.CASCADE, related_name="jobs"
+    )
+    database = models.CharField(max_length=255, default=DEFAULT_DB_ALIAS)
+    status = models.CharField(
+        max_length=16,
+        default=PENDING,
+        choices=[
+            (PENDING, "Pending"),
+            (RUNNING, "Running"),
+            (COMPLETED, "Completed"),
+            (FAILED, "Failed"),
+        ],
+    )
+    # journal of checkout, progress is number of its completed steps
+    journal = models.ForeignKey(
+        CheckoutJournal, null=True, on_delete=models.SET_NULL, related_name="jobs"
+    )
+    # latest progress message or error of failed checkout
+    message = models.TextField(default="")
+    created = models.DateTimeField(default=now)
+    updated = models.DateTimeField(default=now)
+
+    def __repr__(self):
+        return f"CheckoutJob {self.snapshot_id} {self.status}"
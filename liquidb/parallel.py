@@ -0,0 +1,114 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from typing import Dict, List, Optional, Tuple
+
+from django.db import connections
+from django.db.migrations.executor import MigrationExecutor
+from django.db.migrations.graph import MigrationGraph
+
+from liquidb.graph_cache import CachedMigrationExecutor
+from liquidb.settings import CHECKOUT_WORKERS
+
+Key = Tuple[str, str]
+
+
+def split_plan(migration_plan: List[tuple], graph: MigrationGraph) -> List[List[tuple]]:
+    """
+    Split plan of MigrationExecutor into chains that don't depend on each other.
+    Steps of one app are always in one chain, order of plan is kept in chain.
+    """
+    keys = [(migration.app_label, migration.name) for migration, _ in migration_plan]
+    roots: Dict[Key, Key] = {key: key for key in keys}
+
+    def find(key: Key) -> Key:
+        while roots[key] != key:
+            roots[key] = roots[roots[key]]
+            key = roots[key]
+        return key
+
+    first_of_app: Dict[str, Key] = {}
+    for key in keys:
+        related = [first_of_app.setdefault(key[0], key)]
+        node = graph.node_map[key]
+        related.extend(
+            other.key for other in node.parents | node.children if other.key in roots
+        )
+        for other in related:
+            roots[find(other)] = find(key)
+
+    chains: Dict[Key, List[tuple]] = {}
+    for step, key in zip(migration_plan, keys):
+        chains.setdefault(find(key), []).append(step)
+    return list(chains.values())
+
+
+def _runs_in_parallel(connection_obj) -> bool:
+    """Sqlite has single writer, transaction of caller can't be shared"""
+    return connection_obj.vendor != "sqlite" and not connection_obj.in_atomic_block
+
+
+def _locked(callback):
+    lock = threading.Lock()
+
+    def locked_callback(*args, **kwargs):
+        with lock:
+            callback(*args, **kwargs)
+
+    return locked_callback
+
+
+class _ChainRunner:  # pylint: disable=too-few-public-methods
+    """Migrate chains on own connections, chains are skipped after first error"""
+
+    def __init__(self, alias: str, targets, progress_callback):
+        self.alias = alias
+        self.targets = targets
+        self.progress_callback = progress_callback
+        self.failed = threading.Event()
+
+    def __call__(self, chain: List[tuple]):
+        if self.failed.is_set():
+            return
+        try:
+            executor = CachedMigrationExecutor(
+                connections[self.alias], self.progress_callback
+            )
+            executor.migrate(self.targets, plan=chain)
+        except Exception:
+            self.failed.set()
+            raise
+        finally:
+            # connections are opened only for this thread
+            connections.close_all()
+
+
+def migrate_plan(
+    executor: MigrationExecutor,
+    targets,
+    migration_plan: List[tuple],
+    workers: Optional[int] = None,
+):
+    """
+    Run plan of executor, independent chains of plan are migrated
+    at the same time on separate connections if backend allows it.
+    """
+    workers = CHECKOUT_WORKERS if workers is None else workers
+    chains = split_plan(migration_plan, executor.loader.graph)
+    if workers <= 1 or len(chains) <= 1 or not _runs_in_parallel(executor.connection):
+        executor.migrate(targets, plan=migration_plan)
+        return
+    runner = _ChainRunner(
+        executor.connection.alias,
+        targets,
+        None
+        if executor.progress_callback is None
+        else _locked(executor.progress_callback),
+    )
+    with ThreadPoolExecutor(max_workers=min(workers, len(chains))) as pool:
+        # thread shares state cache of command, see liquidb.state
+        futures = [pool.submit(copy_context().run, runner, chain) for chain in chains]
+    for future in futures:
+        error = future.exception()
+        if error is not None:
+            raise error
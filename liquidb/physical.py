@@ -0,0 +1,322 @@
+import os
+import pickle  # nosec
+import sqlite3
+import tempfile
+from abc import ABCMeta, abstractmethod
+from contextlib import contextmanager
+from typing import List, Optional, Tuple
+from uuid import uuid4
+
+from django.apps import apps
+from django.core.management.color import no_style
+from django.db import DatabaseError, connections, transaction
+from django.db.migrations.recorder import MigrationRecorder
+from django.db.models import Sum
+from django.utils.timezone import now
+
+from liquidb.consts import SELF_NAME
+from liquidb.files import create_private_file, make_private_dir
+from liquidb.models import PhysicalCopy, Snapshot
+from liquidb.settings import PHYSICAL_SNAPSHOT_DIR, PHYSICAL_SNAPSHOT_DISK_BUDGET
+from liquidb.state import invalidate_migration_state
+
+# rows of liquidb tables read at once during restore
+_BATCH_SIZE = 1000
+
+
+class PhysicalCopyException(Exception):
+    def __init__(self, error):
+        self.error = error
+        super().__init__()
+
+
+class BasePhysicalBackend(metaclass=ABCMeta):
+    def __init__(self, connection_obj):
+        self.connection = connection_obj
+
+    @abstractmethod
+    def copy(self, name: str) -> Tuple[str, int]:
+        """Copy whole database, return location and size of copy in bytes"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def restore(self, location: str) -> Optional[str]:
+        """
+        Replace database with its copy, copy is kept. Return location
+        of replaced database if it is kept until restore is finished.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def drop(self, location: str):
+        """Remove copy at location, missing copy is ignored"""
+        raise NotImplementedError
+
+
+class SqliteBackend(BasePhysicalBackend):
+    """Copy through sqlite online backup API"""
+
+    def copy(self, name: str) -> Tuple[str, int]:
+        if not make_private_dir(PHYSICAL_SNAPSHOT_DIR):
+            raise PhysicalCopyException(
+                f"Directory {PHYSICAL_SNAPSHOT_DIR} of physical copies "
+                "is accessible by other users"
+            )
+        location = os.path.join(PHYSICAL_SNAPSHOT_DIR, f"{name}.sqlite3")
+        # copy has all data of database
+        create_private_file(location)
+        self.connection.ensure_connection()
+        target = sqlite3.connect(location)
+        try:
+            self.connection.connection.backup(target)
+        finally:
+            target.close()
+        return location, os.path.getsize(location)
+
+    def restore(self, location: str) -> Optional[str]:
+        if not os.path.exists(location):
+            raise PhysicalCopyException(f"Physical copy {location} doesn't exist")
+        self.connection.ensure_connection()
+        source = sqlite3.connect(location)
+        try:
+            source.backup(self.connection.connection)
+        finally:
+            source.close()
+        return None
+
+    def drop(self, location: str):
+        if os.path.exists(location):
+            os.remove(location)
+
+
+class PostgresqlBackend(BasePhysicalBackend):
+    """Keep copy as database created with source database as TEMPLATE"""
+
+    @contextmanager
+    def _server_cursor(self):
+        """Cursor connected to maintenance database, source could be dropped"""
+        # template database can't have other connections
+        self.connection.close()
+        try:
+            with self.connection._nodb_cursor() as cursor:  # pylint: disable=W0212
+                yield cursor
+        except DatabaseError as error:
+            raise PhysicalCopyException(str(error)) from error
+
+    def _quote(self, name: str) -> str:
+        return self.connection.ops.quote_name(name)
+
+    def copy(self, name: str) -> Tuple[str, int]:
+        source = self.connection.settings_dict["NAME"]
+        # database name is limited to 63 characters
+        location = f"liquidb_{name}"[:63]
+        with self._server_cursor() as cursor:
+            cursor.execute(
+                f"CREATE DATABASE {self._quote(location)} "
+                f"TEMPLATE {self._quote(source)}"
+            )
+            cursor.execute("SELECT pg_database_size(%s)", [location])
+            size = cursor.fetchone()[0]
+        return location, size
+
+    def restore(self, location: str) -> Optional[str]:
+        source = self.connection.settings_dict["NAME"]
+        previous = f"{source}_liquidb_{uuid4().hex[:8]}"[-63:]
+        with self._server_cursor() as cursor:
+            cursor.execute(
+                f"ALTER DATABASE {self._quote(source)} "
+                f"RENAME TO {self._quote(previous)}"
+            )
+            try:
+                cursor.execute(
+                    f"CREATE DATABASE {self._quote(source)} "
+                    f"TEMPLATE {self._quote(location)}"
+                )
+            except DatabaseError:
+                cursor.execute(
+                    f"ALTER DATABASE {self._quote(previous)} "
+                    f"RENAME TO {self._quote(source)}"
+                )
+                raise
+        # dropped after history of snapshots is put back
+        return previous
+
+    def drop(self, location: str):
+        with self._server_cursor() as cursor:
+            cursor.execute(f"DROP DATABASE IF EXISTS {self._quote(location)}")
+
+
+_BACKENDS = {
+    "sqlite": SqliteBackend,
+    "postgresql": PostgresqlBackend,
+}
+
+
+def get_backend(connection_obj) -> BasePhysicalBackend:
+    try:
+        backend_class = _BACKENDS[connection_obj.vendor]
+    except KeyError as error:
+        raise PhysicalCopyException(
+            f"Physical snapshots are not supported for {connection_obj.vendor}"
+        ) from error
+    return backend_class(connection_obj)
+
+
+def _latest_liquidb_migration(connection_obj) -> str:
+    recorder = MigrationRecorder(connection_obj)
+    latest = recorder.migration_qs.filter(app=SELF_NAME).order_by("-id").first()
+    return "" if latest is None else latest.name
+
+
+def _liquidb_models(connection_obj) -> List:
+    """Liquidb models which tables are stored in given database"""
+    with connection_obj.cursor() as cursor:
+        tables = set(connection_obj.introspection.table_names(cursor))
+    return [
+        model
+        for model in apps.get_app_config(SELF_NAME).get_models(
+            include_auto_created=True
+        )
+        if model._meta.db_table in tables
+    ]
+
+
+@contextmanager
+def _preserved_liquidb_tables(connection_obj):
+    """
+    Restore of copy should not revert history of snapshots,
+    rows are kept in temporary file and never loaded all at once.
+    """
+    models = _liquidb_models(connection_obj)
+    quote = connection_obj.ops.quote_name
+    columns = [
+        [field.column for field in model._meta.local_concrete_fields]
+        for model in models
+    ]
+    with tempfile.TemporaryFile() as spool:
+        for index, model in enumerate(models):
+            # server side cursor where backend supports it
+            with connection_obj.chunked_cursor() as cursor:
+                cursor.execute(
+                    f"SELECT {', '.join(map(quote, columns[index]))} "  # nosec
+                    f"FROM {quote(model._meta.db_table)}"
+                )
+                while True:
+                    rows = cursor.fetchmany(_BATCH_SIZE)
+                    if not rows:
+                        break
+                    pickle.dump((index, rows), spool)
+        yield
+        spool.seek(0)
+        # foreign keys of sqlite can't be disabled inside transaction
+        with connection_obj.constraint_checks_disabled():
+            with transaction.atomic(using=connection_obj.alias):
+                with connection_obj.cursor() as cursor:
+                    for model in models:
+                        cursor.execute(
+                            f"DELETE FROM {quote(model._meta.db_table)}"  # nosec
+                        )
+                    while True:
+                        try:
+                            index, rows = pickle.load(spool)  # nosec
+                        except EOFError:
+                            break
+                        placeholders = ", ".join(["%s"] * len(columns[index]))
+                        cursor.executemany(
+                            f"INSERT INTO {quote(models[index]._meta.db_table)} "
+                            f"({', '.join(map(quote, columns[index]))}) "
+                            f"VALUES ({placeholders})",  # nosec
+                            rows,
+                        )
+                    # copy could have older sequences
+                    for sql in connection_obj.ops.sequence_reset_sql(
+                        no_style(), models
+                    ):
+                        cursor.execute(sql)
+
+
+def create_physical_copy(snapshot: Snapshot) -> PhysicalCopy:
+    """Copy current database of snapshot and attach it to snapshot"""
+    connection_obj = connections[snapshot.database]
+    if connection_obj.in_atomic_block:
+        raise PhysicalCopyException("Physical copy can't be taken inside transaction")
+    backend = get_backend(connection_obj)
+    previous = PhysicalCopy.objects.filter(snapshot=snapshot).first()
+    if previous is not None:
+        # snapshot is overwritten
+        previous.delete()
+    location, size = backend.copy(f"{snapshot.database}_{snapshot.pk}_{uuid4().hex}")
+    physical_copy = PhysicalCopy.objects.create(
+        snapshot=snapshot,
+        database=snapshot.database,
+        vendor=connection_obj.vendor,
+        location=location,
+        size=size,
+        liquidb_migration=_latest_liquidb_migration(connection_obj),
+    )
+    enforce_disk_budget(keep=physical_copy)
+    return physical_copy
+
+
+def restore_physical_copy(physical_copy: PhysicalCopy):
+    """Swap database of snapshot with its physical copy"""
+    connection_obj = connections[physical_copy.database]
+    if connection_obj.in_atomic_block:
+        raise PhysicalCopyException(
+            "Physical copy can't be restored inside transaction"
+        )
+    if physical_copy.liquidb_migration != _latest_liquidb_migration(connection_obj):
+        raise PhysicalCopyException(
+            "Physical copy was taken with other version of liquidb tables"
+        )
+    backend = get_backend(connection_obj)
+    previous = None
+    try:
+        with _preserved_liquidb_tables(connection_obj):
+            previous = backend.restore(physical_copy.location)
+    except DatabaseError as error:
+        if previous is None:
+            raise
+        raise PhysicalCopyException(
+            f"History of snapshots is not restored, database before restore "
+            f"is kept as {previous}: {error}"
+        ) from error
+    finally:
+        invalidate_migration_state(connection_obj.alias)
+    if previous is not None:
+        backend.drop(previous)
+    physical_copy.last_used = now()
+    physical_copy.save(update_fields=["last_used"])
+
+
+def enforce_disk_budget(keep: Optional[PhysicalCopy] = None) -> int:
+    """Drop least recently used copies while all of them exceed budget"""
+    if PHYSICAL_SNAPSHOT_DISK_BUDGET is None:
+        return 0
+    total = PhysicalCopy.objects.aggregate(total=Sum("size"))["total"] or 0
+    dropped = 0
+    candidates = PhysicalCopy.objects.order_by("last_used", "id")
+    if keep is not None:
+        candidates = candidates.exclude(pk=keep.pk)
+    for physical_copy in candidates.iterator():
+        if total <= PHYSICAL_SNAPSHOT_DISK_BUDGET:
+            break
+        total -= physical_copy.size
+        physical_copy.delete()
+        dropped += 1
+    return dropped
+
+
+def drop_physical_copy(
+    sender, instance: PhysicalCopy, using=None, **kwargs
+):  # pylint: disable=unused-argument
+    """Receiver of post_delete, copy is dropped only after row is deleted"""
+
+    def _drop():
+        try:
+            get_backend(connections[instance.database]).drop(instance.location)
+        except (OSError, PhysicalCopyException):
+            # orphan copy is not worth failing delete of snapshot
+            pass
+
+    transaction.on_commit(_drop, using=using)
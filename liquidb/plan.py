@@ -0,0 +1,187 @@
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from django.apps import apps
+from django.db.migrations.exceptions import NodeNotFoundError
+from django.db.migrations.executor import MigrationExecutor
+from django.db.migrations.graph import MigrationGraph
+from django.db.migrations.operations.models import ModelOperation
+
+FORWARD = "forward"
+BACKWARD = "backward"
+
+
+class PlanStep(NamedTuple):
+    app: str
+    name: str
+    direction: str
+    operations: List[str]
+    tables: List[str]
+    # sum of rows in all touched tables, None if tables are unknown
+    estimated_rows: Optional[int]
+    # seconds from recorded timings (see liquidb.timings), None if never timed
+    estimated_duration: Optional[float] = None
+
+
+def _operation_table(app_label: str, operation) -> Optional[str]:
+    """Return db table changed by operation if it is bound to model"""
+    # AddField, AlterField, AddIndex, ...
+    model_name = getattr(operation, "model_name_lower", None)
+    if model_name is None and isinstance(operation, ModelOperation):
+        # CreateModel, DeleteModel, AlterModelTable, ...
+        model_name = operation.name_lower
+    if model_name is None:
+        # RunSQL, RunPython, SeparateDatabaseAndState, ...
+        return None
+    try:
+        return apps.get_model(app_label, model_name)._meta.db_table
+    except LookupError:
+        # model is deleted or renamed later, use default django naming
+        return f"{app_label}_{model_name}"
+
+
+def table_sizes(connection_obj, tables: Iterable[str]) -> Dict[str, int]:
+    """Return number of rows in existing tables, estimated where backend allows"""
+    with connection_obj.cursor() as cursor:
+        existing = set(connection_obj.introspection.table_names(cursor))
+        tables = sorted(existing.intersection(tables))
+        if not tables:
+            return {}
+        if connection_obj.vendor == "postgresql":
+            # planner statistics, no table scan
+            cursor.execute(
+                "SELECT relname, reltuples::bigint FROM pg_class "
+                "WHERE relkind = 'r' AND relname = ANY(%s)",
+                [tables],
+            )
+            # reltuples is -1 for never analyzed table
+            return {table: max(rows, 0) for table, rows in cursor.fetchall()}
+        if connection_obj.vendor == "mysql":
+            placeholders = ", ".join(["%s"] * len(tables))
+            cursor.execute(
+                "SELECT table_name, table_rows FROM information_schema.tables "
+                f"WHERE table_schema = DATABASE() AND table_name IN ({placeholders})",
+                tables,
+            )
+            return {table: rows or 0 for table, rows in cursor.fetchall()}
+        sizes = {}
+        for table in tables:
+            quoted = connection_obj.ops.quote_name(table)
+            cursor.execute(f"SELECT COUNT(*) FROM {quoted}")  # nosec
+            sizes[table] = cursor.fetchone()[0]
+        return sizes
+
+
+def clean_start_plan(
+    graph: MigrationGraph, targets: List[Tuple[str, Optional[str]]]
+) -> List[tuple]:
+    """
+    Same as executor.migration_plan(targets, clean_start=True) in one walk
+    of graph, ancestors shared by several targets are visited once.
+    """
+    plan = []
+    visited = set()
+    for target in targets:
+        if target[1] is None:
+            continue
+        if target not in graph.nodes:
+            raise NodeNotFoundError(f"Node {target!r} not a valid node", target)
+        # postorder as in MigrationGraph.iterative_dfs
+        stack = [(graph.node_map[target], False)]
+        while stack:
+            node, processed = stack.pop()
+            if node.key in visited:
+                continue
+            if processed:
+                visited.add(node.key)
+                plan.append((graph.nodes[node.key], False))
+            else:
+                stack.append((node, True))
+                stack += [(parent, False) for parent in sorted(node.parents)]
+    return plan
+
+
+def _unchanged(executor: MigrationExecutor, target: Tuple[str, str]) -> bool:
+    """Target is applied and nothing after it in its app is applied"""
+    node = executor.loader.graph.node_map.get(target)
+    if node is None or target not in executor.loader.applied_migrations:
+        # missing migration is reported by executor
+        return False
+    return not any(
+        child.key[0] == target[0] and child.key in executor.loader.applied_migrations
+        for child in node.children
+    )
+
+
+def minimal_plan(
+    executor: MigrationExecutor, targets: List[Tuple[str, str]]
+) -> List[tuple]:
+    """
+    Same as executor.migration_plan, targets of apps that are already
+    at snapshot are skipped unless plan of other apps touches them.
+    """
+    skipped = {target for target in targets if _unchanged(executor, target)}
+    while True:
+        plan = executor.migration_plan(
+            [target for target in targets if target not in skipped]
+        )
+        touched = {migration.app_label for migration, _ in plan}
+        # plan of other app could (un)apply migrations of skipped app
+        dependent = {target for target in skipped if target[0] in touched}
+        if not dependent:
+            return plan
+        skipped -= dependent
+
+
+class CheckoutPlanner:  # pylint: disable=too-few-public-methods
+    """Describe steps MigrationExecutor.migrate would run for given targets"""
+
+    def __init__(
+        self,
+        executor: MigrationExecutor,
+        estimate_durations: Optional[Callable[[List[tuple]], dict]] = None,
+    ):
+        self.executor = executor
+        # liquidb.timings.estimate_durations, timings models import this module
+        self.estimate_durations = estimate_durations
+
+    def plan(self, targets: List[Tuple[str, str]]) -> List[PlanStep]:
+        steps_plan = minimal_plan(self.executor, targets)
+        migration_tables = []
+        for migration, _backwards in steps_plan:
+            tables = {
+                _operation_table(migration.app_label, operation)
+                for operation in migration.operations
+            }
+            migration_tables.append(sorted(table for table in tables if table))
+        sizes = table_sizes(
+            self.executor.connection,
+            {table for tables in migration_tables for table in tables},
+        )
+        keys = [
+            (migration.app_label, migration.name, BACKWARD if backwards else FORWARD)
+            for migration, backwards in steps_plan
+        ]
+        durations = (
+            {} if self.estimate_durations is None else self.estimate_durations(keys)
+        )
+        steps = []
+        for (migration, _backwards), key, tables in zip(
+            steps_plan, keys, migration_tables
+        ):
+            steps.append(
+                PlanStep(
+                    app=migration.app_label,
+                    name=migration.name,
+                    direction=key[2],
+                    operations=[
+                        operation.__class__.__name__
+                        for operation in migration.operations
+                    ],
+                    tables=tables,
+                    estimated_rows=(
+                        sum(sizes.get(table, 0) for table in tables) if tables else None
+                    ),
+                    estimated_duration=durations.get(key),
+                )
+            )
+        return steps
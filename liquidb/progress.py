@@ -0,0 +1,124 @@
+import json
+import time
+from typing import List, Optional
+
+from liquidb.plan import BACKWARD, FORWARD
+from liquidb.timings import ACTION_DIRECTIONS, estimate_durations
+
+TEXT = "text"
+JSON = "json"
+
+
+def _format_seconds(seconds: Optional[float]) -> str:
+    if seconds is None:
+        return "?"
+    return f"{seconds:.1f}s"
+
+
+def chain_callbacks(*callbacks):
+    """Combine several progress callbacks of MigrationExecutor into one"""
+
+    def callback(*args, **kwargs):
+        for progress_callback in callbacks:
+            progress_callback(*args, **kwargs)
+
+    return callback
+
+
+class CheckoutProgress:  # pylint: disable=too-many-instance-attributes
+    """
+    progress_callback of MigrationExecutor that writes current step,
+    elapsed time and ETA based on recorded timings (see liquidb.timings)
+    """
+
+    def __init__(
+        self,
+        output,
+        migration_plan: List[tuple],
+        database: str,
+        output_format: str = TEXT,
+        clock=None,
+    ):  # pylint: disable=too-many-arguments
+        self.output = output
+        self.database = database
+        self.output_format = output_format
+        self.clock = time.perf_counter if clock is None else clock
+        self.steps = [
+            (migration.app_label, migration.name, BACKWARD if backwards else FORWARD)
+            for migration, backwards in migration_plan
+        ]
+        self.position = {step: index for index, step in enumerate(self.steps)}
+        self.estimates = estimate_durations(self.steps)
+        self.finished = 0
+        self.observed: List[float] = []
+        self.started_at = self.clock()
+        self._step_started = self.started_at
+        # time of latest progress event
+        self._step_finished = self.started_at
+
+    def _estimate(self, step) -> Optional[float]:
+        estimate = self.estimates.get(step)
+        if estimate is None and self.observed:
+            # never timed before, expect the same as steps of this checkout
+            estimate = sum(self.observed) / len(self.observed)
+        return estimate
+
+    def eta(self, index: int) -> Optional[float]:
+        """Seconds left from start of step with given index"""
+        remaining = 0.0
+        for step in self.steps[index:]:
+            estimate = self._estimate(step)
+            if estimate is None:
+                return None
+            remaining += estimate
+        return remaining
+
+    def _write(self, event: str, step, index: int, duration=None):
+        app, name, direction = step
+        elapsed = self._step_finished - self.started_at
+        eta = self.eta(index if duration is None else index + 1)
+        if self.output_format == JSON:
+            self.output.write(
+                json.dumps(
+                    {
+                        "event": event,
+                        "database": self.database,
+                        "step": index + 1,
+                        "total": len(self.steps),
+                        "app": app,
+                        "name": name,
+                        "direction": direction,
+                        "duration": duration,
+                        "elapsed": elapsed,
+                        "eta": eta,
+                    }
+                )
+            )
+            return
+        counter = f"[{index + 1}/{len(self.steps)}]"
+        if duration is None:
+            message = f"{counter} {direction} {app}.{name}"
+        else:
+            message = f"{counter} {direction} {app}.{name} done in {duration:.1f}s"
+        self.output.write(
+            f"{message} (elapsed {_format_seconds(elapsed)}, "
+            f"ETA {_format_seconds(eta)})"
+        )
+
+    def __call__(self, action, migration=None, fake=False):
+        step_action, _, stage = action.partition("_")
+        if step_action not in ACTION_DIRECTIONS:
+            # render_start, render_success
+            return
+        step = (migration.app_label, migration.name, ACTION_DIRECTIONS[step_action])
+        index = self.position.get(step, self.finished)
+        self._step_finished = self.clock()
+        if stage == "start":
+            self._step_started = self._step_finished
+            self._write("start", step, index)
+            return
+        duration = self._step_finished - self._step_started
+        if not fake:
+            self.observed.append(duration)
+        self.finished += 1
+        self._write("success", step, index, duration)
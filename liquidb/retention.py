@@ -0,0 +1,86 @@
+from datetime import timedelta
+from typing import List, NamedTuple, Optional, Tuple
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils.timezone import now
+
+from liquidb.db_tools import delete_snapshot_rows, delete_unreferenced_set
+from liquidb.models import Snapshot
+from liquidb.settings import SNAPSHOT_RETENTION
+
+
+class RetentionPolicy(NamedTuple):
+    # number of newest snapshots kept in every database
+    keep_last: Optional[int] = None
+    # snapshots created during this number of days are kept
+    keep_days: Optional[int] = None
+    # regular expressions of names that are always kept
+    keep_names: Tuple[str, ...] = ()
+
+    @classmethod
+    def from_settings(cls, **overrides) -> "RetentionPolicy":
+        options = {**SNAPSHOT_RETENTION, **overrides}
+        return cls(
+            keep_last=options.get("keep_last"),
+            keep_days=options.get("keep_days"),
+            keep_names=tuple(options.get("keep_names", ())),
+        )
+
+    @property
+    def is_empty(self) -> bool:
+        return self.keep_last is None and self.keep_days is None
+
+
+def prunable_snapshots(
+    policy: RetentionPolicy, databases: List[str]
+) -> "QuerySet[Snapshot]":
+    """Snapshots not kept by policy, applied snapshots are always kept"""
+    snapshots = Snapshot.objects.filter(database__in=databases, applied=False)
+    if policy.keep_days is not None:
+        snapshots = snapshots.filter(
+            created__lt=now() - timedelta(days=policy.keep_days)
+        )
+    if policy.keep_last is not None:
+        newest = []
+        for database in databases:
+            newest.extend(
+                Snapshot.objects.filter(database=database)
+                .order_by("-created", "-id")
+                .values_list("id", flat=True)[: policy.keep_last]
+            )
+        snapshots = snapshots.exclude(id__in=newest)
+    if policy.keep_names:
+        names = Q()
+        for pattern in policy.keep_names:
+            names |= Q(name__regex=pattern)
+        snapshots = snapshots.exclude(names)
+    return snapshots
+
+
+def delete_snapshots_in_chunks(
+    snapshots: "QuerySet[Snapshot]", chunk_size: int = 1000
+) -> Tuple[int, int]:
+    """
+    Delete snapshots of queryset by chunks, every chunk in short transaction
+    together with migration sets only it used.
+    Return number of deleted snapshots and migrations.
+    """
+    deleted_snapshots = deleted_migrations = 0
+    while True:
+        with transaction.atomic():
+            chunk = list(
+                snapshots.order_by("id").values_list("id", "migration_set_id")[
+                    :chunk_size
+                ]
+            )
+            if not chunk:
+                break
+            deleted_snapshots += delete_snapshot_rows(
+                Snapshot.objects.filter(
+                    id__in=[snapshot_id for snapshot_id, _ in chunk]
+                )
+            )
+            for set_id in {set_id for _, set_id in chunk}:
+                deleted_migrations += delete_unreferenced_set(set_id)
+    return deleted_snapshots, deleted_migrations
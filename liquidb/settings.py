@@ -1,7 +1,56 @@
 import os
+import tempfile
 
 from django.conf import settings
 
 ADMIN_SNAPSHOT_ACTIONS = os.environ.get("ADMIN_SNAPSHOT_ACTIONS")
 if ADMIN_SNAPSHOT_ACTIONS is None:
     ADMIN_SNAPSHOT_ACTIONS = getattr(settings, "ADMIN_SNAPSHOT_ACTIONS", True)
+
+# every n-th stored migration set keeps all migrations
+# others keep only migrations changed since previously applied snapshot
+SNAPSHOT_KEYFRAME_INTERVAL = getattr(settings, "SNAPSHOT_KEYFRAME_INTERVAL", 16)
+
+# directory of current user in shared temporary directory
+_USER_TEMP_DIR = os.path.join(
+    tempfile.gettempdir(),
+    f"liquidb-{os.getuid()}" if hasattr(os, "getuid") else "liquidb",
+)
+
+# directory for serialized migration graph, None disables the cache
+# directory and files not private to current user are not used
+MIGRATION_GRAPH_CACHE_DIR = getattr(
+    settings,
+    "MIGRATION_GRAPH_CACHE_DIR",
+    os.path.join(_USER_TEMP_DIR, "graph"),
+)
+
+# physical copies of databases (see liquidb.physical), they contain all data
+# so directory is created only for current user and copies are readable only by it
+PHYSICAL_SNAPSHOT_DIR = getattr(
+    settings,
+    "PHYSICAL_SNAPSHOT_DIR",
+    os.path.join(_USER_TEMP_DIR, "physical"),
+)
+# total size in bytes of all physical copies, least recently used are dropped first
+PHYSICAL_SNAPSHOT_DISK_BUDGET = getattr(
+    settings, "PHYSICAL_SNAPSHOT_DISK_BUDGET", 5 * 1024**3
+)
+
+# connections used to migrate independent apps at the same time during checkout
+# sqlite always migrates in series
+CHECKOUT_WORKERS = getattr(settings, "CHECKOUT_WORKERS", 1)
+
+# seconds without heartbeat after which running checkout job of admin is failed
+# and doesn't block next checkout anymore (see liquidb.jobs)
+CHECKOUT_JOB_TIMEOUT = getattr(settings, "CHECKOUT_JOB_TIMEOUT", 300)
+
+# create snapshot after every migrate command that applied something
+AUTO_SNAPSHOT = getattr(settings, "AUTO_SNAPSHOT", False)
+# name of automatic snapshot formatted with {date}, {database} and {salt}
+# None uses the same name as create_migration_snapshot without --name
+AUTO_SNAPSHOT_NAME = getattr(settings, "AUTO_SNAPSHOT_NAME", None)
+
+# policy of prune_snapshots command, see liquidb.retention.RetentionPolicy
+# for example {"keep_last": 50, "keep_days": 30, "keep_names": [r"^release-"]}
+SNAPSHOT_RETENTION = getattr(settings, "SNAPSHOT_RETENTION", {})
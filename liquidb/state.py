@@ -0,0 +1,217 @@
+import hashlib
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import django
+from django.db import connection
+from django.db.migrations.graph import MigrationGraph
+from django.db.migrations.recorder import MigrationRecorder
+from django.db.models import Count, F, Max, Window
+from django.db.models.functions import RowNumber
+
+from liquidb.consts import SELF_NAME
+from liquidb.graph_cache import CachedMigrationLoader
+
+
+class AppliedMigrations(NamedTuple):
+    # (migration_id, app, name) of latest applied migration in every app
+    migrations: Tuple[Tuple[int, str, str], ...]
+    migration_hash: str
+
+
+# alias -> (fingerprint of recorder table, state)
+_state_cache: ContextVar[Optional[Dict[str, tuple]]] = ContextVar(
+    "liquidb_state_cache", default=None
+)
+
+
+def _create_migration_hash(migration_identifiers: List[Tuple[str, str]]) -> str:
+    """create md5 out of tuples of [(app_name, migration_file), ...]"""
+    separator = ";"
+    inner_separator = "-"
+    # always sort alphabetically to ensure same result for unsorted app and sorted
+    joined_value = separator.join(
+        inner_separator.join([app, name]) for app, name in sorted(migration_identifiers)
+    )
+    # no reason to check it is only hash of commits
+    return hashlib.md5(joined_value.encode("utf-8")).hexdigest()  # nosec  # NOQA
+
+
+def get_latest_applied_migrations_qs(
+    connection_obj=None,
+) -> "QuerySet[MigrationRecorder.Migration]":
+    """Return latest applied migration in all django apps in project"""
+    if connection_obj is None:
+        connection_obj = connection
+    recorder = MigrationRecorder(connection_obj)
+    migration_qs = recorder.migration_qs.exclude(app=SELF_NAME)
+    lastest_ids = (
+        migration_qs.values("app")
+        .annotate(latest_id=Max("id"))
+        .values_list(
+            "latest_id",
+            flat=True,
+        )
+    )
+    return migration_qs.filter(id__in=lastest_ids)
+
+
+class MigrationStateEngine:
+    """
+    Find latest applied migrations of every app.
+    Apps present in migration graph are resolved by their dependencies
+    so migrations applied out of order or merged are handled correctly,
+    other apps by latest recorded id.
+    """
+
+    chunk_size = 2000
+
+    def __init__(self, connection_obj=None, graph: Optional[MigrationGraph] = None):
+        self.connection = connection if connection_obj is None else connection_obj
+        self.graph = graph
+
+    def _migration_qs(self):
+        recorder = MigrationRecorder(self.connection)
+        return recorder.migration_qs.exclude(app=SELF_NAME)
+
+    @property
+    def use_window_function(self) -> bool:
+        if self.connection.vendor == "sqlite":
+            # sqlite resolves MAX() per group faster than window function
+            # see benchmarks/bench_state_engine.py
+            return False
+        # filtering against window function is supported since django 4.2
+        return (
+            django.VERSION >= (4, 2) and self.connection.features.supports_over_clause
+        )
+
+    def latest_by_id(self) -> Tuple[Tuple[int, str, str], ...]:
+        """Return migration with latest id of every app in single query"""
+        if not self.use_window_function:
+            migration_qs = get_latest_applied_migrations_qs(self.connection)
+        else:
+            migration_qs = self._migration_qs().annotate(
+                row_number=Window(
+                    expression=RowNumber(),
+                    partition_by=[F("app")],
+                    order_by=F("id").desc(),
+                )
+            )
+            migration_qs = migration_qs.filter(row_number=1)
+        return tuple(migration_qs.values_list("id", "app", "name"))
+
+    def _app_leaves(self, app: str, names: Dict[str, int]) -> List[str]:
+        """Return applied migrations of app that are not parent of other applied"""
+        known = [name for name in names if (app, name) in self.graph.nodes]
+        if not known:
+            # app without migration files or all of them are replaced
+            return [max(names, key=names.get)]
+        ancestors = set()
+        stack = [self.graph.node_map[(app, name)] for name in known]
+        while stack:
+            node = stack.pop()
+            for parent in node.parents:
+                if parent.key[0] == app and parent.key not in ancestors:
+                    ancestors.add(parent.key)
+                    stack.append(parent)
+        return [name for name in known if (app, name) not in ancestors]
+
+    def graph_leaves(self) -> Tuple[Tuple[int, str, str], ...]:
+        """Return leaf applied migrations of every app reading migration table once"""
+        applied = defaultdict(dict)
+        migration_qs = (
+            self._migration_qs().order_by("id").values_list("id", "app", "name")
+        )
+        for migration_id, app, name in migration_qs.iterator(
+            chunk_size=self.chunk_size
+        ):
+            applied[app][name] = migration_id
+        latest = []
+        for app, names in applied.items():
+            latest.extend(
+                (names[name], app, name) for name in self._app_leaves(app, names)
+            )
+        return tuple(sorted(latest))
+
+    def latest_applied(self) -> Tuple[Tuple[int, str, str], ...]:
+        if self.graph is None or not self.graph.nodes:
+            return self.latest_by_id()
+        return self.graph_leaves()
+
+
+def load_migration_graph() -> MigrationGraph:
+    """Build migration graph from disk without touching database"""
+    return CachedMigrationLoader(None, ignore_no_migrations=True).graph
+
+
+def _recorder_fingerprint(connection_obj) -> tuple:
+    """Cheap aggregate that changes whenever migration is recorded or removed"""
+    recorder = MigrationRecorder(connection_obj)
+    fingerprint = recorder.migration_qs.aggregate(
+        latest_id=Max("id"), total=Count("id")
+    )
+    return fingerprint["latest_id"], fingerprint["total"]
+
+
+def _load_applied_migrations(connection_obj) -> AppliedMigrations:
+    engine = MigrationStateEngine(connection_obj, load_migration_graph())
+    migrations = engine.latest_applied()
+    migration_hash = _create_migration_hash(
+        [(app, name) for _, app, name in migrations]
+    )
+    return AppliedMigrations(migrations, migration_hash)
+
+
+def get_current_migration_state(connection_obj=None) -> AppliedMigrations:
+    """
+    Return latest applied migrations of all apps and their hash.
+    Inside cached_migration_state block result is reused
+    while migration table is not changed.
+    """
+    if connection_obj is None:
+        connection_obj = connection
+    cache = _state_cache.get()
+    if cache is None:
+        return _load_applied_migrations(connection_obj)
+
+    fingerprint = _recorder_fingerprint(connection_obj)
+    cached = cache.get(connection_obj.alias)
+    if cached is not None and cached[0] == fingerprint:
+        return cached[1]
+    state = _load_applied_migrations(connection_obj)
+    cache[connection_obj.alias] = (fingerprint, state)
+    return state
+
+
+def invalidate_migration_state(using: Optional[str] = None):
+    """Drop cached state of given database alias or of all aliases"""
+    cache = _state_cache.get()
+    if cache is None:
+        return
+    if using is None:
+        cache.clear()
+    else:
+        cache.pop(using, None)
+
+
+@contextmanager
+def cached_migration_state():
+    """Cache current migration state for the life of a command or request"""
+    if _state_cache.get() is not None:
+        # already inside outer block
+        yield
+        return
+    token = _state_cache.set({})
+    try:
+        yield
+    finally:
+        _state_cache.reset(token)
+
+
+def invalidate_on_migrate(
+    sender, using=None, **kwargs
+):  # pylint: disable=unused-argument
+    """Receiver for pre_migrate and post_migrate signals"""
+    invalidate_migration_state(using)
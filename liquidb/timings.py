@@ -0,0 +1,85 @@
+import time
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from django.db.models import Avg
+
+from liquidb.models import MigrationTiming, Snapshot
+from liquidb.plan import BACKWARD, FORWARD
+
+# action of MigrationExecutor progress_callback -> direction of migration
+ACTION_DIRECTIONS = {
+    "apply": FORWARD,
+    "unapply": BACKWARD,
+}
+
+
+class MigrationTimer:
+    """progress_callback of MigrationExecutor that measures every migration"""
+
+    def __init__(self, snapshot: Optional[Snapshot], connection_obj, clock=None):
+        self.snapshot = snapshot
+        self.connection = connection_obj
+        self.clock = time.perf_counter if clock is None else clock
+        self.timings: List[MigrationTiming] = []
+        self._started: Dict[tuple, float] = {}
+
+    def __call__(self, action, migration=None, fake=False):
+        step, _, stage = action.partition("_")
+        if step not in ACTION_DIRECTIONS or fake:
+            # render_start, render_success and faked migrations
+            return
+        key = (step, migration.app_label, migration.name)
+        if stage == "start":
+            self._started[key] = self.clock()
+            return
+        started = self._started.pop(key, None)
+        if started is None:
+            return
+        self.timings.append(
+            MigrationTiming(
+                snapshot=self.snapshot,
+                database=self.connection.alias,
+                vendor=self.connection.vendor,
+                app=migration.app_label,
+                name=migration.name,
+                direction=ACTION_DIRECTIONS[step],
+                duration=self.clock() - started,
+            )
+        )
+
+    def save(self):
+        """Write measured migrations, finished part of failed checkout included"""
+        MigrationTiming.objects.bulk_create(self.timings, batch_size=1000)
+        self.timings = []
+
+
+def estimate_durations(
+    steps: Iterable[Tuple[str, str, str]]
+) -> Dict[Tuple[str, str, str], Optional[float]]:
+    """
+    Expected duration of every (app, name, direction) step from recorded
+    timings, average of app if step is never timed, None if app is never timed
+    """
+    steps = list(steps)
+    timings = MigrationTiming.objects.filter(app__in={app for app, _, _ in steps})
+    by_migration = {
+        (row["app"], row["name"], row["direction"]): row["average"]
+        for row in timings.values("app", "name", "direction").annotate(
+            average=Avg("duration")
+        )
+    }
+    by_app = {
+        (row["app"], row["direction"]): row["average"]
+        for row in timings.values("app", "direction").annotate(average=Avg("duration"))
+    }
+    return {
+        step: by_migration.get(step, by_app.get((step[0], step[2]))) for step in steps
+    }
+
+
+def percentile(values: Sequence[float], percent: float) -> float:
+    """Nearest rank percentile of sorted values"""
+    if not values:
+        raise ValueError("percentile of empty sequence")
+    rank = max(int(-(-percent * len(values) // 100)), 1)
+    return values[rank - 1]
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("tests", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="book",
+            name="title",
+            field=models.CharField(default="", max_length=255),
+        ),
+        migrations.RunPython(migrations.RunPython.noop, migrations.RunPython.noop),
+    ]
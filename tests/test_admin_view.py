@@ -2,6 +2,8 @@ from unittest.mock import patch
 
 import pytest
 from bs4 import BeautifulSoup
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from liquidb.db_tools import SnapshotCheckoutHandler
@@ -228,3 +230,72 @@ def test_apply_snapshot(
     snapshot_2.refresh_from_db()
     assert snapshot_2.applied is False
     assert snapshot_2.consistent_state is False
+
+
+@pytest.mark.django_db
+def test_changelist_migrations_count_and_consistency(
+    admin_client_fixture, create_two_snapshots_fixture
+):
+    snapshot_one, snapshot_two = create_two_snapshots_fixture
+    response = admin_client_fixture.get(reverse("admin:liquidb_snapshot_changelist"))
+    soup = BeautifulSoup(response.rendered_content, "html.parser")
+    counts = [td.text for td in soup.find_all("td", class_="field-migrations_count")]
+    # second snapshot is delta of first one
+    assert counts == ["3", "2"]
+    consistent = [
+        td.img.get("alt") for td in soup.find_all("td", class_="field-consistent")
+    ]
+    assert consistent == ["True", "False"]
+
+
+@pytest.mark.django_db
+def test_changelist_queries_dont_depend_on_rows(
+    admin_client_fixture, create_snapshot_fixture
+):
+    url = reverse("admin:liquidb_snapshot_changelist")
+    create_snapshot_fixture([("first_app", "0001")], "first")
+    with CaptureQueriesContext(connection) as few:
+        admin_client_fixture.get(url)
+    for index in range(2, 8):
+        create_snapshot_fixture([("first_app", f"{index:04}")], f"state_{index}")
+    with CaptureQueriesContext(connection) as many:
+        admin_client_fixture.get(url)
+    assert len(many) == len(few)
+
+
+@pytest.mark.django_db
+def test_changeview_computes_values_of_one_snapshot(
+    admin_client_fixture, create_two_snapshots_fixture
+):
+    _snapshot_one, snapshot_two = create_two_snapshots_fixture
+    with patch("liquidb.admin._consistent") as consistent_mock:
+        response = admin_client_fixture.get(_reverse_snapshot_change(snapshot_two))
+    # states of all databases are read only for changelist
+    consistent_mock.assert_not_called()
+    soup = BeautifulSoup(response.rendered_content, "html.parser")
+    count = soup.find("div", class_="form-row field-migrations_count")
+    assert count.find("div", class_="readonly").text == "3"
+    consistent = soup.find("div", class_="form-row field-consistent")
+    assert consistent.img.get("alt") == "True"
+
+
+@pytest.mark.django_db
+@patch("liquidb.admin.MIGRATIONS_PER_PAGE", new=2)
+def test_changeview_migrations_by_page(admin_client_fixture, create_snapshot_fixture):
+    apps = [("first_app", "0001"), ("second_app", "0005"), ("third_app", "0002")]
+    snapshot = create_snapshot_fixture(apps, "init")
+    response = admin_client_fixture.get(_reverse_snapshot_change(snapshot))
+    soup = BeautifulSoup(response.rendered_content, "html.parser")
+    field = soup.find("div", class_="form-row field-snapshot_migrations")
+    assert "third_app" not in field.text
+    next_url = field.a.get("href")
+    assert next_url == reverse("admin:snapshot_migrations", args=[snapshot.pk]) + (
+        "?page=2"
+    )
+    response = admin_client_fixture.get(next_url)
+    assert response.json() == {
+        "count": 3,
+        "page": 2,
+        "num_pages": 2,
+        "migrations": [["third_app", "0002"]],
+    }
@@ -0,0 +1,83 @@
+import importlib
+import sys
+import threading
+from unittest.mock import patch
+
+import django
+import pytest
+from asgiref.sync import async_to_sync
+
+from liquidb.db_tools import SnapshotCheckoutHandler, SnapshotHandlerException
+from liquidb.diff import CHANGED, AppDiff
+from tests.tools_tests import change_state_mock
+
+# module raises ImportError on older Django, see test_aio_requires_django_4_1
+aio = importlib.import_module("liquidb.aio") if django.VERSION >= (4, 1) else None
+requires_django_4_1 = pytest.mark.skipif(
+    django.VERSION < (4, 1), reason="liquidb.aio requires Django 4.1"
+)
+
+
+@requires_django_4_1
+@pytest.mark.django_db
+def test_acreate(create_migration_state_fixture):
+    create_migration_state_fixture([("first_app", "0001")])
+    snapshot = async_to_sync(aio.acreate)("init")
+    assert snapshot.name == "init"
+    assert snapshot.applied is True
+    # nothing changed since init
+    assert async_to_sync(aio.acreate)("second") is None
+
+    status = async_to_sync(aio.astatus)()
+    assert status.applied == snapshot
+    assert status.consistent is True
+    assert status.journal is None
+
+
+@requires_django_4_1
+@pytest.mark.django_db
+@patch.object(
+    SnapshotCheckoutHandler,
+    "_checkout_to_snapshot",
+    new=change_state_mock,
+)
+def test_acheckout_and_adiff(create_snapshot_fixture):
+    create_snapshot_fixture([("first_app", "0001")], "init")
+    create_snapshot_fixture([("first_app", "0002")], "second")
+    assert async_to_sync(aio.adiff)("init") == [
+        AppDiff("first_app", CHANGED, "0002", "0001")
+    ]
+    assert async_to_sync(aio.adiff)("init", against="init") == []
+
+    snapshot = async_to_sync(aio.acheckout)("init")
+    status = async_to_sync(aio.astatus)()
+    assert status.applied == snapshot
+    assert status.consistent is True
+    assert async_to_sync(aio.adiff)("init") == []
+
+
+@requires_django_4_1
+@pytest.mark.django_db
+def test_acheckout_unknown_snapshot():
+    with pytest.raises(SnapshotHandlerException) as error:
+        async_to_sync(aio.acheckout)("unknown")
+    assert error.value.error == (
+        'Snapshot with name: "unknown" doesn\'t exists in database "default"'
+    )
+
+
+@requires_django_4_1
+@patch("liquidb.aio._runs_in_thread", return_value=True)
+def test_blocking_runs_in_executor(_runs_in_thread_mock):
+    async def thread_name():
+        # databases other than in memory sqlite are migrated in own threads
+        return await aio._blocking("default", lambda: threading.current_thread().name)
+
+    assert async_to_sync(thread_name)().startswith("liquidb")
+
+
+def test_aio_requires_django_4_1():
+    with patch.dict(sys.modules), patch("django.VERSION", (4, 0, 10, "final", 0)):
+        sys.modules.pop("liquidb.aio", None)
+        with pytest.raises(ImportError, match="requires Django 4.1"):
+            importlib.import_module("liquidb.aio")
@@ -0,0 +1,84 @@
+from unittest.mock import patch
+
+import pytest
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.db.migrations.recorder import MigrationRecorder
+from django.test import override_settings
+
+from liquidb.db_tools import SnapshotCheckoutHandler
+from liquidb.models import CheckoutJournal, Snapshot
+
+_PLAN_MIGRATIONS = {"tests": "tests.plan_migrations"}
+
+
+@pytest.fixture(scope="function")
+def _atomic_fixture(create_snapshot_fixture):
+    create_snapshot_fixture(
+        [("tests", "0001_initial"), ("tests", "0002_book_title")], "target"
+    )
+    MigrationRecorder(connection).migration_qs.all().delete()
+    create_snapshot_fixture([("other_app", "0001")], "start")
+
+
+def _applied_tests_migrations():
+    return set(
+        MigrationRecorder(connection)
+        .migration_qs.filter(app="tests")
+        .values_list("name", flat=True)
+    )
+
+
+def _book_table_exists():
+    with connection.cursor() as cursor:
+        return "tests_book" in connection.introspection.table_names(cursor)
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures("_atomic_fixture")
+@override_settings(MIGRATION_MODULES=_PLAN_MIGRATIONS)
+def test_atomic_checkout():
+    call_command("checkout_snapshot", name="target", atomic=1)
+    assert Snapshot.objects.get(applied=True).name == "target"
+    assert _applied_tests_migrations() == {"0001_initial", "0002_book_title"}
+    assert _book_table_exists()
+    assert CheckoutJournal.objects.get().status == CheckoutJournal.COMPLETED
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures("_atomic_fixture")
+@override_settings(MIGRATION_MODULES=_PLAN_MIGRATIONS)
+def test_failed_atomic_checkout_is_rolled_back():
+    apply_migration = MigrationExecutor.apply_migration
+
+    def apply_mock(self, state, migration, *args, **kwargs):
+        if migration.name == "0002_book_title":
+            raise RuntimeError("lock timeout")
+        return apply_migration(self, state, migration, *args, **kwargs)
+
+    snapshot = Snapshot.objects.get(name="target")
+    with patch.object(MigrationExecutor, "apply_migration", new=apply_mock):
+        with pytest.raises(RuntimeError, match="lock timeout"):
+            SnapshotCheckoutHandler(snapshot, atomic=True).checkout()
+    # first migration is rolled back together with the rest of checkout
+    assert not _applied_tests_migrations()
+    assert not _book_table_exists()
+    assert Snapshot.objects.get(applied=True).name == "start"
+    assert not CheckoutJournal.objects.exists()
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures("_atomic_fixture")
+def test_atomic_checkout_without_transactional_ddl():
+    with patch.object(connection.features, "can_rollback_ddl", False):
+        with pytest.raises(CommandError, match="can't rollback schema changes"):
+            call_command("checkout_snapshot", name="target", atomic=1)
+    assert Snapshot.objects.get(applied=True).name == "start"
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures("_atomic_fixture")
+def test_atomic_physical_checkout():
+    with pytest.raises(CommandError, match="either --atomic or --physical"):
+        call_command("checkout_snapshot", name="target", atomic=1, physical=1)
@@ -0,0 +1,61 @@
+from unittest.mock import patch
+
+import pytest
+from django.core.management.sql import emit_post_migrate_signal
+from django.db.models.signals import post_migrate
+
+from liquidb.auto_snapshot import create_snapshot_after_migrate
+from liquidb.models import Snapshot
+
+_STATE = [("first_app", "0001"), ("second_app", "0001")]
+
+
+@pytest.fixture(scope="function")
+def _auto_snapshot_fixture():
+    post_migrate.connect(create_snapshot_after_migrate, dispatch_uid="test_auto")
+    yield
+    post_migrate.disconnect(dispatch_uid="test_auto")
+
+
+def _migrate(plan=True):
+    """Signals sent by migrate command after migrations are applied"""
+    emit_post_migrate_signal(0, False, "default", plan=[object()] if plan else plan)
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures("_auto_snapshot_fixture")
+def test_snapshot_once_per_migrate(create_migration_state_fixture):
+    create_migration_state_fixture(_STATE)
+    _migrate()
+    snapshot = Snapshot.objects.get()
+    assert snapshot.applied is True
+    assert snapshot.consistent_state is True
+    # nothing is changed since previous snapshot
+    _migrate()
+    assert Snapshot.objects.count() == 1
+    create_migration_state_fixture([("first_app", "0002")])
+    _migrate()
+    assert Snapshot.objects.count() == 2
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures("_auto_snapshot_fixture")
+@pytest.mark.parametrize("plan", [None, []], ids=["flush", "nothing to apply"])
+def test_no_snapshot_without_plan(create_migration_state_fixture, plan):
+    create_migration_state_fixture(_STATE)
+    _migrate(plan)
+    assert not Snapshot.objects.exists()
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures("_auto_snapshot_fixture")
+@patch("liquidb.auto_snapshot.AUTO_SNAPSHOT_NAME", new="deploy_{database}")
+def test_snapshot_name_template(create_migration_state_fixture, capsys):
+    create_migration_state_fixture(_STATE)
+    _migrate()
+    assert Snapshot.objects.get().name == "deploy_default"
+    create_migration_state_fixture([("first_app", "0002")])
+    # migrate is not failed by existing name
+    _migrate()
+    assert "Snapshot is not created" in capsys.readouterr().err
+    assert Snapshot.objects.count() == 1
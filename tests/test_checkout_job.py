@@ -0,0 +1,169 @@
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import Mock, patch
+
+import pytest
+from bs4 import BeautifulSoup
+from django.core.management import call_command
+from django.db import connection
+from django.db.migrations.recorder import MigrationRecorder
+from django.test import override_settings
+from django.urls import reverse
+from django.utils.timezone import now
+
+from liquidb.db_tools import SnapshotCheckoutHandler, SnapshotHandlerException
+from liquidb.jobs import (
+    _heartbeat,
+    job_status,
+    run_checkout_job,
+    start_checkout_job,
+)
+from liquidb.models import CheckoutJob, Snapshot
+
+_PLAN_MIGRATIONS = {"tests": "tests.plan_migrations"}
+
+
+@pytest.fixture(scope="function")
+def _job_fixture(create_snapshot_fixture):
+    create_snapshot_fixture(
+        [("tests", "0001_initial"), ("tests", "0002_book_title")], "target"
+    )
+    MigrationRecorder(connection).migration_qs.all().delete()
+    create_snapshot_fixture([("other_app", "0001")], "start")
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures("_job_fixture")
+@override_settings(MIGRATION_MODULES=_PLAN_MIGRATIONS)
+def test_admin_apply_snapshot_runs_job(admin_client_fixture):
+    snapshot = Snapshot.objects.get(name="target")
+    response = admin_client_fixture.post(
+        reverse("admin:apply_snapshot", args=[snapshot.pk])
+    )
+    job = CheckoutJob.objects.get()
+    assert response.url == reverse("admin:checkout_job", args=[job.pk])
+
+    response = admin_client_fixture.get(response.url)
+    soup = BeautifulSoup(response.rendered_content, "html.parser")
+    assert soup.find(id="job-status").text == CheckoutJob.COMPLETED
+    status = admin_client_fixture.get(
+        reverse("admin:checkout_job_status", args=[job.pk])
+    ).json()
+    assert status == {
+        "id": job.pk,
+        "snapshot": "target",
+        "database": "default",
+        "status": CheckoutJob.COMPLETED,
+        "completed": 2,
+        "total": 2,
+        "message": 'Checkout from snapshot "start" to "target"',
+        "finished": True,
+    }
+    assert Snapshot.objects.get(applied=True).name == "target"
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures("_job_fixture")
+@override_settings(MIGRATION_MODULES=_PLAN_MIGRATIONS)
+@pytest.mark.parametrize(
+    "command, options",
+    [
+        ("delete_snapshot_history", {"interactive": False}),
+        ("prune_snapshots", {"keep_last": 1}),
+    ],
+)
+def test_deleted_snapshot_leaves_no_job_rows(create_snapshot_fixture, command, options):
+    start_checkout_job(Snapshot.objects.get(name="target"))
+    # target is not applied anymore and could be pruned
+    create_snapshot_fixture([("other_app", "0002")], "latest")
+    call_command(command, stdout=StringIO(), **options)
+    assert not CheckoutJob.objects.exists()
+    # test database runs without foreign key checks
+    connection.check_constraints()
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures("_job_fixture")
+@patch.object(
+    SnapshotCheckoutHandler,
+    "_checkout_to_snapshot",
+    side_effect=RuntimeError("lock timeout"),
+)
+def test_failed_job(_checkout_mock):
+    job = start_checkout_job(Snapshot.objects.get(name="target"))
+    job.refresh_from_db()
+    assert job.status == CheckoutJob.FAILED
+    assert job.message == "RuntimeError('lock timeout')"
+    assert job_status(job)["finished"] is True
+    # failed job doesn't block next checkout
+    start_checkout_job(Snapshot.objects.get(name="target"))
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures("_job_fixture")
+@patch("liquidb.jobs._runs_in_thread", return_value=True)
+def test_job_started_in_thread_after_commit(
+    _runs_in_thread_mock, django_capture_on_commit_callbacks
+):
+    snapshot = Snapshot.objects.get(name="target")
+    with patch("liquidb.jobs.threading.Thread") as thread_mock:
+        with django_capture_on_commit_callbacks() as callbacks:
+            job = start_checkout_job(snapshot)
+            thread_mock.return_value.start.assert_not_called()
+    assert callbacks == [thread_mock.return_value.start]
+    assert thread_mock.call_args.kwargs["args"] == (job.pk,)
+    assert job_status(job)["status"] == CheckoutJob.PENDING
+    with pytest.raises(SnapshotHandlerException) as error:
+        start_checkout_job(snapshot)
+    assert error.value.error == "Checkout of default database is already running"
+    with patch.object(SnapshotCheckoutHandler, "_checkout_to_snapshot"):
+        run_checkout_job(job.pk)
+    job.refresh_from_db()
+    assert job.status == CheckoutJob.COMPLETED
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures("_job_fixture")
+def test_stale_job_doesnt_block_checkout():
+    snapshot = Snapshot.objects.get(name="target")
+    # process of job died without finishing it
+    stale = CheckoutJob.objects.create(
+        snapshot=snapshot,
+        status=CheckoutJob.RUNNING,
+        updated=now() - timedelta(seconds=301),
+    )
+    status = job_status(stale)
+    assert status["status"] == CheckoutJob.FAILED
+    assert status["message"] == "Checkout job stopped responding"
+    assert status["finished"] is True
+
+    CheckoutJob.objects.filter(pk=stale.pk).update(
+        status=CheckoutJob.RUNNING, updated=now() - timedelta(seconds=301)
+    )
+    with patch.object(SnapshotCheckoutHandler, "_checkout_to_snapshot"):
+        job = start_checkout_job(snapshot)
+    stale.refresh_from_db()
+    assert stale.status == CheckoutJob.FAILED
+    job.refresh_from_db()
+    assert job.status == CheckoutJob.COMPLETED
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures("_job_fixture")
+def test_heartbeat_keeps_running_job():
+    started = now() - timedelta(seconds=301)
+    job = CheckoutJob.objects.create(
+        snapshot=Snapshot.objects.get(name="target"),
+        status=CheckoutJob.RUNNING,
+        updated=started,
+    )
+    stop = Mock()
+    # one beat, then checkout is finished
+    stop.wait.side_effect = [False, True]
+    _heartbeat(job.pk, stop)
+    stop.wait.assert_called_with(60)
+    job.refresh_from_db()
+    assert job.updated > started
+    with patch.object(SnapshotCheckoutHandler, "_checkout_to_snapshot"):
+        with pytest.raises(SnapshotHandlerException):
+            start_checkout_job(job.snapshot)
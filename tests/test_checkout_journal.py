@@ -0,0 +1,121 @@
+from unittest.mock import patch
+
+import pytest
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.db.migrations.recorder import MigrationRecorder
+from django.test import override_settings
+
+from liquidb.db_tools import SnapshotCheckoutHandler
+from liquidb.models import CheckoutJournal, Snapshot
+
+_PLAN_MIGRATIONS = {"tests": "tests.plan_migrations"}
+
+
+@pytest.fixture(scope="function")
+def _journal_fixture(create_snapshot_fixture):
+    create_snapshot_fixture(
+        [("tests", "0001_initial"), ("tests", "0002_book_title")], "target"
+    )
+    MigrationRecorder(connection).migration_qs.all().delete()
+    create_snapshot_fixture([("other_app", "0001")], "start")
+
+
+@pytest.fixture(scope="function")
+def applied_names():
+    """Names of migrations applied by executor, the second one fails once"""
+    applied = []
+    apply_migration = MigrationExecutor.apply_migration
+
+    def apply_mock(self, state, migration, *args, **kwargs):
+        if migration.name == "0002_book_title" and "0002_book_title" not in applied:
+            applied.append(migration.name)
+            raise RuntimeError("lock timeout")
+        applied.append(migration.name)
+        return apply_migration(self, state, migration, *args, **kwargs)
+
+    with patch.object(MigrationExecutor, "apply_migration", new=apply_mock):
+        yield applied
+
+
+def _interrupted_checkout():
+    snapshot = Snapshot.objects.get(name="target")
+    with pytest.raises(RuntimeError, match="lock timeout"):
+        SnapshotCheckoutHandler(snapshot).checkout()
+    return snapshot
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures("_journal_fixture")
+@override_settings(MIGRATION_MODULES=_PLAN_MIGRATIONS)
+def test_interrupted_checkout_keeps_journal(applied_names):
+    _interrupted_checkout()
+    journal = CheckoutJournal.objects.get()
+    assert journal.status == CheckoutJournal.RUNNING
+    assert journal.plan == [
+        ["tests", "0001_initial", "forward"],
+        ["tests", "0002_book_title", "forward"],
+    ]
+    assert journal.completed == 1
+    # pointer is not moved
+    assert Snapshot.objects.get(applied=True).name == "start"
+
+
+@pytest.mark.parametrize(
+    "journal_completed",
+    [
+        1,
+        # killed after migration is committed but before journal is updated
+        0,
+    ],
+)
+@pytest.mark.django_db
+@pytest.mark.usefixtures("_journal_fixture")
+@override_settings(MIGRATION_MODULES=_PLAN_MIGRATIONS)
+def test_resume_checkout(applied_names, journal_completed):
+    snapshot = _interrupted_checkout()
+    CheckoutJournal.objects.update(completed=journal_completed)
+
+    SnapshotCheckoutHandler(snapshot).checkout(resume=True)
+    # finished migration is not applied again
+    assert applied_names == ["0001_initial", "0002_book_title", "0002_book_title"]
+    journal = CheckoutJournal.objects.get()
+    assert journal.status == CheckoutJournal.COMPLETED
+    assert journal.completed == 2
+    snapshot.refresh_from_db()
+    assert snapshot.applied is True
+    assert set(
+        MigrationRecorder(connection)
+        .migration_qs.filter(app="tests")
+        .values_list("name", flat=True)
+    ) == {"0001_initial", "0002_book_title"}
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures("_journal_fixture")
+@override_settings(MIGRATION_MODULES=_PLAN_MIGRATIONS)
+def test_resume_other_snapshot(applied_names):
+    _interrupted_checkout()
+    with pytest.raises(
+        CommandError, match='Unfinished checkout is to snapshot "target"'
+    ):
+        call_command("checkout_snapshot", name="start", resume=1)
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures("_journal_fixture")
+def test_resume_without_journal():
+    with pytest.raises(CommandError, match="No unfinished checkout to resume"):
+        call_command("checkout_snapshot", name="target", resume=1)
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures("_journal_fixture")
+@override_settings(MIGRATION_MODULES=_PLAN_MIGRATIONS)
+def test_new_checkout_abandons_journal(applied_names):
+    _interrupted_checkout()
+    call_command("checkout_snapshot", name="target", force=1)
+    assert list(
+        CheckoutJournal.objects.order_by("id").values_list("status", flat=True)
+    ) == [CheckoutJournal.ABANDONED, CheckoutJournal.COMPLETED]
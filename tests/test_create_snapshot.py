@@ -2,9 +2,18 @@ from io import StringIO
 
 import pytest
 from django.core.management import call_command, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from mock import patch
 
-from liquidb.models import Snapshot
+from liquidb.db_tools import SnapshotCreationHandler
+from liquidb.models import (
+    Snapshot,
+    MigrationSet,
+    MigrationState,
+    _create_migration_hash,
+)
+from tests.tools_tests import change_state_mock
 
 
 @pytest.mark.django_db
@@ -115,3 +124,105 @@ def test_snapshot_with_same_hash(patched_stderr, create_migration_state_fixture)
     ]
     create_migration_state_fixture(second_state)
     patched_stderr.assert_not_called()
+
+
+@pytest.mark.django_db
+def test_snapshot_migration_hash_persisted(
+    create_migration_state_fixture, django_assert_num_queries
+):
+    apps = [("first_app", "0001"), ("second_app", "0005")]
+    create_migration_state_fixture(apps)
+    call_command("create_migration_snapshot", name="first")
+    snapshot = Snapshot.objects.get(name="first")
+    assert snapshot.migration_hash == _create_migration_hash(apps)
+    assert Snapshot.objects.filter(migration_hash=_create_migration_hash(apps)).get()
+    same_snapshot = Snapshot.objects.get(name="first")
+    # equality is based on stored column, no extra queries needed
+    with django_assert_num_queries(0):
+        assert snapshot == same_snapshot
+        assert hash(snapshot) == hash(same_snapshot)
+
+
+@pytest.mark.django_db
+def test_snapshot_reuses_existing_migration_set(create_migration_state_fixture):
+    state_1 = [("first_app", "0001"), ("second_app", "0005")]
+    create_migration_state_fixture(state_1)
+    call_command("create_migration_snapshot", name="first")
+    create_migration_state_fixture([("first_app", "0002")])
+    call_command("create_migration_snapshot", name="second")
+    first = Snapshot.objects.get(name="first")
+    change_state_mock(None, first)
+    states_count = MigrationState.objects.count()
+    sets_count = MigrationSet.objects.count()
+
+    with CaptureQueriesContext(connection) as context:
+        call_command("create_migration_snapshot", name="third")
+    inserts = [q for q in context.captured_queries if q["sql"].startswith("INSERT")]
+    # only snapshot itself is inserted
+    assert len(inserts) == 1
+    assert MigrationState.objects.count() == states_count
+    assert MigrationSet.objects.count() == sets_count
+    third = Snapshot.objects.get(name="third")
+    assert third.migration_set_id == first.migration_set_id
+    assert set(third.migrations.values_list("app", "name")) == set(state_1)
+
+
+@pytest.mark.django_db
+# store every set as keyframe
+@patch("liquidb.db_tools.SNAPSHOT_KEYFRAME_INTERVAL", new=1)
+def test_snapshot_overwrite_deletes_unused_migrations(create_migration_state_fixture):
+    create_migration_state_fixture([("first_app", "0001"), ("second_app", "0005")])
+    call_command("create_migration_snapshot", name="first")
+    create_migration_state_fixture([("first_app", "0002")])
+    call_command("create_migration_snapshot", name="first", overwrite=1)
+    assert MigrationSet.objects.count() == 1
+    assert set(MigrationState.objects.values_list("app", "name")) == {
+        ("first_app", "0002"),
+        ("second_app", "0005"),
+    }
+
+
+def _create(name, overwrite=False):
+    return SnapshotCreationHandler(name, overwrite).create()
+
+
+@pytest.mark.django_db
+def test_create_snapshot_queries(
+    create_migration_state_fixture, django_assert_num_queries
+):
+    create_migration_state_fixture([("first_app", "0001"), ("second_app", "0005")])
+    # lookup of snapshots, migration table, set lookup,
+    # set, states and links of set, snapshot, savepoint and its release
+    with django_assert_num_queries(9):
+        assert _create("first") is True
+    # lookup of snapshots and migration table only
+    with django_assert_num_queries(2):
+        assert _create("second") is False
+    create_migration_state_fixture([("first_app", "0002")])
+    # previous snapshot is unapplied and parent set is read for delta
+    with django_assert_num_queries(11):
+        assert _create("second") is True
+
+
+@pytest.mark.django_db
+# store every set as keyframe
+@patch("liquidb.db_tools.SNAPSHOT_KEYFRAME_INTERVAL", new=1)
+def test_snapshot_overwrite_deletes_only_previous_set(
+    create_migration_state_fixture, django_assert_num_queries
+):
+    create_migration_state_fixture([("first_app", "0001"), ("second_app", "0005")])
+    _create("first")
+    create_migration_state_fixture([("first_app", "0002")])
+    _create("second")
+    create_migration_state_fixture([("first_app", "0003")])
+    first = Snapshot.objects.get(name="first")
+    # creation as above, previous set and its unshared migration are deleted
+    with django_assert_num_queries(19):
+        assert _create("first", overwrite=True) is True
+    assert not MigrationSet.objects.filter(pk=first.migration_set_id).exists()
+    # migration shared with other set is kept
+    assert set(MigrationState.objects.values_list("app", "name")) == {
+        ("first_app", "0002"),
+        ("first_app", "0003"),
+        ("second_app", "0005"),
+    }
@@ -1,7 +1,8 @@
 import pytest
 from django.core.management import call_command, CommandError
+from mock import patch
 
-from liquidb.models import Snapshot
+from liquidb.models import Snapshot, MigrationSet, MigrationState
 
 
 @pytest.mark.django_db
@@ -29,3 +30,22 @@ def test_delete_snapshot_by_name_not_applied(create_migration_state_fixture):
     snapshot = Snapshot.objects.first()
     assert snapshot.applied is True
     assert snapshot.consistent_state is True
+
+
+@pytest.mark.django_db
+# store every set as keyframe
+@patch("liquidb.db_tools.SNAPSHOT_KEYFRAME_INTERVAL", new=1)
+def test_delete_snapshot_by_name_keeps_shared_migrations(
+    create_migration_state_fixture,
+):
+    create_migration_state_fixture([("first_app", "0001"), ("second_app", "0002")])
+    call_command("create_migration_snapshot", name="first")
+    create_migration_state_fixture([("first_app", "0002")])
+    call_command("create_migration_snapshot", name="second")
+    # second_app 0002 is shared by both snapshots
+    call_command("delete_snapshot_by_name", name="first", interactive=False)
+    assert MigrationSet.objects.count() == 1
+    assert set(MigrationState.objects.values_list("app", "name")) == {
+        ("first_app", "0002"),
+        ("second_app", "0002"),
+    }
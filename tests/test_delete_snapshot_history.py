@@ -1,7 +1,9 @@
+from io import StringIO
+
 import pytest
 from django.core.management import call_command
 
-from liquidb.models import Snapshot
+from liquidb.models import MigrationTiming, Snapshot, MigrationSet, MigrationState
 
 
 @pytest.mark.django_db
@@ -23,3 +25,31 @@ def test_delete_snapshot_history(apps, create_migration_state_fixture):
     call_command("create_migration_snapshot", name="init")
     call_command("delete_snapshot_history", interactive=False)
     assert Snapshot.objects.count() == 0
+    assert MigrationSet.objects.count() == 0
+    assert MigrationState.objects.count() == 0
+
+
+@pytest.mark.django_db
+def test_delete_snapshot_history_rows(
+    create_migration_state_fixture, django_assert_num_queries
+):
+    for index in range(1, 6):
+        create_migration_state_fixture([("first_app", f"{index:04}")])
+        call_command("create_migration_snapshot", name=f"state_{index}")
+    timing = MigrationTiming.objects.create(
+        snapshot=Snapshot.objects.get(name="state_1"),
+        app="first_app",
+        name="0001",
+        direction="forward",
+        duration=1.0,
+    )
+    output = StringIO()
+    # number of statements doesn't depend on number of rows
+    with django_assert_num_queries(15):
+        call_command("delete_snapshot_history", interactive=False, stdout=output)
+    assert output.getvalue() == (
+        "Successfully deleted history of 5 snapshots and 5 migrations\n"
+    )
+    assert MigrationSet.objects.count() == 0
+    timing.refresh_from_db()
+    assert timing.snapshot is None
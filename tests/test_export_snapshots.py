@@ -0,0 +1,137 @@
+import gzip
+import json
+from unittest.mock import patch
+
+import pytest
+from django.core.management import CommandError, call_command
+
+from liquidb.db_tools import delete_unreferenced_migrations
+from liquidb.models import MigrationSet, MigrationState, Snapshot
+
+
+@pytest.fixture(scope="function")
+def _history_fixture(create_snapshot_fixture):
+    for counter in range(1, 5):
+        create_snapshot_fixture(
+            [("first_app", f"000{counter}"), ("second_app", f"000{counter}")],
+            f"state_{counter}",
+        )
+
+
+def _history():
+    return {
+        snapshot.name: (
+            snapshot.migration_hash,
+            snapshot.parent.name if snapshot.parent else None,
+            sorted(snapshot.migrations.values_list("app", "name")),
+        )
+        for snapshot in Snapshot.objects.all()
+    }
+
+
+def _export(path, chunk_size=2):
+    call_command("export_snapshots", output=str(path), chunk_size=chunk_size)
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures("_history_fixture")
+def test_export_import_snapshots(tmp_path):
+    path = tmp_path / "snapshots.jsonl.gz"
+    exported = _history()
+    _export(path)
+    with gzip.open(path, "rt") as lines:
+        records = [json.loads(line) for line in lines]
+    assert records[0] == {"type": "header", "version": 1}
+    assert [record["name"] for record in records if record["type"] == "snapshot"] == [
+        "state_1",
+        "state_2",
+        "state_3",
+        "state_4",
+    ]
+
+    call_command("delete_snapshot_history", interactive=False)
+    assert not MigrationState.objects.exists()
+    # rows of previous chunk are parents of next one
+    call_command("import_snapshots", input=str(path), chunk_size=2)
+    assert _history() == exported
+    # applied snapshot is not imported
+    assert not Snapshot.objects.filter(applied=True).exists()
+    assert MigrationSet.objects.filter(parent__isnull=False).exists()
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures("_history_fixture")
+@patch("liquidb.archive.SNAPSHOT_KEYFRAME_INTERVAL", new=7)
+def test_import_delta_of_set_with_other_depth(tmp_path):
+    path = tmp_path / "snapshots.jsonl.gz"
+    exported = _history()
+    _export(path)
+    Snapshot.objects.filter(name__in=["state_3", "state_4"]).delete()
+    delete_unreferenced_migrations()
+    # parent of state_3 was saved locally after longer chain of deltas
+    MigrationSet.objects.filter(snapshots__name="state_2").update(depth=5)
+    call_command("import_snapshots", input=str(path))
+    assert _history() == exported
+    state_3 = Snapshot.objects.get(name="state_3").migration_set
+    assert state_3.depth == 6
+    # depth of next delta would reach keyframe interval
+    state_4 = Snapshot.objects.get(name="state_4").migration_set
+    assert (state_4.parent_id, state_4.depth) == (None, 0)
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures("_history_fixture")
+def test_import_skips_existing_snapshots(tmp_path, capsys):
+    path = tmp_path / "snapshots.jsonl.gz"
+    _export(path)
+    Snapshot.objects.get(name="state_2").delete()
+    call_command("import_snapshots", input=str(path))
+    assert "Imported 1 snapshots, 0 migration sets and 0 migrations" in (
+        capsys.readouterr().out
+    )
+    assert Snapshot.objects.count() == 4
+    # applied snapshot of environment is kept
+    assert Snapshot.objects.get(applied=True).name == "state_4"
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures("_history_fixture")
+def test_import_skips_same_migration_hash(tmp_path):
+    path = tmp_path / "snapshots.jsonl.gz"
+    _export(path)
+    Snapshot.objects.filter(name="state_1").update(name="renamed")
+    call_command("import_snapshots", input=str(path))
+    assert not Snapshot.objects.filter(name="state_1").exists()
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures("_history_fixture")
+def test_import_not_export(tmp_path):
+    path = tmp_path / "snapshots.jsonl.gz"
+    with gzip.open(path, "wt") as output:
+        output.write('{"type": "snapshot"}\n')
+    with pytest.raises(CommandError, match="is not an export of liquidb snapshots"):
+        call_command("import_snapshots", input=str(path))
+    path.write_text("not gzip")
+    with pytest.raises(CommandError, match="Can't read"):
+        call_command("import_snapshots", input=str(path))
+
+
+@pytest.mark.django_db(databases=["default", "other"])
+def test_export_only_history_of_database(create_migration_state_fixture, tmp_path):
+    for counter in range(1, 3):
+        create_migration_state_fixture([("default_app", f"000{counter}")])
+        create_migration_state_fixture([("other_app", f"000{counter}")], "other")
+        call_command(
+            "create_migration_snapshot", name=f"state_{counter}", all_databases=True
+        )
+    path = tmp_path / "snapshots.jsonl.gz"
+    call_command("export_snapshots", output=str(path), database="other")
+    with gzip.open(path, "rt") as lines:
+        records = [json.loads(line) for line in lines]
+    assert {
+        record["app"] for record in records if record["type"] == "migration_state"
+    } == {"other_app"}
+    assert {
+        record["database"] for record in records if record["type"] == "snapshot"
+    } == {"other"}
@@ -0,0 +1,135 @@
+import json
+from io import StringIO
+
+import pytest
+from bs4 import BeautifulSoup
+from django.core.management import call_command
+from django.urls import reverse
+
+from liquidb.db_tools import _get_or_create_migration_set, find_snapshots
+from liquidb.models import Snapshot
+from liquidb.state import AppliedMigrations, _create_migration_hash
+
+
+@pytest.fixture(scope="function")
+def _history_fixture(create_snapshot_fixture):
+    create_snapshot_fixture([("first_app", "0001"), ("second_app", "0001")], "first")
+    # deltas store only changed app
+    create_snapshot_fixture([("first_app", "0002"), ("second_app", "0001")], "second")
+    create_snapshot_fixture([("first_app", "0002"), ("second_app", "0002")], "third")
+
+
+def _names(snapshots):
+    return sorted(snapshots.values_list("name", flat=True))
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures("_history_fixture")
+@pytest.mark.parametrize(
+    "app, name, expected",
+    [
+        pytest.param("first_app", "0001", ["first"], id="Keyframe only"),
+        pytest.param("first_app", "0002", ["second", "third"], id="Inherited"),
+        pytest.param("second_app", "0001", ["first", "second"], id="Overridden"),
+        pytest.param("third_app", "0001", [], id="Unknown"),
+    ],
+)
+def test_find_snapshots(app, name, expected):
+    assert _names(find_snapshots(app, name)) == expected
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures("_history_fixture")
+def test_find_snapshots_command():
+    output = StringIO()
+    call_command("find_snapshots", app="first_app", migration="0002", stdout=output)
+    lines = output.getvalue().splitlines()
+    assert lines[0] == "Snapshots with migration first_app.0002:"
+    assert [line.split()[0] for line in lines[1:]] == ["third", "second"]
+    assert lines[1].endswith("(applied)")
+
+    output = StringIO()
+    call_command(
+        "find_snapshots",
+        app="second_app",
+        migration="0001",
+        format="json",
+        stdout=output,
+    )
+    assert [row["name"] for row in json.loads(output.getvalue())] == [
+        "second",
+        "first",
+    ]
+
+    output = StringIO()
+    call_command("find_snapshots", app="third_app", migration="0001", stdout=output)
+    assert output.getvalue() == "No snapshot contains migration third_app.0001\n"
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures("_history_fixture")
+@pytest.mark.parametrize(
+    "search, expected",
+    [
+        pytest.param("first_app.0002", ["third", "second"], id="Migration"),
+        pytest.param("second_app: 0001", ["second", "first"], id="Admin format"),
+        pytest.param("thi", ["third"], id="Snapshot name"),
+    ],
+)
+def test_admin_search_by_migration(admin_client_fixture, search, expected):
+    response = admin_client_fixture.get(
+        reverse("admin:liquidb_snapshot_changelist"), {"q": search}
+    )
+    soup = BeautifulSoup(response.rendered_content, "html.parser")
+    names = [th.a.text for th in soup.find_all("th", class_="field-name")]
+    assert names == expected
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures("_history_fixture")
+@pytest.mark.parametrize(
+    "search, expected",
+    [
+        pytest.param("v1.2", ["v1.2"], id="Name only"),
+        pytest.param(
+            "first_app.0001", ["first_app.0001", "first"], id="Name and migration"
+        ),
+    ],
+)
+def test_admin_search_name_like_migration(
+    admin_client_fixture, create_snapshot_fixture, search, expected
+):
+    create_snapshot_fixture([("first_app", "0003"), ("second_app", "0002")], "v1.2")
+    create_snapshot_fixture(
+        [("first_app", "0003"), ("second_app", "0003")], "first_app.0001"
+    )
+    response = admin_client_fixture.get(
+        reverse("admin:liquidb_snapshot_changelist"), {"q": search}
+    )
+    soup = BeautifulSoup(response.rendered_content, "html.parser")
+    names = [th.a.text for th in soup.find_all("th", class_="field-name")]
+    assert names == expected
+
+
+@pytest.mark.django_db
+def test_find_snapshots_unmerged_branches(
+    admin_client_fixture, create_migration_state_fixture
+):
+    create_migration_state_fixture([])
+    migrations = [("x", "0002_a"), ("x", "0002_b"), ("y", "0001")]
+    state = AppliedMigrations(
+        tuple((index, app, name) for index, (app, name) in enumerate(migrations)),
+        _create_migration_hash(migrations),
+    )
+    migration_set = _get_or_create_migration_set(state)
+    Snapshot.objects.create(
+        name="branches",
+        migration_hash=state.migration_hash,
+        migration_set=migration_set,
+    )
+    assert _names(find_snapshots("x", "0002_a")) == ["branches"]
+    assert _names(find_snapshots("x", "0002_b")) == ["branches"]
+
+    response = admin_client_fixture.get(reverse("admin:liquidb_snapshot_changelist"))
+    soup = BeautifulSoup(response.rendered_content, "html.parser")
+    assert soup.find("td", class_="field-migrations_count").text == "3"
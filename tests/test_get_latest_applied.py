@@ -1,5 +1,11 @@
+from unittest.mock import patch, PropertyMock
+
+import django
 import pytest
+from django.db.migrations.graph import MigrationGraph
+
 from liquidb.models import get_latest_applied_migrations_qs
+from liquidb.state import MigrationStateEngine
 
 _EXPECTED_APPS = [
     ("first_app", "0001"),
@@ -24,3 +30,83 @@ def test_latest_applied_migrations_qs():
     assert set(ids.values_list("name", flat=True)) == set(
         [migration_name for _, migration_name in _EXPECTED_APPS]
     )
+
+
+def _build_graph(dependencies):
+    graph = MigrationGraph()
+    for child in dependencies:
+        graph.add_node(child, None)
+    for child, parents in dependencies.items():
+        for parent in parents:
+            graph.add_dependency(None, child, parent)
+    return graph
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures("_create_apps_fixture")
+@pytest.mark.parametrize(
+    "use_window_function",
+    [
+        pytest.param(
+            True,
+            # window functions are allowed in filter since Django 4.2
+            marks=pytest.mark.skipif(
+                django.VERSION < (4, 2), reason="Window is disallowed in filter"
+            ),
+        ),
+        False,
+    ],
+)
+def test_latest_by_id(use_window_function):
+    engine = MigrationStateEngine()
+    with patch.object(
+        MigrationStateEngine,
+        "use_window_function",
+        new_callable=PropertyMock,
+        return_value=use_window_function,
+    ):
+        latest = engine.latest_by_id()
+    assert {(app, name) for _, app, name in latest} == set(_EXPECTED_APPS)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "applied, expected",
+    [
+        pytest.param(
+            ["0001", "0003", "0002"],
+            {"0003"},
+            id="Applied out of order",
+        ),
+        pytest.param(
+            ["0001", "0002b", "0002", "0003_merge"],
+            {"0003_merge"},
+            id="Merged",
+        ),
+        pytest.param(
+            ["0001", "0002b", "0002"],
+            {"0002", "0002b"},
+            id="Not merged branches",
+        ),
+    ],
+)
+def test_graph_leaves(applied, expected, create_migration_state_fixture):
+    graph = _build_graph(
+        {
+            ("first_app", "0001"): [],
+            ("first_app", "0002"): [("first_app", "0001")],
+            ("first_app", "0002b"): [("first_app", "0001")],
+            ("first_app", "0003"): [("first_app", "0002")],
+            ("first_app", "0003_merge"): [
+                ("first_app", "0002"),
+                ("first_app", "0002b"),
+            ],
+        }
+    )
+    create_migration_state_fixture([("first_app", name) for name in applied])
+    # app without migration files is resolved by latest id
+    create_migration_state_fixture([("second_app", "0002"), ("second_app", "0001")])
+    latest = MigrationStateEngine(graph=graph).latest_applied()
+    assert {(app, name) for _, app, name in latest} == {
+        ("first_app", name) for name in expected
+    } | {("second_app", "0001")}
@@ -0,0 +1,174 @@
+import os
+from unittest.mock import patch
+
+import pytest
+from django.db import connection
+from django.db.migrations.loader import MigrationLoader
+from django.db.migrations.recorder import MigrationRecorder
+from django.test import override_settings
+
+from liquidb.graph_cache import (
+    CachedMigrationExecutor,
+    CachedMigrationLoader,
+    LazyMigration,
+    _migration_files_keys,
+    migration_files_key,
+)
+
+_PLAN_MIGRATIONS = {"tests": "tests.plan_migrations"}
+_SQUASHED_MIGRATIONS = {"tests": "tests.squashed_migrations"}
+
+
+@pytest.fixture(scope="function")
+def cache_dir(tmp_path):
+    with patch("liquidb.graph_cache.MIGRATION_GRAPH_CACHE_DIR", new=str(tmp_path)):
+        yield tmp_path
+
+
+def _cache_files(directory):
+    return sorted(path.name for path in directory.iterdir())
+
+
+def _cache_name():
+    project_key, files_key = _migration_files_keys()
+    return f"graph_{project_key}_{files_key}.json"
+
+
+def _graph_edges(graph):
+    return {
+        (node.key, parent.key)
+        for node in graph.node_map.values()
+        for parent in node.parents
+    }
+
+
+@override_settings(MIGRATION_MODULES=_PLAN_MIGRATIONS)
+def test_graph_cache_written_and_reused(cache_dir):
+    cold = CachedMigrationLoader(None)
+    assert cold.from_cache is False
+    assert _cache_files(cache_dir) == [_cache_name()]
+    assert (cache_dir / _cache_name()).stat().st_mode & 0o777 == 0o600
+
+    warm = CachedMigrationLoader(None)
+    assert warm.from_cache is True
+    assert set(warm.graph.nodes) == set(cold.graph.nodes)
+    assert _graph_edges(warm.graph) == _graph_edges(cold.graph)
+    migration = warm.graph.nodes[("tests", "0002_book_title")]
+    assert isinstance(migration, LazyMigration)
+    # module is imported on first access
+    assert [type(op).__name__ for op in migration.operations] == [
+        "AddField",
+        "RunPython",
+    ]
+
+
+@override_settings(MIGRATION_MODULES=_PLAN_MIGRATIONS)
+def test_graph_cache_key_changes_with_migration_files(cache_dir):
+    key = migration_files_key()
+    path = os.path.join(os.path.dirname(__file__), "plan_migrations", "0001_initial.py")
+    stat = os.stat(path)
+    try:
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        assert migration_files_key() != key
+    finally:
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert migration_files_key() == key
+
+
+@override_settings(MIGRATION_MODULES=_PLAN_MIGRATIONS)
+def test_graph_cache_invalid_file_falls_back_to_load(cache_dir):
+    path = cache_dir / _cache_name()
+    path.write_text("{not json", encoding="utf-8")
+    path.chmod(0o600)
+    loader = CachedMigrationLoader(None)
+    assert loader.from_cache is False
+    assert {key for key in loader.graph.nodes if key[0] == "tests"} == {
+        ("tests", "0001_initial"),
+        ("tests", "0002_book_title"),
+    }
+    assert CachedMigrationLoader(None).from_cache is True
+
+
+@override_settings(MIGRATION_MODULES=_PLAN_MIGRATIONS)
+def test_graph_cache_ignores_files_of_other_users(cache_dir):
+    CachedMigrationLoader(None)
+    path = cache_dir / _cache_name()
+    # writable by others, forged edges could change checkout plan
+    path.chmod(0o666)
+    assert CachedMigrationLoader(None).from_cache is False
+    path.chmod(0o600)
+    assert CachedMigrationLoader(None).from_cache is True
+    cache_dir.chmod(0o777)
+    try:
+        assert CachedMigrationLoader(None).from_cache is False
+    finally:
+        cache_dir.chmod(0o700)
+
+
+@override_settings(MIGRATION_MODULES=_PLAN_MIGRATIONS)
+def test_graph_cache_removes_stale_files(cache_dir):
+    CachedMigrationLoader(None)
+    stale = _cache_name()
+    path = os.path.join(os.path.dirname(__file__), "plan_migrations", "0001_initial.py")
+    stat = os.stat(path)
+    try:
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        CachedMigrationLoader(None)
+        assert _cache_files(cache_dir) == [_cache_name()]
+        assert _cache_name() != stale
+    finally:
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+
+@override_settings(MIGRATION_MODULES=_PLAN_MIGRATIONS)
+def test_graph_cache_disabled(tmp_path):
+    with patch("liquidb.graph_cache.MIGRATION_GRAPH_CACHE_DIR", new=None):
+        loader = CachedMigrationLoader(None)
+    assert not hasattr(loader, "from_cache")
+    assert ("tests", "0002_book_title") in loader.graph.nodes
+
+
+@pytest.mark.parametrize(
+    "applied, expected_nodes",
+    [
+        # nothing applied, squashed migration is used
+        ([], {("tests", "0001_squashed_0002_book_title")}),
+        # everything applied, squashed migration is used
+        (
+            ["0001_initial", "0002_book_title"],
+            {("tests", "0001_squashed_0002_book_title")},
+        ),
+        # partially applied, replaced migrations are used
+        (["0001_initial"], {("tests", "0001_initial"), ("tests", "0002_book_title")}),
+    ],
+)
+@pytest.mark.django_db
+@override_settings(MIGRATION_MODULES=_SQUASHED_MIGRATIONS)
+def test_graph_cache_replacements(cache_dir, applied, expected_nodes):
+    recorder = MigrationRecorder(connection)
+    for name in applied:
+        recorder.record_applied("tests", name)
+
+    expected = MigrationLoader(connection)
+    # first build fills cache, second one reads it
+    CachedMigrationLoader(connection)
+    loader = CachedMigrationLoader(connection)
+    assert loader.from_cache is True
+    assert {key for key in loader.graph.nodes if key[0] == "tests"} == expected_nodes
+    assert set(loader.graph.nodes) == set(expected.graph.nodes)
+    assert set(loader.applied_migrations) == set(expected.applied_migrations)
+
+
+@pytest.mark.django_db
+@override_settings(MIGRATION_MODULES=_PLAN_MIGRATIONS)
+def test_cached_executor_plan_matches_executor(cache_dir):
+    MigrationRecorder(connection).record_applied("tests", "0001_initial")
+    targets = [("tests", "0002_book_title")]
+    CachedMigrationExecutor(connection)
+    executor = CachedMigrationExecutor(connection)
+    assert executor.loader.from_cache is True
+    plan = [
+        (migration.app_label, migration.name, backwards)
+        for migration, backwards in executor.migration_plan(targets)
+    ]
+    assert plan == [("tests", "0002_book_title", False)]
@@ -0,0 +1,124 @@
+import threading
+from unittest.mock import patch
+
+import pytest
+from django.core.management import CommandError, call_command
+
+from liquidb.db_tools import SnapshotCheckoutHandler, SnapshotHandlerException
+from liquidb.models import Snapshot
+from tests.tools_tests import change_state_mock
+
+_DATABASES = ["default", "other"]
+
+
+def _state(app, counter):
+    return [(app, f"000{counter}")]
+
+
+@pytest.fixture(scope="function")
+def _two_databases_fixture(create_migration_state_fixture):
+    for counter in range(1, 3):
+        create_migration_state_fixture(_state("default_app", counter))
+        create_migration_state_fixture(_state("other_app", counter), "other")
+        call_command(
+            "create_migration_snapshot", name=f"state_{counter}", all_databases=True
+        )
+
+
+@pytest.mark.django_db(databases=_DATABASES)
+@pytest.mark.usefixtures("_two_databases_fixture")
+def test_create_snapshot_per_database():
+    for database, app in [("default", "default_app"), ("other", "other_app")]:
+        snapshot = Snapshot.objects.get(name="state_2", database=database)
+        assert snapshot.applied is True
+        assert snapshot.consistent_state is True
+        assert list(snapshot.migrations.values_list("app", "name")) == [(app, "0002")]
+    assert Snapshot.objects.filter(applied=True).count() == 2
+
+
+@pytest.mark.django_db(databases=_DATABASES)
+@pytest.mark.usefixtures("_two_databases_fixture")
+@patch.object(
+    SnapshotCheckoutHandler,
+    "_checkout_to_snapshot",
+    new=change_state_mock,
+)
+def test_checkout_all_databases():
+    call_command("checkout_snapshot", name="state_1", all_databases=True)
+    for database in _DATABASES:
+        snapshot = Snapshot.objects.get(name="state_1", database=database)
+        assert snapshot.applied is True
+        assert snapshot.consistent_state is True
+
+
+@pytest.mark.django_db(databases=_DATABASES)
+@pytest.mark.usefixtures("_two_databases_fixture")
+@patch.object(
+    SnapshotCheckoutHandler,
+    "_checkout_to_snapshot",
+    new=change_state_mock,
+)
+def test_checkout_single_database():
+    call_command("checkout_snapshot", name="state_1", database="other")
+    applied = dict(
+        Snapshot.objects.filter(applied=True).values_list("database", "name")
+    )
+    assert applied == {"default": "state_2", "other": "state_1"}
+
+
+def _fail_other(self, snapshot):
+    if snapshot.database == "other":
+        raise SnapshotHandlerException("broken migration")
+    change_state_mock(self, snapshot)
+
+
+@pytest.mark.django_db(databases=_DATABASES)
+@pytest.mark.usefixtures("_two_databases_fixture")
+@patch.object(SnapshotCheckoutHandler, "_checkout_to_snapshot", new=_fail_other)
+def test_checkout_failed_database_keeps_applied_snapshots():
+    with pytest.raises(CommandError, match='Database "other": broken migration'):
+        call_command("checkout_snapshot", name="state_1", all_databases=True)
+    applied = set(Snapshot.objects.filter(applied=True).values_list("name", flat=True))
+    assert applied == {"state_2"}
+
+
+@pytest.mark.django_db(databases=_DATABASES)
+@pytest.mark.usefixtures("_two_databases_fixture")
+@patch.object(SnapshotCheckoutHandler, "_checkout_to_snapshot", new=_fail_other)
+def test_atomic_checkout_rolls_back_all_databases():
+    with pytest.raises(CommandError, match='Database "other": broken migration'):
+        call_command("checkout_snapshot", name="state_1", all_databases=True, atomic=1)
+    # migration table of default database is rolled back too
+    for snapshot in Snapshot.objects.filter(applied=True):
+        assert snapshot.name == "state_2"
+        assert snapshot.consistent_state is True
+
+
+@pytest.mark.django_db(databases=_DATABASES)
+@pytest.mark.usefixtures("_two_databases_fixture")
+def test_checkout_databases_in_threads():
+    threads = {}
+
+    def checkout_mock(self, snapshot):  # pylint: disable=unused-argument
+        threads[snapshot.database] = threading.get_ident()
+
+    with patch("liquidb.db_tools._runs_in_thread", return_value=True), patch.object(
+        SnapshotCheckoutHandler, "_checkout_to_snapshot", new=checkout_mock
+    ):
+        # migration table is not changed by mock
+        call_command("checkout_snapshot", name="state_1", all_databases=True, force=1)
+    assert set(threads) == set(_DATABASES)
+    assert threading.get_ident() not in threads.values()
+    applied = set(Snapshot.objects.filter(applied=True).values_list("name", flat=True))
+    assert applied == {"state_1"}
+
+
+@pytest.mark.django_db(databases=_DATABASES)
+@pytest.mark.usefixtures("_two_databases_fixture")
+def test_delete_history_of_single_database():
+    call_command("delete_snapshot_history", database="other", interactive=False)
+    assert not Snapshot.objects.filter(database="other").exists()
+    snapshot = Snapshot.objects.get(name="state_2", database="default")
+    assert list(snapshot.migrations.values_list("app", "name")) == [
+        ("default_app", "0002")
+    ]
@@ -0,0 +1,121 @@
+import threading
+from unittest.mock import MagicMock, patch
+
+import pytest
+from django.db import connection
+from django.db.migrations import Migration
+from django.db.migrations.graph import MigrationGraph
+
+from liquidb.parallel import migrate_plan, split_plan
+
+_DEPENDENCIES = {
+    ("a", "0001"): [],
+    ("a", "0002"): [("a", "0001")],
+    ("b", "0001"): [],
+    ("b", "0002"): [("b", "0001"), ("a", "0001")],
+    ("c", "0001"): [],
+}
+
+
+def _graph() -> MigrationGraph:
+    graph = MigrationGraph()
+    for app, name in _DEPENDENCIES:
+        graph.add_node((app, name), Migration(name, app))
+    for key, parents in _DEPENDENCIES.items():
+        for parent in parents:
+            graph.add_dependency(None, key, parent)
+    return graph
+
+
+def _plan(graph, keys, backwards=False):
+    return [(graph.nodes[key], backwards) for key in keys]
+
+
+def _keys(chains):
+    return [[(step.app_label, step.name) for step, _ in chain] for chain in chains]
+
+
+@pytest.mark.parametrize(
+    "keys, expected",
+    [
+        (
+            list(_DEPENDENCIES),
+            [
+                [("a", "0001"), ("a", "0002"), ("b", "0001"), ("b", "0002")],
+                [("c", "0001")],
+            ],
+        ),
+        (
+            # a.0001 is applied already, nothing links a and b
+            [("a", "0002"), ("b", "0001"), ("b", "0002"), ("c", "0001")],
+            [[("a", "0002")], [("b", "0001"), ("b", "0002")], [("c", "0001")]],
+        ),
+    ],
+)
+def test_split_plan(keys, expected):
+    graph = _graph()
+    assert _keys(split_plan(_plan(graph, keys), graph)) == expected
+
+
+def test_split_backward_plan():
+    graph = _graph()
+    keys = [("c", "0001"), ("b", "0002"), ("a", "0002"), ("a", "0001")]
+    chains = split_plan(_plan(graph, keys, backwards=True), graph)
+    assert _keys(chains) == [
+        [("c", "0001")],
+        [("b", "0002"), ("a", "0002"), ("a", "0001")],
+    ]
+    assert all(backwards for chain in chains for _, backwards in chain)
+
+
+def _executor():
+    executor = MagicMock()
+    executor.loader.graph = _graph()
+    executor.connection = connection
+    return executor
+
+
+@pytest.mark.django_db
+def test_sqlite_migrates_in_series():
+    executor = _executor()
+    plan = _plan(executor.loader.graph, list(_DEPENDENCIES))
+    with patch("liquidb.parallel.CachedMigrationExecutor") as chain_executor:
+        migrate_plan(executor, [], plan, workers=4)
+    executor.migrate.assert_called_once_with([], plan=plan)
+    chain_executor.assert_not_called()
+
+
+@pytest.mark.django_db
+def test_chains_migrate_in_threads():
+    executor = _executor()
+    plan = _plan(executor.loader.graph, list(_DEPENDENCIES))
+    threads = {}
+
+    def migrate_mock(targets, plan):  # pylint: disable=unused-argument
+        threads[plan[0][0].app_label] = threading.get_ident()
+
+    with patch("liquidb.parallel._runs_in_parallel", return_value=True), patch(
+        "liquidb.parallel.CachedMigrationExecutor"
+    ) as chain_executor:
+        chain_executor.return_value.migrate.side_effect = migrate_mock
+        migrate_plan(executor, [], plan, workers=4)
+    executor.migrate.assert_not_called()
+    assert set(threads) == {"a", "c"}
+    assert threading.get_ident() not in threads.values()
+
+
+@pytest.mark.django_db
+def test_failed_chain_is_raised():
+    executor = _executor()
+    plan = _plan(executor.loader.graph, list(_DEPENDENCIES))
+
+    def migrate_mock(targets, plan):  # pylint: disable=unused-argument
+        if plan[0][0].app_label == "c":
+            raise RuntimeError("lock timeout")
+
+    with patch("liquidb.parallel._runs_in_parallel", return_value=True), patch(
+        "liquidb.parallel.CachedMigrationExecutor"
+    ) as chain_executor:
+        chain_executor.return_value.migrate.side_effect = migrate_mock
+        with pytest.raises(RuntimeError, match="lock timeout"):
+            migrate_plan(executor, [], plan, workers=2)
@@ -0,0 +1,218 @@
+import os
+from io import StringIO
+from unittest.mock import Mock, patch
+
+import pytest
+from django.contrib.auth.models import User
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import IntegrityError, OperationalError, connection, connections
+from django.db.utils import load_backend
+
+from liquidb.db_tools import SnapshotCheckoutHandler
+from liquidb.models import PhysicalCopy, Snapshot
+from liquidb.physical import (
+    BasePhysicalBackend,
+    PhysicalCopyException,
+    PostgresqlBackend,
+    SqliteBackend,
+    restore_physical_copy,
+)
+from tests.tools_tests import change_state_mock
+
+
+def _state(counter):
+    return [("first_app", f"000{counter}"), ("second_app", f"000{counter}")]
+
+
+@pytest.fixture(scope="function")
+def physical_dir(tmp_path):
+    with patch("liquidb.physical.PHYSICAL_SNAPSHOT_DIR", new=str(tmp_path)):
+        yield tmp_path
+
+
+@pytest.fixture(scope="function")
+def _physical_snapshots_fixture(physical_dir, create_migration_state_fixture):
+    create_migration_state_fixture(_state(1))
+    User.objects.create(username="first")
+    call_command("create_migration_snapshot", name="state_1", physical=1)
+    create_migration_state_fixture(_state(2))
+    User.objects.create(username="second")
+    call_command("create_migration_snapshot", name="state_2")
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.usefixtures("_physical_snapshots_fixture")
+def test_physical_copy_created(physical_dir):
+    physical_copy = PhysicalCopy.objects.get(snapshot__name="state_1")
+    assert physical_copy.vendor == "sqlite"
+    assert os.path.dirname(physical_copy.location) == str(physical_dir)
+    assert physical_copy.size == os.path.getsize(physical_copy.location)
+    # copy has all data, password hashes included
+    assert os.stat(physical_copy.location).st_mode & 0o777 == 0o600
+    assert not PhysicalCopy.objects.filter(snapshot__name="state_2").exists()
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.usefixtures("_physical_snapshots_fixture")
+@patch.object(SnapshotCheckoutHandler, "_checkout_to_snapshot")
+# history of snapshots is put back by several batches
+@patch("liquidb.physical._BATCH_SIZE", new=1)
+def test_physical_checkout_restores_database(checkout_mock):
+    last_used = PhysicalCopy.objects.get().last_used
+    call_command("checkout_snapshot", name="state_1", physical=1)
+    # migrations are not applied
+    checkout_mock.assert_not_called()
+    assert list(User.objects.values_list("username", flat=True)) == ["first"]
+    # history of snapshots is not reverted
+    snapshot = Snapshot.objects.get(name="state_1")
+    assert snapshot.applied is True
+    assert snapshot.consistent_state is True
+    assert Snapshot.objects.get(name="state_2").applied is False
+    assert PhysicalCopy.objects.get().last_used > last_used
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.usefixtures("_physical_snapshots_fixture")
+@patch.object(SnapshotCheckoutHandler, "_checkout_to_snapshot", new=change_state_mock)
+def test_physical_checkout_without_copy_applies_migrations():
+    call_command("checkout_snapshot", name="state_1", physical=1)
+    out = StringIO()
+    call_command("checkout_snapshot", name="state_2", physical=1, stdout=out)
+    assert 'Snapshot "state_2" has no physical copy' in out.getvalue()
+    assert Snapshot.objects.get(name="state_2").consistent_state is True
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.usefixtures("_physical_snapshots_fixture")
+def test_physical_copy_dropped_with_snapshot():
+    location = PhysicalCopy.objects.get().location
+    Snapshot.objects.filter(name="state_1").delete()
+    assert not PhysicalCopy.objects.exists()
+    assert not os.path.exists(location)
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.usefixtures("_physical_snapshots_fixture")
+def test_physical_copy_disk_budget(create_migration_state_fixture):
+    first = PhysicalCopy.objects.get()
+    create_migration_state_fixture(_state(3))
+    # only one copy fits into budget
+    with patch("liquidb.physical.PHYSICAL_SNAPSHOT_DISK_BUDGET", new=first.size + 1):
+        call_command("create_migration_snapshot", name="state_3", physical=1)
+    assert list(PhysicalCopy.objects.values_list("snapshot__name", flat=True)) == [
+        "state_3"
+    ]
+    assert not os.path.exists(first.location)
+
+
+def _fail_insert(execute, sql, params, many, context):
+    if sql.startswith("INSERT"):
+        raise IntegrityError("insert failed")
+    return execute(sql, params, many, context)
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.usefixtures("_physical_snapshots_fixture")
+def test_replaced_database_dropped_after_history_is_restored():
+    physical_copy = PhysicalCopy.objects.get()
+    backend = Mock()
+    backend.restore.return_value = "previous_database"
+    with patch("liquidb.physical.get_backend", return_value=backend):
+        with connection.execute_wrapper(_fail_insert):
+            with pytest.raises(PhysicalCopyException) as error:
+                restore_physical_copy(physical_copy)
+        assert "kept as previous_database" in error.value.error
+        # history is lost in restored database, old one is still there
+        backend.drop.assert_not_called()
+        assert Snapshot.objects.count() == 2
+
+        restore_physical_copy(physical_copy)
+    backend.drop.assert_called_once_with("previous_database")
+
+
+def test_physical_backend_is_abstract():
+    class CopyOnlyBackend(BasePhysicalBackend):
+        def copy(self, name):
+            return name, 0
+
+    with pytest.raises(TypeError):
+        CopyOnlyBackend(None)
+
+
+@pytest.mark.django_db
+def test_physical_copy_dir_is_private(tmp_path):
+    copies = tmp_path / "physical"
+    with patch("liquidb.physical.PHYSICAL_SNAPSHOT_DIR", new=str(copies)):
+        SqliteBackend(connection).copy("first")
+        assert copies.stat().st_mode & 0o777 == 0o700
+        copies.chmod(0o755)
+        with pytest.raises(PhysicalCopyException):
+            SqliteBackend(connection).copy("second")
+    assert not (copies / "second.sqlite3").exists()
+
+
+_POSTGRESQL_NAME = "liquidb_physical_test"
+
+
+def _postgresql(name):
+    """Connection configured by PGHOST, PGUSER, PGPASSWORD, ... of libpq"""
+    settings_dict = connections.configure_settings(
+        {name: {"ENGINE": "django.db.backends.postgresql", "NAME": name}}
+    )[name]
+    return load_backend(settings_dict["ENGINE"]).DatabaseWrapper(settings_dict, name)
+
+
+@pytest.fixture(scope="function")
+def postgresql_connection(django_db_blocker):
+    try:
+        maintenance = _postgresql("postgres")
+    except ImproperlyConfigured:
+        pytest.skip("PostgreSQL driver is not installed")
+    with django_db_blocker.unblock():
+        try:
+            maintenance.ensure_connection()
+        except OperationalError:
+            pytest.skip("PostgreSQL server is not available")
+        with maintenance.cursor() as cursor:
+            cursor.execute(f"DROP DATABASE IF EXISTS {_POSTGRESQL_NAME}")
+            cursor.execute(f"CREATE DATABASE {_POSTGRESQL_NAME}")
+        connection_obj = _postgresql(_POSTGRESQL_NAME)
+        try:
+            yield connection_obj
+        finally:
+            connection_obj.close()
+            with maintenance.cursor() as cursor:
+                cursor.execute(f"DROP DATABASE IF EXISTS {_POSTGRESQL_NAME}")
+            maintenance.close()
+
+
+def _names(connection_obj):
+    try:
+        with connection_obj.cursor() as cursor:
+            cursor.execute("SELECT name FROM item ORDER BY name")
+            return [name for name, in cursor.fetchall()]
+    finally:
+        # database with connected client can't be dropped or used as template
+        connection_obj.close()
+
+
+def test_postgresql_copy_and_restore(postgresql_connection):
+    backend = PostgresqlBackend(postgresql_connection)
+    with postgresql_connection.cursor() as cursor:
+        cursor.execute("CREATE TABLE item (name text)")
+        cursor.execute("INSERT INTO item VALUES ('first')")
+    location, size = backend.copy("test")
+    try:
+        assert size > 0
+        with postgresql_connection.cursor() as cursor:
+            cursor.execute("INSERT INTO item VALUES ('second')")
+        previous = backend.restore(location)
+        assert _names(postgresql_connection) == ["first"]
+        # replaced database is kept until caller drops it
+        assert _names(_postgresql(previous)) == ["first", "second"]
+        backend.drop(previous)
+        # copy is kept after restore
+        assert _names(_postgresql(location)) == ["first"]
+    finally:
+        backend.drop(location)
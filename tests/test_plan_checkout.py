@@ -0,0 +1,164 @@
+import json
+from io import StringIO
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.db.migrations import Migration
+from django.db.migrations.executor import MigrationExecutor
+from django.db.migrations.graph import MigrationGraph
+from django.test import override_settings
+
+from liquidb.db_tools import SnapshotCheckoutHandler
+from liquidb.models import MigrationTiming, Snapshot
+from liquidb.plan import BACKWARD, clean_start_plan, minimal_plan, table_sizes
+
+_FIRST_STATE = [("tests", "0001_initial")]
+_SECOND_STATE = [("tests", "0002_book_title")]
+
+
+@pytest.fixture(scope="function")
+def _two_snapshots_fixture(create_snapshot_fixture):
+    create_snapshot_fixture(_FIRST_STATE, "first")
+    create_snapshot_fixture(_SECOND_STATE, "second")
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures("_two_snapshots_fixture")
+@override_settings(MIGRATION_MODULES={"tests": "tests.plan_migrations"})
+def test_plan_checkout_backward():
+    snapshot = Snapshot.objects.get(name="first")
+    steps = SnapshotCheckoutHandler(snapshot).plan()
+    assert len(steps) == 1
+    step = steps[0]
+    assert (step.app, step.name, step.direction) == (
+        "tests",
+        "0002_book_title",
+        BACKWARD,
+    )
+    assert step.operations == ["AddField", "RunPython"]
+    assert step.tables == ["tests_book"]
+    # table is not created in test database
+    assert step.estimated_rows == 0
+    assert step.estimated_duration is None
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures("_two_snapshots_fixture")
+@override_settings(MIGRATION_MODULES={"tests": "tests.plan_migrations"})
+def test_plan_checkout_estimated_duration():
+    MigrationTiming.objects.bulk_create(
+        [
+            MigrationTiming(
+                app="tests",
+                name="0002_book_title",
+                direction=BACKWARD,
+                vendor="sqlite",
+                duration=duration,
+            )
+            for duration in (1.0, 3.0)
+        ]
+    )
+    out = StringIO()
+    call_command("plan_checkout", name="first", stdout=out)
+    assert "(~0 rows, ~2.0s)" in out.getvalue()
+    out = StringIO()
+    call_command("plan_checkout", name="first", format="json", stdout=out)
+    assert json.loads(out.getvalue())["steps"][0]["estimated_duration"] == 2.0
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures("_two_snapshots_fixture")
+@override_settings(MIGRATION_MODULES={"tests": "tests.plan_migrations"})
+def test_plan_checkout_command_json():
+    out = StringIO()
+    call_command("plan_checkout", name="first", format="json", stdout=out)
+    result = json.loads(out.getvalue())
+    assert result["snapshot"] == "first"
+    assert [step["name"] for step in result["steps"]] == ["0002_book_title"]
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures("_two_snapshots_fixture")
+@override_settings(MIGRATION_MODULES={"tests": "tests.plan_migrations"})
+def test_plan_checkout_command_applied():
+    out = StringIO()
+    call_command("plan_checkout", name="second", stdout=out)
+    assert out.getvalue().strip() == 'Nothing to do to checkout to "second"'
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures("_two_snapshots_fixture")
+def test_table_sizes():
+    sizes = table_sizes(
+        connection, [Snapshot._meta.db_table, "table_that_does_not_exist"]
+    )
+    assert sizes == {Snapshot._meta.db_table: 2}
+
+
+def _executor(dependencies, applied) -> MigrationExecutor:
+    graph = MigrationGraph()
+    for app, name in dependencies:
+        graph.add_node((app, name), Migration(name, app))
+    for key, parents in dependencies.items():
+        for parent in parents:
+            graph.add_dependency(None, key, parent)
+    executor = MigrationExecutor.__new__(MigrationExecutor)
+    executor.loader = SimpleNamespace(
+        graph=graph,
+        applied_migrations={key: graph.nodes[key] for key in applied},
+        replace_migrations=True,
+    )
+    return executor
+
+
+_DEPENDENCIES = {
+    ("a", "0001"): [],
+    ("a", "0002"): [("a", "0001")],
+    ("b", "0001"): [],
+    ("b", "0002"): [("b", "0001"), ("a", "0002")],
+    ("c", "0001"): [],
+    ("c", "0002"): [("c", "0001")],
+}
+
+
+@pytest.mark.parametrize(
+    "targets, planned_targets",
+    [
+        # only c is changed
+        (
+            [("a", "0002"), ("b", "0001"), ("c", "0001")],
+            [("c", "0001")],
+        ),
+        # unapply of a.0002 unapplies b.0002 which is kept at snapshot
+        (
+            [("a", "0001"), ("b", "0002"), ("c", "0002")],
+            [("a", "0001"), ("b", "0002")],
+        ),
+    ],
+)
+def test_minimal_plan(targets, planned_targets):
+    applied = list(_DEPENDENCIES)
+    if ("b", "0001") in targets:
+        applied.remove(("b", "0002"))
+    executor = _executor(_DEPENDENCIES, applied)
+    expected = executor.migration_plan(targets)
+    migration_plan = MigrationExecutor.migration_plan
+    planned = []
+
+    def migration_plan_spy(self, plan_targets, *args, **kwargs):
+        planned.append(plan_targets)
+        return migration_plan(self, plan_targets, *args, **kwargs)
+
+    with patch.object(MigrationExecutor, "migration_plan", new=migration_plan_spy):
+        assert minimal_plan(executor, targets) == expected
+    assert planned[-1] == planned_targets
+
+
+def test_clean_start_plan():
+    executor = _executor(_DEPENDENCIES, [])
+    leaves = executor.loader.graph.leaf_nodes()
+    expected = executor.migration_plan(leaves, clean_start=True)
+    assert clean_start_plan(executor.loader.graph, leaves) == expected
@@ -0,0 +1,112 @@
+import json
+from io import StringIO
+from itertools import count
+from types import SimpleNamespace
+
+import pytest
+from django.core.management.base import OutputWrapper
+from django.db import connection
+from django.db.migrations.recorder import MigrationRecorder
+from django.test import override_settings
+
+from liquidb.db_tools import SnapshotCheckoutHandler
+from liquidb.models import MigrationTiming
+from liquidb.plan import BACKWARD, FORWARD
+from liquidb.progress import JSON, CheckoutProgress
+
+_FIRST = SimpleNamespace(app_label="first_app", name="0002")
+_SECOND = SimpleNamespace(app_label="second_app", name="0001")
+_PLAN = [(_FIRST, True), (_SECOND, False)]
+
+
+def _run(progress):
+    for migration, backwards in _PLAN:
+        action = "unapply" if backwards else "apply"
+        progress(f"{action}_start", migration, False)
+        progress(f"{action}_success", migration, False)
+
+
+def _clock():
+    # every call takes 2 seconds
+    ticks = count(step=2)
+    return lambda: next(ticks)
+
+
+@pytest.fixture(scope="function")
+def _timings_fixture():
+    MigrationTiming.objects.bulk_create(
+        [
+            MigrationTiming(
+                app="first_app",
+                name="0002",
+                direction=BACKWARD,
+                vendor="sqlite",
+                duration=duration,
+            )
+            for duration in (3.0, 5.0)
+        ]
+        + [
+            # other migration of the same app
+            MigrationTiming(
+                app="second_app",
+                name="0009",
+                direction=FORWARD,
+                vendor="sqlite",
+                duration=10.0,
+            )
+        ]
+    )
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures("_timings_fixture")
+def test_progress_eta_from_history():
+    out = StringIO()
+    progress = CheckoutProgress(OutputWrapper(out), _PLAN, "default", clock=_clock())
+    # average of migration and average of app
+    assert progress.eta(0) == 14.0
+    _run(progress)
+    assert out.getvalue().splitlines() == [
+        "[1/2] backward first_app.0002 (elapsed 2.0s, ETA 14.0s)",
+        "[1/2] backward first_app.0002 done in 2.0s (elapsed 4.0s, ETA 10.0s)",
+        "[2/2] forward second_app.0001 (elapsed 6.0s, ETA 10.0s)",
+        "[2/2] forward second_app.0001 done in 2.0s (elapsed 8.0s, ETA 0.0s)",
+    ]
+
+
+@pytest.mark.django_db
+def test_progress_json_lines_without_history():
+    out = StringIO()
+    progress = CheckoutProgress(
+        OutputWrapper(out), _PLAN, "default", JSON, clock=_clock()
+    )
+    _run(progress)
+    events = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert [(event["event"], event["step"], event["total"]) for event in events] == [
+        ("start", 1, 2),
+        ("success", 1, 2),
+        ("start", 2, 2),
+        ("success", 2, 2),
+    ]
+    # nothing is known before first step is finished
+    assert events[0]["eta"] is None
+    # later steps are expected to take as long as finished ones
+    assert events[2]["eta"] == 2.0
+    assert events[1]["duration"] == 2.0
+
+
+@pytest.mark.django_db
+@override_settings(MIGRATION_MODULES={"tests": "tests.plan_migrations"})
+def test_checkout_writes_progress(create_snapshot_fixture):
+    snapshot = create_snapshot_fixture([("tests", "0001_initial")], "first")
+    MigrationRecorder(connection).migration_qs.all().delete()
+    out = StringIO()
+    handler = SnapshotCheckoutHandler(
+        snapshot, OutputWrapper(out), progress_format=JSON
+    )
+    handler._checkout_to_snapshot(snapshot)
+    events = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert [(event["event"], event["name"]) for event in events] == [
+        ("start", "0001_initial"),
+        ("success", "0001_initial"),
+    ]
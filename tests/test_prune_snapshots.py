@@ -0,0 +1,107 @@
+from datetime import timedelta
+from unittest.mock import patch
+
+import pytest
+from django.core.management import CommandError, call_command
+from django.utils.timezone import now
+
+from liquidb.db_tools import SnapshotCheckoutHandler
+from liquidb.models import MigrationState, MigrationTiming, Snapshot
+from tests.tools_tests import change_state_mock
+
+
+@pytest.fixture(scope="function")
+def _history_fixture(create_snapshot_fixture):
+    for counter in range(1, 7):
+        snapshot = create_snapshot_fixture(
+            [("first_app", f"000{counter}")], f"state_{counter}"
+        )
+        # state_1 is the oldest one
+        Snapshot.objects.filter(pk=snapshot.pk).update(
+            created=now() - timedelta(days=10 - counter)
+        )
+
+
+def _names():
+    return sorted(Snapshot.objects.values_list("name", flat=True))
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures("_history_fixture")
+def test_prune_keeps_delta_chain():
+    call_command("prune_snapshots", keep_last=2)
+    # sets of deleted snapshots are parents of kept deltas
+    for counter in (5, 6):
+        snapshot = Snapshot.objects.get(name=f"state_{counter}")
+        assert list(snapshot.migrations.values_list("app", "name")) == [
+            ("first_app", f"000{counter}")
+        ]
+
+
+@pytest.fixture(scope="function")
+def _keyframes_fixture():
+    # store every set as keyframe
+    with patch("liquidb.db_tools.SNAPSHOT_KEYFRAME_INTERVAL", new=1):
+        yield
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures("_keyframes_fixture", "_history_fixture")
+def test_prune_keep_last():
+    timing = MigrationTiming.objects.create(
+        snapshot=Snapshot.objects.get(name="state_1"),
+        app="first_app",
+        name="0001",
+        direction="forward",
+        duration=1.0,
+    )
+    call_command("prune_snapshots", keep_last=2, chunk_size=1)
+    assert _names() == ["state_5", "state_6"]
+    # migrations used only by deleted snapshots are deleted
+    assert sorted(MigrationState.objects.values_list("name", flat=True)) == [
+        "0005",
+        "0006",
+    ]
+    assert Snapshot.objects.get(name="state_5").parent is None
+    timing.refresh_from_db()
+    assert timing.snapshot is None
+    # state of applied snapshot is still resolved
+    assert Snapshot.objects.get(applied=True).consistent_state is True
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures("_history_fixture")
+def test_prune_keep_days_and_names():
+    call_command("prune_snapshots", keep_days=6, keep_names=[r"^state_[12]$"])
+    assert _names() == ["state_1", "state_2", "state_5", "state_6"]
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures("_history_fixture")
+@patch.object(
+    SnapshotCheckoutHandler,
+    "_checkout_to_snapshot",
+    new=change_state_mock,
+)
+def test_prune_keeps_applied_snapshot():
+    call_command("checkout_snapshot", name="state_1", force=1)
+    call_command("prune_snapshots", keep_last=1)
+    assert _names() == ["state_1", "state_6"]
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures("_history_fixture")
+@patch("liquidb.retention.SNAPSHOT_RETENTION", new={"keep_last": 3})
+def test_prune_policy_from_settings(capsys):
+    call_command("prune_snapshots", dry_run=True)
+    assert "3 snapshots would be deleted" in capsys.readouterr().out
+    assert len(_names()) == 6
+    call_command("prune_snapshots")
+    assert _names() == ["state_4", "state_5", "state_6"]
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures("_history_fixture")
+def test_prune_without_policy():
+    with pytest.raises(CommandError, match="No retention policy"):
+        call_command("prune_snapshots")
@@ -39,5 +39,9 @@ TEMPLATES = [
 ROOT_URLCONF = "tests.test_urls"
 # </editor-fold>
 
-DATABASES = {"default": {"ENGINE": "django.db.backends.sqlite3", "NAME": ":memory:"}}
+DATABASES = {
+    "default": {"ENGINE": "django.db.backends.sqlite3", "NAME": ":memory:"},
+    # second database with its own migration history
+    "other": {"ENGINE": "django.db.backends.sqlite3", "NAME": ":memory:"},
+}
 USE_TZ = True
@@ -0,0 +1,183 @@
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.db.migrations.recorder import MigrationRecorder
+from mock import patch
+
+from liquidb.db_tools import (
+    _get_or_create_migration_set,
+    delete_unreferenced_migrations,
+)
+from liquidb.models import (
+    Snapshot,
+    MigrationSet,
+    MigrationState,
+    _migration_state_uuid,
+)
+from liquidb.state import AppliedMigrations, _create_migration_hash
+
+_INIT_STATE = [("first_app", "0001"), ("second_app", "0001"), ("third_app", "0001")]
+
+
+def _stored_apps(snapshot):
+    return set(snapshot.migration_set.states.values_list("app", flat=True))
+
+
+@pytest.fixture(scope="function")
+def _init_snapshot_fixture(create_migration_state_fixture):
+    create_migration_state_fixture(_INIT_STATE)
+    call_command("create_migration_snapshot", name="init")
+    return Snapshot.objects.get(name="init")
+
+
+@pytest.mark.django_db
+def test_snapshot_stores_only_changed_apps(
+    _init_snapshot_fixture, create_migration_state_fixture
+):
+    init = _init_snapshot_fixture
+    create_migration_state_fixture([("second_app", "0002")])
+    call_command("create_migration_snapshot", name="second")
+    second = Snapshot.objects.get(name="second")
+
+    assert second.parent == init
+    assert second.migration_set.parent_id == init.migration_set_id
+    assert second.migration_set.depth == 1
+    assert _stored_apps(second) == {"second_app"}
+    assert set(second.migrations.values_list("app", "name")) == {
+        ("first_app", "0001"),
+        ("second_app", "0002"),
+        ("third_app", "0001"),
+    }
+    # parent is not changed by delta
+    assert set(init.migrations.values_list("app", "name")) == set(_INIT_STATE)
+
+
+@pytest.mark.django_db
+@patch("liquidb.db_tools.SNAPSHOT_KEYFRAME_INTERVAL", new=2)
+def test_snapshot_keyframe_interval(
+    _init_snapshot_fixture, create_migration_state_fixture
+):
+    create_migration_state_fixture([("second_app", "0002")])
+    call_command("create_migration_snapshot", name="second")
+    create_migration_state_fixture([("third_app", "0002")])
+    call_command("create_migration_snapshot", name="third")
+    third = Snapshot.objects.get(name="third")
+
+    assert third.migration_set.parent_id is None
+    assert third.migration_set.depth == 0
+    assert _stored_apps(third) == {"first_app", "second_app", "third_app"}
+
+
+@pytest.mark.django_db
+def test_snapshot_removed_app_is_keyframe(_init_snapshot_fixture):
+    recorder = MigrationRecorder(connection)
+    recorder.migration_qs.filter(app="third_app").delete()
+    call_command("create_migration_snapshot", name="second")
+    second = Snapshot.objects.get(name="second")
+
+    assert second.migration_set.parent_id is None
+    assert set(second.migrations.values_list("app", "name")) == {
+        ("first_app", "0001"),
+        ("second_app", "0001"),
+    }
+
+
+@pytest.mark.django_db
+def test_delete_snapshot_keeps_parent_of_delta(
+    _init_snapshot_fixture, create_migration_state_fixture
+):
+    create_migration_state_fixture([("second_app", "0002")])
+    call_command("create_migration_snapshot", name="second")
+    create_migration_state_fixture([("third_app", "0002")])
+    call_command("create_migration_snapshot", name="third")
+
+    call_command("delete_snapshot_by_name", name="init", interactive=False)
+    call_command("delete_snapshot_by_name", name="second", interactive=False)
+    # sets of deleted snapshots are parents of third set
+    assert MigrationSet.objects.count() == 3
+    third = Snapshot.objects.get(name="third")
+    assert set(third.migrations.values_list("app", "name")) == {
+        ("first_app", "0001"),
+        ("second_app", "0002"),
+        ("third_app", "0002"),
+    }
+    third.delete()
+    delete_unreferenced_migrations()
+    assert MigrationSet.objects.count() == 0
+    assert MigrationState.objects.count() == 0
+
+
+def _state(migrations):
+    return AppliedMigrations(
+        tuple(
+            (index, app, name) for index, (app, name) in enumerate(migrations, start=1)
+        ),
+        _create_migration_hash(migrations),
+    )
+
+
+@pytest.mark.django_db
+def test_unmerged_branches_are_stored_in_keyframe():
+    branches = [("x", "0002_a"), ("x", "0002_b")]
+    parent = _get_or_create_migration_set(_state([*branches, ("y", "0001")]))
+    child = _get_or_create_migration_set(_state([*branches, ("y", "0002")]), parent)
+
+    assert child.parent_id is None
+    assert set(child.migrations.values_list("app", "name")) == {
+        ("x", "0002_a"),
+        ("x", "0002_b"),
+        ("y", "0002"),
+    }
+    # merged branches are stored as delta again
+    merged = _get_or_create_migration_set(
+        _state([("x", "0003_merge"), ("y", "0002")]), child
+    )
+    assert merged.parent_id is None
+    delta = _get_or_create_migration_set(
+        _state([("x", "0003_merge"), ("y", "0003")]), merged
+    )
+    assert delta.parent_id == merged.id
+
+
+@pytest.mark.django_db
+def test_state_ids_keep_all_migrations_of_app():
+    keyframe = _get_or_create_migration_set(_state([("x", "0001"), ("y", "0001")]))
+    delta = MigrationSet.objects.create(
+        migration_hash="delta", parent=keyframe, depth=1
+    )
+    # set stored before unmerged branches were detected
+    for name in ("0002_a", "0002_b"):
+        delta.states.add(
+            MigrationState.objects.create(
+                uuid=_migration_state_uuid("x", name),
+                migration_id=2,
+                app="x",
+                name=name,
+            )
+        )
+    assert set(delta.migrations.values_list("app", "name")) == {
+        ("x", "0002_a"),
+        ("x", "0002_b"),
+        ("y", "0001"),
+    }
+
+
+@pytest.mark.django_db
+def test_delta_migrations_resolved_in_one_query(django_assert_num_queries):
+    parent = _get_or_create_migration_set(_state([("x", "0001"), ("y", "0001")]))
+    for depth, app in enumerate(("x", "y"), start=1):
+        parent = MigrationSet.objects.create(
+            migration_hash=f"delta_{depth}", parent=parent, depth=depth
+        )
+        parent.states.add(
+            MigrationState.objects.create(
+                uuid=_migration_state_uuid(app, "0002"),
+                migration_id=2,
+                app=app,
+                name="0002",
+            )
+        )
+    # set chain is walked when queryset is built
+    migrations = parent.migrations.order_by("app").values_list("app", "name")
+    with django_assert_num_queries(1):
+        assert list(migrations) == [("x", "0002"), ("y", "0002")]
@@ -0,0 +1,71 @@
+import pytest
+from bs4 import BeautifulSoup
+from django.urls import reverse
+
+from liquidb.diff import ADDED, CHANGED, REMOVED, AppDiff, diff_snapshot, merge_diff
+
+
+def test_merge_diff():
+    current = [("first_app", "0001"), ("second_app", "0002"), ("third_app", "0001")]
+    snapshot = [("first_app", "0001"), ("second_app", "0001"), ("zero_app", "0003")]
+    assert list(merge_diff(current, snapshot)) == [
+        AppDiff("second_app", CHANGED, "0002", "0001"),
+        AppDiff("third_app", REMOVED, "0001", None),
+        AppDiff("zero_app", ADDED, None, "0003"),
+    ]
+
+
+def test_merge_diff_unmerged_branches():
+    current = [("first_app", "0002_a"), ("first_app", "0002_b")]
+    assert not list(merge_diff(current, current))
+    assert list(merge_diff(current, [("first_app", "0002_a")])) == [
+        AppDiff("first_app", CHANGED, "0002_a, 0002_b", "0002_a"),
+    ]
+
+
+@pytest.mark.django_db
+def test_diff_snapshot(create_snapshot_fixture, create_migration_state_fixture):
+    snapshot = create_snapshot_fixture(
+        [("first_app", "0001"), ("second_app", "0005")], "init"
+    )
+    applied = create_snapshot_fixture(
+        [("first_app", "0001"), ("second_app", "0006"), ("third_app", "0001")],
+        "second",
+    )
+    # delta set is compared with all migrations of its chain
+    assert list(diff_snapshot(snapshot, applied)) == [
+        AppDiff("second_app", CHANGED, "0006", "0005"),
+        AppDiff("third_app", REMOVED, "0001", None),
+    ]
+    assert not list(diff_snapshot(applied, applied))
+    create_migration_state_fixture([("four_app", "0001")])
+    assert list(diff_snapshot(applied)) == [AppDiff("four_app", REMOVED, "0001", None)]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "against, compared_to",
+    [
+        pytest.param("applied", "applied snapshot second", id="Applied snapshot"),
+        pytest.param("live", "migration table of default", id="Migration table"),
+    ],
+)
+def test_admin_snapshot_diff(
+    admin_client_fixture, create_snapshot_fixture, against, compared_to
+):
+    snapshot = create_snapshot_fixture([("first_app", "0001")], "init")
+    create_snapshot_fixture([("first_app", "0002"), ("second_app", "0001")], "second")
+    response = admin_client_fixture.get(
+        reverse("admin:snapshot_diff", args=[snapshot.pk]), {"against": against}
+    )
+    assert response.status_code == 200
+    soup = BeautifulSoup(response.rendered_content, "html.parser")
+    assert compared_to in soup.find(id="content-main").p.text
+    rows = [
+        [cell.text for cell in row.find_all(["th", "td"])]
+        for row in soup.find(id="snapshot-diff").tbody.find_all("tr")
+    ]
+    assert rows == [
+        ["first_app", CHANGED, "0002", "0001"],
+        ["second_app", REMOVED, "0001", "-"],
+    ]
@@ -0,0 +1,64 @@
+import pytest
+from django.db import connection
+
+from liquidb.models import _create_migration_hash
+from liquidb.state import (
+    cached_migration_state,
+    get_current_migration_state,
+    invalidate_migration_state,
+    invalidate_on_migrate,
+)
+
+_APPS = [("first_app", "0001"), ("second_app", "0003")]
+
+
+@pytest.mark.django_db
+def test_current_state_not_cached_outside_block(
+    create_migration_state_fixture, django_assert_num_queries
+):
+    create_migration_state_fixture(_APPS)
+    state = get_current_migration_state()
+    assert state.migration_hash == _create_migration_hash(_APPS)
+    with django_assert_num_queries(1):
+        assert get_current_migration_state() == state
+
+
+@pytest.mark.django_db
+def test_current_state_cached_inside_block(
+    create_migration_state_fixture, django_assert_num_queries
+):
+    create_migration_state_fixture(_APPS)
+    with cached_migration_state():
+        state = get_current_migration_state()
+        # only fingerprint of migration table is checked
+        with django_assert_num_queries(1) as context:
+            assert get_current_migration_state() is state
+        assert "GROUP BY" not in context.captured_queries[0]["sql"]
+
+
+@pytest.mark.django_db
+def test_current_state_changed_migration_table(create_migration_state_fixture):
+    create_migration_state_fixture(_APPS)
+    with cached_migration_state():
+        state = get_current_migration_state()
+        create_migration_state_fixture([("first_app", "0002")])
+        new_state = get_current_migration_state()
+    assert new_state != state
+    assert new_state.migration_hash == _create_migration_hash(
+        [("first_app", "0002"), ("second_app", "0003")]
+    )
+
+
+@pytest.mark.django_db
+def test_current_state_invalidated(
+    create_migration_state_fixture, django_assert_num_queries
+):
+    create_migration_state_fixture(_APPS)
+    with cached_migration_state():
+        get_current_migration_state()
+        invalidate_migration_state(connection.alias)
+        with django_assert_num_queries(2):
+            get_current_migration_state()
+        invalidate_on_migrate(sender=None, using=connection.alias)
+        with django_assert_num_queries(2):
+            get_current_migration_state()
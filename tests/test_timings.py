@@ -0,0 +1,117 @@
+import json
+from io import StringIO
+from itertools import count
+from types import SimpleNamespace
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.db.migrations.recorder import MigrationRecorder
+from django.test import override_settings
+
+from liquidb.db_tools import SnapshotCheckoutHandler
+from liquidb.models import MigrationTiming
+from liquidb.plan import BACKWARD, FORWARD
+from liquidb.timings import MigrationTimer, percentile
+
+
+def _migration(app, name):
+    return SimpleNamespace(app_label=app, name=name)
+
+
+@pytest.mark.django_db
+def test_timer_records_apply_and_unapply():
+    clock = count()
+    timer = MigrationTimer(None, connection, clock=lambda: next(clock))
+    first = _migration("first_app", "0001")
+    second = _migration("second_app", "0002")
+    timer("render_start")
+    timer("render_success")
+    timer("apply_start", first, False)
+    timer("apply_success", first, False)
+    timer("unapply_start", second, False)
+    timer("unapply_success", second, False)
+    # faked migrations are not measured
+    timer("apply_start", second, True)
+    timer("apply_success", second, True)
+    timer.save()
+    assert list(
+        MigrationTiming.objects.order_by("id").values_list(
+            "app", "name", "direction", "duration", "vendor"
+        )
+    ) == [
+        ("first_app", "0001", FORWARD, 1.0, "sqlite"),
+        ("second_app", "0002", BACKWARD, 1.0, "sqlite"),
+    ]
+
+
+@pytest.mark.django_db
+@override_settings(MIGRATION_MODULES={"tests": "tests.plan_migrations"})
+def test_checkout_records_timings(create_snapshot_fixture):
+    snapshot = create_snapshot_fixture([("tests", "0001_initial")], "first")
+    # migration table is empty, checkout applies initial migration
+    MigrationTiming.objects.all().delete()
+    MigrationRecorder(connection).migration_qs.all().delete()
+    SnapshotCheckoutHandler(snapshot)._checkout_to_snapshot(snapshot)
+    timing = MigrationTiming.objects.get()
+    assert (timing.snapshot, timing.app, timing.name, timing.direction) == (
+        snapshot,
+        "tests",
+        "0001_initial",
+        FORWARD,
+    )
+    assert timing.duration > 0
+
+
+@pytest.mark.parametrize(
+    "percent, expected",
+    [(50, 2), (90, 4), (99, 4), (100, 4), (1, 1)],
+)
+def test_percentile(percent, expected):
+    assert percentile([1, 2, 3, 4], percent) == expected
+
+
+@pytest.fixture(scope="function")
+def _timings_fixture():
+    durations = {
+        ("first_app", "0001"): [1.0, 3.0],
+        ("first_app", "0002"): [0.5],
+        ("second_app", "0001"): [10.0],
+    }
+    MigrationTiming.objects.bulk_create(
+        [
+            MigrationTiming(
+                app=app, name=name, direction=FORWARD, vendor="sqlite", duration=value
+            )
+            for (app, name), values in durations.items()
+            for value in values
+        ]
+    )
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures("_timings_fixture")
+def test_timings_command_json(create_migration_state_fixture):
+    create_migration_state_fixture([])
+    out = StringIO()
+    call_command("liquidb_timings", format="json", limit=2, stdout=out)
+    result = json.loads(out.getvalue())
+    assert [(row["app"], row["name"]) for row in result["slowest"]] == [
+        ("second_app", "0001"),
+        ("first_app", "0001"),
+    ]
+    assert result["slowest"][1]["average"] == 2.0
+    first_app = result["apps"][0]
+    assert first_app["app"] == "first_app"
+    assert (first_app["runs"], first_app["p50"], first_app["max"]) == (3, 1.0, 3.0)
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures("_timings_fixture")
+def test_timings_command_text(create_migration_state_fixture):
+    create_migration_state_fixture([])
+    out = StringIO()
+    call_command("liquidb_timings", app="first_app", stdout=out)
+    output = out.getvalue()
+    assert "1. forward first_app.0001 max 3.000s avg 2.000s (2 runs)" in output
+    assert "second_app" not in output
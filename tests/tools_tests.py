@@ -1,4 +1,4 @@
-from django.db import connection, transaction
+from django.db import connections, transaction
 from django.db.migrations.recorder import MigrationRecorder
 
 
@@ -6,14 +6,14 @@ def change_state_mock(self, snapshot):  # pylint: disable=unused-argument
     # unfortunately no other way that we can chane state in tests
     # without all migrations files and whole django machinery
     # so for this test we will mock this state
-    recorder = MigrationRecorder(connection=connection)
+    recorder = MigrationRecorder(connection=connections[snapshot.database])
     Migration = recorder.Migration
     migration_state = snapshot.migrations.values_list("app", "name")
-    with transaction.atomic():
-        Migration.objects.all().delete()
+    with transaction.atomic(using=snapshot.database):
+        recorder.migration_qs.all().delete()
         for app, name in migration_state:
             m = Migration(
                 app=app,
                 name=name,
             )
-            m.save()
+            m.save(using=snapshot.database)